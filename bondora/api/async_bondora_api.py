@@ -0,0 +1,689 @@
+# -*- coding: utf-8 -*-
+"""The file contains the class definition of asynchronous Bondora API."""
+
+import json
+import time
+import asyncio
+import aiohttp
+import api.urls
+from api.bondora_api import (DEFAULT_PAGE_SIZE, MAX_ATTEMPTS,
+                             RETRY_WAIT_TIME)
+from api.rate_limiter import RateLimiter, parse_wait_time
+from api.bulk import BulkDispatcher
+from api.metrics import ApiMetrics
+from api.cache import make_key
+from api.singleflight import AsyncSingleFlight
+from setup_logger import logger
+
+# status code of response to too many requests
+TOO_MANY_REQUESTS = 429
+
+
+class AsyncPageIterator:
+    """Class representation of asynchronous iterator over paginated items.
+
+    See `api.bondora_api.PageIterator`. The attribute `complete` is None
+    until the iteration ends, then True, if all pages were received, and
+    False, if a page failed and the items are truncated.
+    """
+
+    def __init__(self, pages, *args):
+        """
+        Initialize the class instance.
+
+        Parameters
+        ----------
+        pages : callable
+            Asynchronous generator function getting the iterator and
+            `args`, yielding the items, and setting `complete`.
+        *args : tuple
+            Arguments of `pages`.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.complete = None
+        self._items = pages(self, *args)
+
+    def __aiter__(self):
+        """Get the iterator."""
+        return self
+
+    async def __anext__(self):
+        """Get the next item."""
+        return await self._items.__anext__()
+
+    async def aclose(self):
+        """Stop the iteration and cancel prefetched pages."""
+        await self._items.aclose()
+
+
+class AsyncBondoraApi:
+    """Class representation of asynchronous Bondora API."""
+
+    def __init__(self,
+                 token,
+                 url_api=api.urls.URL_BONDORA_API,
+                 url_balance=api.urls.URL_BONDORA_BALANCE,
+                 url_investments=api.urls.URL_BONDORA_INVESTMENTS,
+                 url_eventlog=api.urls.URL_BONDORA_EVENTLOG,
+                 url_auctions=api.urls.URL_BONDORA_AUCTIONS,
+                 url_bid_auction=api.urls.URL_BONDORA_BID_AUCTION,
+                 url_sm=api.urls.URL_BONDORA_SM,
+                 url_loan_parts=api.urls.URL_LOAN_PARTS,
+                 url_buy_sm=api.urls.URL_BONDORA_BUY_SM,
+                 url_sell_sm=api.urls.URL_BONDORA_SELL_SM,
+                 url_cancel_sm=api.urls.URL_BONDORA_CANCEL_SM,
+                 session=None,
+                 pool_maxsize=100,
+                 keepalive_timeout=60,
+                 timeout=30,
+                 rate_limiter=None,
+                 bulk_workers=4,
+                 metrics=False,
+                 coalesce=True):
+        """
+        Initialize the class instance.
+
+        Parameters
+        ----------
+        token : str
+            Access token.
+        session : aiohttp.ClientSession object, optional
+            Session to share with other instances. If None, a new session
+            owned by this instance is created on the first request.
+            The default is None.
+        pool_maxsize : int, optional
+            Maximal number of simultaneous connections. The default is 100.
+        keepalive_timeout : float, optional
+            Time in seconds to keep idle connections alive.
+            The default is 60.
+        timeout : float, optional
+            Total timeout of requests in seconds. The default is 30.
+        rate_limiter : RateLimiter object, optional
+            Rate limiter scheduling the requests. If None, a new rate
+            limiter is created. The default is None.
+        bulk_workers : int, optional
+            Maximal number of chunks of bulk operations sent concurrently.
+            The default is 4.
+        metrics : bool or ApiMetrics object, optional
+            Collect per-endpoint metrics of requests. An ApiMetrics object
+            can be passed to share metrics between instances.
+            The default is False.
+        coalesce : bool, optional
+            Share one request between concurrent identical GET requests.
+            All callers receive the same response. POST requests are
+            never coalesced. The default is True.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.token = token
+        self.url_api = url_api
+        self.url_balance = url_balance
+        self.url_investments = url_investments
+        self.url_eventlog = url_eventlog
+        self.url_auctions = url_auctions
+        self.url_bid_auction = url_bid_auction
+        self.url_sm = url_sm
+        self.url_loan_parts = url_loan_parts
+        self.url_buy_sm = url_buy_sm
+        self.url_sell_sm = url_sell_sm
+        self.url_cancel_sm = url_cancel_sm
+        self.balance = None
+        self.investments = None
+        self.eventlog = None
+        self.auctions = None
+        self.sm = None
+        self.loan_parts = None
+        self.retry = {}
+        self.headers = {'User-Agent':
+                        ('Mozilla/5.0 (X11; Linux x86_64) '
+                         'AppleWebKit/537.11 (KHTML, like Gecko) '
+                         'Chrome/23.0.1271.64 Safari/537.11'),
+                        'Accept-Charset': 'ISO-8859-1,utf-8;q=0.7,*;q=0.3',
+                        'Accept-Encoding': 'none',
+                        'Accept-Language': 'en-US,en;q=0.8',
+                        'Connection': 'keep-alive',
+                        'Content-Type': 'application/json',
+                        'Authorization': 'Bearer {}'.format(self.token)}
+        self.pool_maxsize = pool_maxsize
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self._own_session = session is None
+        self.session = session
+        if rate_limiter is None:
+            rate_limiter = RateLimiter()
+        self.rate_limiter = rate_limiter
+        self.bulk = BulkDispatcher(max_workers=bulk_workers)
+        if metrics is True:
+            metrics = ApiMetrics()
+        self.metrics = metrics or None
+        self.singleflight = AsyncSingleFlight() if coalesce else None
+
+    async def __aenter__(self):
+        """Enter the asynchronous runtime context."""
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        """Exit the asynchronous runtime context and close the session."""
+        await self.close()
+
+    async def close(self):
+        """
+        Close the session and release pooled connections.
+
+        A shared session passed to the constructor is left open.
+
+        Returns
+        -------
+        None.
+
+        """
+        if self._own_session and self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def _get_session(self):
+        """Get session, create it on the first request."""
+        if self.session is None:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_maxsize,
+                keepalive_timeout=self.keepalive_timeout)
+            self.session = aiohttp.ClientSession(connector=connector,
+                                                 timeout=self.timeout)
+        return self.session
+
+    async def _request(self, method, url, params=None, content=None):
+        """
+        Send a request via the pooled session within the rate limit.
+
+        Parameters
+        ----------
+        method : str
+            HTTP method.
+        url : str
+            URL of the request relative to `url_api`.
+        params : dict, optional
+            Parameters to pass in URL. The default is None.
+        content : dict, optional
+            Content to send in the request. The default is None.
+
+        Returns
+        -------
+        response : aiohttp.ClientResponse object
+            Response of server to the request.
+        content : bytes
+            Content of the response.
+
+        """
+        # encode parameters in the same way as requests
+        if params:
+            params = {key: str(value) for key, value in params.items()
+                      if value is not None}
+
+        wait_time = self.rate_limiter.reserve(url)
+        if wait_time > 0:
+            await asyncio.sleep(wait_time)
+        data = json.dumps(content)
+        start = time.perf_counter()
+        try:
+            async with self._get_session().request(
+                    method,
+                    self.url_api + '/{}'.format(url),
+                    headers=self.headers,
+                    params=params,
+                    data=data) as response:
+                content = await response.read()
+        except Exception:
+            if self.metrics is not None:
+                self.metrics.record_error(url)
+            raise
+        if self.metrics is not None:
+            self.metrics.record(url, response.status,
+                                time.perf_counter() - start,
+                                len(data), len(content))
+
+        self.rate_limiter.update(url, response.headers)
+        if response.status == TOO_MANY_REQUESTS:
+            wait_time = parse_wait_time(response.headers, content)
+            self.rate_limiter.block(url, wait_time)
+            self.retry[url] = wait_time
+        return response, content
+
+    async def post(self, url, content):
+        """
+        Make a POST request to the specified url.
+
+        Parameters
+        ----------
+        url : str
+            URL of the request.
+        content : dict
+            Content to send in a POST request.
+
+        Returns
+        -------
+        response : aiohttp.ClientResponse object
+            Response of server to the request.
+
+        """
+        response = None
+        try:
+            response, _ = await self._request('POST', url, content=content)
+
+            # check if response is not ok
+            if response.status not in [200, 202]:
+                logger.error('Response status code: {}, url: {}'
+                             .format(response.status, url))
+
+        except Exception as e:
+            logger.error(e)
+
+        return response
+
+    async def get(self, url, content=None, params=None, retry=False):
+        """
+        Make a GET request to the specified url.
+
+        Parameters
+        ----------
+        url : str
+            URL of the request.
+        content : dict, optional
+            Content to send in a GET request. The default is None.
+        params : dict, optional
+            Parameters to pass in URL. The default is None.
+        retry : bool, optional
+            Retry to execute the method.
+            The default is False.
+
+        Returns
+        -------
+        response_json : dict
+            Decoded response of server to the request.
+
+        """
+        # share the request with concurrent identical requests
+        if self.singleflight is not None:
+            return await self.singleflight.do(
+                make_key(url, params, content),
+                self._get, url, content, params, retry)
+        return await self._get(url, content, params, retry)
+
+    async def _get(self, url, content, params, retry):
+        """Make a GET request with retries."""
+        response_json = None
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            try:
+                response, response_content = await self._request(
+                    'GET', url, params=params, content=content)
+
+                # check if response ok
+                if response.status == 200:
+                    response_json = json.loads(response_content)
+                    self.retry.pop(url, None)
+                    break
+
+                # if too many requests
+                if response.status == TOO_MANY_REQUESTS:
+                    response_json = json.loads(response_content)
+                    # the rate limiter waits before the next attempt
+                    wait_time = 0
+                    logger.error('Response status code: {}, url: {}, '
+                                 'retry after {} s.'
+                                 .format(response.status, url,
+                                         self.retry[url]))
+                # if not too many requests
+                else:
+                    wait_time = RETRY_WAIT_TIME
+                    logger.error('Response status code: {}, url: {}'
+                                 .format(response.status, url))
+
+            except Exception as e:
+                logger.error(e)
+                break
+
+            # next attempt, if required
+            if not retry or attempt == MAX_ATTEMPTS:
+                break
+            await asyncio.sleep(wait_time)
+            logger.info('Retry.')
+            if self.metrics is not None:
+                self.metrics.record_retry(url)
+
+        return response_json
+
+    async def _get_payload(self, url, retry, params=None, content=None):
+        """Get `Payload` of the response or None."""
+        try:
+            response_json = await self.get(url, content=content,
+                                           params=params, retry=retry)
+            if not response_json or 'Payload' not in response_json:
+                return None
+            return response_json['Payload']
+        except Exception as e:
+            logger.error(e)
+
+    def iter_pages(self, url, retry=False, page_size=DEFAULT_PAGE_SIZE,
+                   **kwargs):
+        """
+        Iterate asynchronously over items of a paginated endpoint.
+
+        The next page is requested while the caller processes
+        the current page.
+
+        Parameters
+        ----------
+        url : str
+            URL of the request.
+        retry : bool, optional
+            Retry to execute the request. The default is False.
+        page_size : int, optional
+            Number of items per page. The default is DEFAULT_PAGE_SIZE.
+        **kwargs : dict
+            Keyword arguments:
+                Request information.
+
+        Returns
+        -------
+        items : AsyncPageIterator object
+            Asynchronous iterator over the items of the `Payload` lists.
+            Its attribute `complete` is False after the iteration, if a
+            page failed.
+
+        """
+        return AsyncPageIterator(self._page_items, url, retry, page_size,
+                                 kwargs)
+
+    async def _page_items(self, pages, url, retry, page_size, params):
+        """Yield items of pages, set completeness of the page iterator."""
+        params = dict(params)
+        params['PageSize'] = page_size
+
+        def fetch(page_nr):
+            page_params = dict(params)
+            page_params['PageNr'] = page_nr
+            return asyncio.ensure_future(
+                self.get(url, params=page_params, retry=retry))
+
+        page_nr = 1
+        pending = fetch(page_nr)
+        try:
+            while pending is not None:
+                page = await pending
+                pending = None
+                if (not page or page.get('Payload') is None or
+                        page.get('Success') is False):
+                    logger.warning('Page {} of {} failed, the items are '
+                                   'incomplete.'.format(page_nr, url))
+                    pages.complete = False
+                    return
+                if not page['Payload']:
+                    break
+                items = page['Payload']
+                total_count = page.get('TotalCount')
+                if (len(items) == page_size and
+                        (total_count is None or
+                         page_nr * page_size < int(total_count))):
+                    page_nr += 1
+                    pending = fetch(page_nr)
+                for item in items:
+                    yield item
+            pages.complete = True
+        finally:
+            if pending is not None:
+                pending.cancel()
+
+    async def get_balance(self, retry):
+        """
+        Get balance of the account.
+
+        Parameters
+        ----------
+        retry : bool
+            Retry to execute the method.
+
+        Returns
+        -------
+        balance : float or None
+            Total available balance.
+
+        """
+        balance = await self._get_payload(self.url_balance, retry)
+        try:
+            if balance is not None:
+                self.balance = float(balance['TotalAvailable'])
+                return self.balance
+        except Exception as e:
+            logger.error(e)
+
+    async def get_investments(self, retry, **kwargs):
+        """
+        Get list of investments.
+
+        Parameters
+        ----------
+        retry : bool
+            Retry to execute the method.
+        **kwargs : dict
+            Keyword arguments:
+                Request information (see
+                https://api.bondora.com/doc/Api/GET-api-v1-account-investments?v=1).
+
+        Returns
+        -------
+        investments : list or None
+            List of investments.
+
+        """
+        investments = await self._get_payload(self.url_investments, retry,
+                                              params=kwargs)
+        if investments is not None:
+            self.investments = investments
+            return investments
+
+    async def get_eventlog(self, retry, **kwargs):
+        """
+        Get events that have been made with this application.
+
+        Parameters
+        ----------
+        retry : bool
+            Retry to execute the method.
+        **kwargs : dict
+            Keyword arguments:
+                Request information (see
+                https://api.bondora.com/doc/Api/GET-api-v1-eventlog?v=1).
+
+        Returns
+        -------
+        eventlog : list or None
+            List of events.
+
+        """
+        eventlog = await self._get_payload(self.url_eventlog, retry,
+                                           params=kwargs)
+        if eventlog is not None:
+            self.eventlog = eventlog
+            return eventlog
+
+    async def get_auctions(self, retry, **kwargs):
+        """
+        Get list of active auctions.
+
+        Parameters
+        ----------
+        retry : bool
+            Retry to execute the method.
+        **kwargs : dict
+            Keyword arguments:
+                Request information (see
+                https://api.bondora.com/doc/Api/GET-api-v1-auctions?v=1).
+
+        Returns
+        -------
+        auctions : list or None
+            List of auctions.
+
+        """
+        auctions = await self._get_payload(self.url_auctions, retry,
+                                           params=kwargs)
+        if auctions is not None:
+            self.auctions = auctions
+            return auctions
+
+    async def bid_on_auction(self, ids, amount):
+        """
+        Make bid into auctions by auction IDs.
+
+        Parameters
+        ----------
+        ids : list
+            List of auction IDs to bid.
+        amount : int
+            Amount to bid.
+
+        Returns
+        -------
+        response : aiohttp.ClientResponse object
+            Response of server to the request.
+
+        """
+        auctions_ids_list = [{'AuctionId': auction_id,
+                              'Amount': amount,
+                              'MinAmount': 1} for auction_id in ids]
+        return await self.post(self.url_bid_auction,
+                               {'Bids': auctions_ids_list})
+
+    async def get_secondarymarket(self, retry, **kwargs):
+        """
+        Get list of active secondary market items.
+
+        Parameters
+        ----------
+        retry : bool
+            Retry to execute the method.
+        **kwargs : dict
+            Keyword arguments:
+                Request information (see
+                https://api.bondora.com/doc/Api/GET-api-v1-secondarymarket?v=1).
+
+        Returns
+        -------
+        sm : list or None
+            List of secondary market items.
+
+        """
+        sm = await self._get_payload(self.url_sm, retry, params=kwargs)
+        if sm is not None:
+            self.sm = sm
+            return sm
+
+    async def get_loanparts(self, retry, ids):
+        """
+        Get loan part info.
+
+        Parameters
+        ----------
+        retry : bool
+            Retry to execute the method.
+        ids : list
+            List of loan part IDs.
+
+        Returns
+        -------
+        loan_parts : list or None
+            List of loan parts.
+
+        """
+        loan_parts = await self._get_payload(self.url_loan_parts, retry,
+                                             content={'ItemIds': ids})
+        if loan_parts is not None:
+            self.loan_parts = loan_parts
+            return loan_parts
+
+    async def buy_on_secondarymarket(self, ids):
+        """
+        Buy loans from secondary market by loans IDs.
+
+        Parameters
+        ----------
+        ids : list
+            List of secondary market item IDs to buy.
+
+        Returns
+        -------
+        response : aiohttp.ClientResponse object
+            Response of server to the request.
+
+        """
+        return await self.post(self.url_buy_sm, {'ItemIds': ids})
+
+    async def sell_on_secondarymarket(self, loans,
+                                      cancel_on_payment=False,
+                                      cancel_on_reschedule=False,
+                                      retry=False):
+        """
+        Sell loans on secondary market.
+
+        Parameters
+        ----------
+        loans : list
+            List of tuples (LoanPartId, DesiredDiscountRate) to sell.
+        cancel_on_payment : bool, optional
+            Allow to auto cancel the selling of loans
+            if they receive new repayments. The default is False.
+        cancel_on_reschedule : bool, optional
+            Allow to auto cancel the selling of loans
+            if they are rescheduled. The default is False.
+        retry : bool, optional
+            Retry to send the failed chunks. The default is False.
+
+        Returns
+        -------
+        result : BulkResult object
+            Result with per-chunk status, timing, and loan part IDs.
+
+        """
+        loans_ids_list = [{'LoanPartId': loan[0],
+                           'DesiredDiscountRate': loan[1]} for loan in loans]
+
+        async def send(chunk):
+            return await self.post(self.url_sell_sm,
+                                   {'Items': chunk,
+                                    'CancelItemOnPaymentReceived':
+                                        cancel_on_payment,
+                                    'CancelItemOnReschedule':
+                                        cancel_on_reschedule})
+
+        return await self.bulk.run_async(
+            loans_ids_list, [loan[0] for loan in loans], send,
+            max_attempts=MAX_ATTEMPTS if retry else 1)
+
+    async def cancel_on_secondarymarket(self, ids, retry=False):
+        """
+        Cancel sale of loans offered on secondary market.
+
+        Parameters
+        ----------
+        ids : list
+            List of secondary market item IDs to cancel.
+        retry : bool, optional
+            Retry to send the failed chunks. The default is False.
+
+        Returns
+        -------
+        result : BulkResult object
+            Result with per-chunk status, timing, and item IDs.
+
+        """
+        async def send(chunk):
+            return await self.post(self.url_cancel_sm, {'ItemIds': chunk})
+
+        return await self.bulk.run_async(
+            ids, ids, send, max_attempts=MAX_ATTEMPTS if retry else 1)
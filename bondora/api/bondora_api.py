@@ -3,14 +3,123 @@
 
 import json
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import requests
 import urllib3
-import inspect
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import api.urls
+from api.rate_limiter import RateLimiter, parse_wait_time
+from api.bulk import BulkDispatcher
+from api.metrics import ApiMetrics
+from api.records import InvestmentRecord, SecondaryMarketRecord, decode
+from api.cache import ResponseCache, INVALIDATIONS, make_key
+from api.singleflight import SingleFlight
 from setup_logger import logger
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+# (connect, read) timeouts in seconds
+DEFAULT_TIMEOUT = (3.05, 30)
+
+# default number of items per page for paginated endpoints
+DEFAULT_PAGE_SIZE = 1000
+
+# maximal number of loan part IDs per request
+LOAN_PARTS_CHUNK_SIZE = 100
+
+# maximal number of attempts of a GET request with retry
+MAX_ATTEMPTS = 2
+
+# wait time in seconds before retry after error other than 429
+RETRY_WAIT_TIME = 60
+
+
+def create_session(pool_connections=10, pool_maxsize=10, max_retries=3,
+                   backoff_factor=0.1):
+    """
+    Create HTTP session with a pool of persistent connections.
+
+    Connection errors are retried for all methods, because the request
+    has not reached the server. Read errors are retried only for GET
+    requests to avoid duplicate buys and sells.
+
+    Parameters
+    ----------
+    pool_connections : int, optional
+        Number of connection pools to cache. The default is 10.
+    pool_maxsize : int, optional
+        Maximal number of connections to keep in a pool. The default is 10.
+    max_retries : int, optional
+        Maximal number of retries on connection errors. The default is 3.
+    backoff_factor : float, optional
+        Backoff factor between retries. The default is 0.1.
+
+    Returns
+    -------
+    session : requests.Session object
+        Session with mounted HTTP adapter.
+
+    """
+    retries = Retry(total=max_retries,
+                    connect=max_retries,
+                    read=max_retries,
+                    status=0,
+                    allowed_methods=frozenset(['GET']),
+                    backoff_factor=backoff_factor,
+                    raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=pool_connections,
+                          pool_maxsize=pool_maxsize,
+                          max_retries=retries,
+                          pool_block=False)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+class PageIterator:
+    """Class representation of iterator over items of paginated endpoint.
+
+    The attribute `complete` is None until the iteration ends. Then it is
+    True, if all pages were received, and False, if a page failed (e.g.
+    server error, timeout, or too many requests) and the items are
+    truncated.
+    """
+
+    def __init__(self, pages, *args):
+        """
+        Initialize the class instance.
+
+        Parameters
+        ----------
+        pages : callable
+            Generator function getting the iterator and `args`, yielding
+            the items, and setting `complete`.
+        *args : tuple
+            Arguments of `pages`.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.complete = None
+        self._items = pages(self, *args)
+
+    def __iter__(self):
+        """Get the iterator."""
+        return self
+
+    def __next__(self):
+        """Get the next item."""
+        return next(self._items)
+
+    def close(self):
+        """Stop the iteration and cancel prefetched pages."""
+        self._items.close()
+
 
 class BondoraApi:
     """Class representation of Bondora API."""
@@ -27,7 +136,73 @@ class BondoraApi:
                  url_loan_parts=api.urls.URL_LOAN_PARTS,
                  url_buy_sm=api.urls.URL_BONDORA_BUY_SM,
                  url_sell_sm=api.urls.URL_BONDORA_SELL_SM,
-                 url_cancel_sm=api.urls.URL_BONDORA_CANCEL_SM):
+                 url_cancel_sm=api.urls.URL_BONDORA_CANCEL_SM,
+                 session=None,
+                 pool_connections=10,
+                 pool_maxsize=10,
+                 max_retries=3,
+                 timeout=DEFAULT_TIMEOUT,
+                 rate_limiter=None,
+                 bulk_workers=4,
+                 metrics=False,
+                 decode=False,
+                 cache=False,
+                 coalesce=True,
+                 cassette=None):
+        """
+        Initialize the class instance.
+
+        Parameters
+        ----------
+        token : str
+            Access token.
+        session : requests.Session object, optional
+            Session to share with other instances. If None, a new session
+            owned by this instance is created. The default is None.
+        pool_connections : int, optional
+            Number of connection pools to cache. The default is 10.
+        pool_maxsize : int, optional
+            Maximal number of connections to keep in a pool.
+            The default is 10.
+        max_retries : int, optional
+            Maximal number of retries on connection errors.
+            The default is 3.
+        timeout : float or tuple, optional
+            Timeout of requests in seconds, (connect, read) tuple
+            is allowed. The default is DEFAULT_TIMEOUT.
+        rate_limiter : RateLimiter object, optional
+            Rate limiter scheduling the requests. Instances using the same
+            token should share it. If None, a new rate limiter is created.
+            The default is None.
+        bulk_workers : int, optional
+            Maximal number of chunks of bulk operations sent concurrently.
+            The default is 4.
+        metrics : bool or ApiMetrics object, optional
+            Collect per-endpoint metrics of requests. An ApiMetrics object
+            can be passed to share metrics between instances.
+            The default is False.
+        decode : bool, optional
+            Decode investments and secondary market items to compact
+            records with parsed dates and typed numbers instead of
+            dictionaries. The default is False.
+        cache : bool or ResponseCache object, optional
+            Cache responses of read-only endpoints. A ResponseCache object
+            can be passed to configure TTLs and size or to share the cache
+            between instances with the same token. The default is False.
+        coalesce : bool, optional
+            Share one request between concurrent identical GET requests.
+            All callers receive the same response. POST requests are
+            never coalesced. The default is True.
+        cassette : Cassette object, optional
+            Cassette to record requests and responses or to replay
+            recorded responses without network access and rate limits.
+            The default is None.
+
+        Returns
+        -------
+        None.
+
+        """
         self.token = token
         self.url_api = url_api
         self.url_balance = url_balance
@@ -56,6 +231,106 @@ class BondoraApi:
                         'Connection': 'keep-alive',
                         'Content-Type': 'application/json',
                         'Authorization': 'Bearer {}'.format(self.token)}
+        self.timeout = timeout
+        self._own_session = session is None
+        if session is None:
+            session = create_session(pool_connections=pool_connections,
+                                     pool_maxsize=pool_maxsize,
+                                     max_retries=max_retries)
+        self.session = session
+        if rate_limiter is None:
+            rate_limiter = RateLimiter()
+        self.rate_limiter = rate_limiter
+        self.bulk = BulkDispatcher(max_workers=bulk_workers)
+        if metrics is True:
+            metrics = ApiMetrics()
+        self.metrics = metrics or None
+        self.decode = decode
+        if cache is True:
+            cache = ResponseCache()
+        self.cache = cache or None
+        self.singleflight = SingleFlight() if coalesce else None
+        self.cassette = cassette
+
+    def __enter__(self):
+        """Enter the runtime context."""
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Exit the runtime context and close the session."""
+        self.close()
+
+    def close(self):
+        """
+        Close the session and release pooled connections.
+
+        A shared session passed to the constructor is left open.
+
+        Returns
+        -------
+        None.
+
+        """
+        if self._own_session and self.session is not None:
+            self.session.close()
+            self.session = None
+        if self.cassette is not None:
+            self.cassette.close()
+
+    def _request(self, method, url, **kwargs):
+        """
+        Send a request via the pooled session within the rate limit.
+
+        Parameters
+        ----------
+        method : str
+            HTTP method.
+        url : str
+            URL of the request relative to `url_api`.
+        **kwargs : dict
+            Keyword arguments passed to `requests.Session.request`.
+
+        Returns
+        -------
+        response : requests.Response object
+            Response of server to the request.
+
+        """
+        replaying = self.cassette is not None and self.cassette.replaying
+        if not replaying:
+            self.rate_limiter.acquire(url)
+        start = time.perf_counter()
+        try:
+            if replaying:
+                response = self.cassette.play(method, url,
+                                              kwargs.get('params'),
+                                              kwargs.get('data'))
+            else:
+                response = self.session.request(
+                    method, self.url_api + '/{}'.format(url),
+                    headers=self.headers, timeout=self.timeout, **kwargs)
+        except Exception:
+            if self.metrics is not None:
+                self.metrics.record_error(url)
+            raise
+        elapsed = time.perf_counter() - start
+        if self.metrics is not None:
+            self.metrics.record(url, response.status_code, elapsed,
+                                len(kwargs.get('data') or ''),
+                                len(response.content))
+        if self.cassette is not None and not replaying:
+            self.cassette.record(method, url, kwargs.get('params'),
+                                 kwargs.get('data'), response, elapsed)
+        # recorded responses are not rate limited
+        if not replaying:
+            self.rate_limiter.update(url, response.headers)
+        if response.status_code == requests.codes.too_many_requests:
+            wait_time = parse_wait_time(response.headers,
+                                        response.content)
+            if not replaying:
+                self.rate_limiter.block(url, wait_time)
+            self.retry[url] = wait_time
+        return response
 
     def post(self, url, content):
         """
@@ -76,16 +351,16 @@ class BondoraApi:
         """
         response = None
         try:
-            response = requests.post(self.url_api + '/{}'.format(url),
-                                     headers=self.headers,
-                                     data=json.dumps(content))
+            response = self._request('POST', url, data=json.dumps(content))
+
+            # invalidate cached responses changed by the request
+            if self.cache is not None and url in INVALIDATIONS:
+                self.cache.invalidate(*INVALIDATIONS[url])
 
             # check if response is not ok
             if response.status_code not in [requests.codes.ok, 202]:
-                # get caller name
-                caller = inspect.stack()[1][3]
-                logger.error('Response status code: {}, caller: {}'
-                             .format(response.status_code, caller))
+                logger.error('Response status code: {}, url: {}'
+                             .format(response.status_code, url))
 
         except Exception as e:
             logger.error(e)
@@ -114,54 +389,254 @@ class BondoraApi:
             Response of server to the request.
 
         """
+        # get cached response, if available
+        cache_key = None
+        if self.cache is not None and self.cache.cacheable(url):
+            cache_key = make_key(url, params, content)
+            response_json = self.cache.get(cache_key)
+            if response_json is not None:
+                return response_json
+
+        # share the request with concurrent identical requests
+        if self.singleflight is not None:
+            return self.singleflight.do(
+                cache_key or make_key(url, params, content),
+                self._get, url, content, params, retry, cache_key)
+        return self._get(url, content, params, retry, cache_key)
+
+    def _get(self, url, content, params, retry, cache_key):
+        """Make a GET request with retries, store response in cache."""
         response_json = None
-        try:
-            response = requests.get(self.url_api + '/{}'.format(url),
-                                    headers=self.headers,
-                                    params=params,
-                                    data=json.dumps(content))
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            try:
+                response = self._request('GET', url, params=params,
+                                         data=json.dumps(content))
 
-            # check if response ok
-            if response.status_code == requests.codes.ok:
-                response_json = json.loads(response.content)
+                # check if response ok
+                if response.status_code == requests.codes.ok:
+                    response_json = json.loads(response.content)
+                    self.retry.pop(url, None)
+                    if cache_key is not None:
+                        self.cache.set(cache_key, response_json)
+                    break
 
-            # response is not ok
-            else:
-                # get caller name
-                caller = inspect.stack()[1][3]
+                # response is not ok
                 # if too many requests
                 if response.status_code == requests.codes.too_many_requests:
-                    # get wait time
                     response_json = json.loads(response.content)
-                    wait_time = int(
-                        response_json['Errors'][0]['Details'].split()[2])
-                    # slightly increase wait time
-                    wait_time += 2
-                    self.retry[caller] = wait_time
-                    logger.error('Response status code: {}, caller: {}, '
+                    # the rate limiter waits before the next attempt
+                    wait_time = 0
+                    logger.error('Response status code: {}, url: {}, '
                                  'retry after {} s.'
                                  .format(response.status_code,
-                                         caller,
-                                         wait_time))
+                                         url,
+                                         self.retry[url]))
                 # if not too many requests
                 else:
-                    # set waite time to 60 s.
-                    wait_time = 60
-                    logger.error('Response status code: {}, caller: {}'
-                                 .format(response.status_code, caller))
-
-                # second attempt, if required
-                if retry:
-                    # wait before proceed with the second attempt
-                    time.sleep(wait_time)
-                    logger.info('Retry.')
-                    self.get(url, content=content, params=params)
-
-        except Exception as e:
-            logger.error(e)
+                    wait_time = RETRY_WAIT_TIME
+                    logger.error('Response status code: {}, url: {}'
+                                 .format(response.status_code, url))
+
+            except Exception as e:
+                logger.error(e)
+                break
+
+            # next attempt, if required
+            if not retry or attempt == MAX_ATTEMPTS:
+                break
+            time.sleep(wait_time)
+            logger.info('Retry.')
+            if self.metrics is not None:
+                self.metrics.record_retry(url)
 
         return response_json
 
+    def _decode(self, payload, record_class):
+        """Decode payload to records, if required."""
+        if self.decode:
+            return decode(payload, record_class)
+        return payload
+
+    def _iter_pages(self, url, retry, page_size, prefetch, params,
+                    record_class=None):
+        """
+        Iterate lazily over items of a paginated endpoint.
+
+        Pages are requested in order by a single background worker, which
+        fetches up to `prefetch` pages ahead while the caller processes
+        the current page. At most `prefetch` + 1 pages are held in memory.
+
+        Parameters
+        ----------
+        url : str
+            URL of the request.
+        retry : bool
+            Retry to execute the request.
+        page_size : int
+            Number of items per page.
+        prefetch : int
+            Number of pages to fetch ahead.
+        params : dict
+            Parameters to pass in URL.
+        record_class : type, optional
+            Record class to decode items, if decoding is enabled.
+            The default is None.
+
+        Returns
+        -------
+        items : PageIterator object
+            Iterator over the items of the `Payload` lists. Its attribute
+            `complete` is False, if a page failed.
+
+        """
+        return PageIterator(self._page_items, url, retry, page_size,
+                            prefetch, params, record_class)
+
+    def _page_items(self, pages, url, retry, page_size, prefetch, params,
+                    record_class):
+        """Yield items of pages, set completeness of the page iterator."""
+        params = dict(params)
+        params['PageSize'] = page_size
+        prefetch = max(1, prefetch)
+
+        def fetch(page_nr):
+            page_params = dict(params)
+            page_params['PageNr'] = page_nr
+            return self.get(url, params=page_params, retry=retry)
+
+        executor = ThreadPoolExecutor(max_workers=1)
+        try:
+            pending = deque([(1, executor.submit(fetch, 1))])
+            next_page_nr = 2
+            total_pages = None
+            while pending:
+                page_nr, future = pending.popleft()
+                page = future.result()
+                # a failed page truncates the items
+                if (not page or page.get('Payload') is None or
+                        page.get('Success') is False):
+                    logger.warning('Page {} of {} failed, the items are '
+                                   'incomplete.'.format(page_nr, url))
+                    pages.complete = False
+                    return
+                if not page['Payload']:
+                    break
+                items = page['Payload']
+                if record_class is not None:
+                    items = self._decode(items, record_class)
+
+                # get number of pages from the first page
+                if total_pages is None and page.get('TotalCount') is not None:
+                    total_pages = -(-int(page['TotalCount']) // page_size)
+
+                # the last page is shorter than the page size
+                last_page = (len(items) < page_size or
+                             (total_pages is not None and
+                              page_nr >= total_pages))
+                if last_page:
+                    for _, future in pending:
+                        future.cancel()
+                    pending.clear()
+
+                # prefetch next pages
+                while (not last_page and len(pending) < prefetch and
+                       (total_pages is None or next_page_nr <= total_pages)):
+                    pending.append((next_page_nr,
+                                    executor.submit(fetch, next_page_nr)))
+                    next_page_nr += 1
+
+                yield from items
+
+            pages.complete = True
+
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def iter_investments(self, retry=False, page_size=DEFAULT_PAGE_SIZE,
+                         prefetch=1, **kwargs):
+        """
+        Iterate over all investments page by page.
+
+        Parameters
+        ----------
+        retry : bool, optional
+            Retry to execute the method. The default is False.
+        page_size : int, optional
+            Number of investments per page.
+            The default is DEFAULT_PAGE_SIZE.
+        prefetch : int, optional
+            Number of pages to fetch ahead. The default is 1.
+        **kwargs : dict
+            Keyword arguments:
+                Request information (see
+                https://api.bondora.com/doc/Api/GET-api-v1-account-investments?v=1).
+
+        Returns
+        -------
+        items : PageIterator object
+            Iterator over the investments. Its attribute `complete`
+            is False, if a page failed.
+
+        """
+        return self._iter_pages(self.url_investments, retry, page_size,
+                                prefetch, kwargs, InvestmentRecord)
+
+    def iter_secondarymarket(self, retry=False, page_size=DEFAULT_PAGE_SIZE,
+                             prefetch=1, **kwargs):
+        """
+        Iterate over all active secondary market items page by page.
+
+        Parameters
+        ----------
+        retry : bool, optional
+            Retry to execute the method. The default is False.
+        page_size : int, optional
+            Number of items per page. The default is DEFAULT_PAGE_SIZE.
+        prefetch : int, optional
+            Number of pages to fetch ahead. The default is 1.
+        **kwargs : dict
+            Keyword arguments:
+                Request information (see
+                https://api.bondora.com/doc/Api/GET-api-v1-secondarymarket?v=1).
+
+        Returns
+        -------
+        items : PageIterator object
+            Iterator over the secondary market items. Its attribute `complete`
+            is False, if a page failed.
+
+        """
+        return self._iter_pages(self.url_sm, retry, page_size,
+                                prefetch, kwargs, SecondaryMarketRecord)
+
+    def iter_eventlog(self, retry=False, page_size=DEFAULT_PAGE_SIZE,
+                      prefetch=1, **kwargs):
+        """
+        Iterate over all events made with this application page by page.
+
+        Parameters
+        ----------
+        retry : bool, optional
+            Retry to execute the method. The default is False.
+        page_size : int, optional
+            Number of events per page. The default is DEFAULT_PAGE_SIZE.
+        prefetch : int, optional
+            Number of pages to fetch ahead. The default is 1.
+        **kwargs : dict
+            Keyword arguments:
+                Request information (see
+                https://api.bondora.com/doc/Api/GET-api-v1-eventlog?v=1).
+
+        Returns
+        -------
+        items : PageIterator object
+            Iterator over the events. Its attribute `complete`
+            is False, if a page failed.
+
+        """
+        return self._iter_pages(self.url_eventlog, retry, page_size,
+                                prefetch, kwargs)
+
     def get_balance(self, retry):
         """
         Get balance of the account.
@@ -207,7 +682,8 @@ class BondoraApi:
                                    retry=retry)
             if 'Payload' not in investments:
                 return None
-            self.investments = investments['Payload']
+            self.investments = self._decode(investments['Payload'],
+                                            InvestmentRecord)
         except Exception as e:
             logger.error(e)
 
@@ -316,7 +792,7 @@ class BondoraApi:
             sm = self.get(self.url_sm, params=kwargs, retry=retry)
             if 'Payload' not in sm:
                 return None
-            self.sm = sm['Payload']
+            self.sm = self._decode(sm['Payload'], SecondaryMarketRecord)
         except Exception as e:
             logger.error(e)
 
@@ -346,6 +822,64 @@ class BondoraApi:
         except Exception as e:
             logger.error(e)
 
+    def get_loanparts_bulk(self, ids, retry=False,
+                           chunk_size=LOAN_PARTS_CHUNK_SIZE):
+        """
+        Get info of many loan parts.
+
+        IDs are split into chunks, which are requested concurrently
+        within the rate limit. The result is not stored in `loan_parts`.
+
+        Parameters
+        ----------
+        ids : list
+            List of loan part IDs.
+        retry : bool, optional
+            Retry to request the failed chunks. The default is False.
+        chunk_size : int, optional
+            Maximal number of IDs per request.
+            The default is LOAN_PARTS_CHUNK_SIZE.
+
+        Returns
+        -------
+        loan_parts : dict
+            Loan parts by loan part ID.
+        missing : list
+            IDs of loan parts not found or not requested due to errors.
+
+        """
+        loan_parts = {}
+        ids = list(dict.fromkeys(ids))
+        try:
+            result = self.bulk.run(
+                ids, ids,
+                # failed chunks are retried by the bulk dispatcher only
+                lambda chunk: self.get(self.url_loan_parts,
+                                       content={'ItemIds': chunk}),
+                chunk_size=chunk_size,
+                max_attempts=MAX_ATTEMPTS if retry else 1,
+                status=lambda response: (requests.codes.ok
+                                         if response and 'Payload' in response
+                                         else None))
+
+            # merge chunks
+            for chunk in result.chunks:
+                if chunk.ok:
+                    for loan_part in chunk.response['Payload']:
+                        loan_parts[loan_part['LoanPartId']] = loan_part
+                elif chunk.error is not None:
+                    logger.error(chunk.error)
+
+        except Exception as e:
+            logger.error(e)
+
+        missing = [loan_part_id for loan_part_id in ids
+                   if loan_part_id not in loan_parts]
+        if missing:
+            logger.warning('{} of {} loan parts were not found.'
+                           .format(len(missing), len(ids)))
+        return loan_parts, missing
+
     def buy_on_secondarymarket(self, ids):
         """
         Buy loans from secondary market by loans IDs.
@@ -370,10 +904,14 @@ class BondoraApi:
 
     def sell_on_secondarymarket(self, loans,
                                 cancel_on_payment=False,
-                                cancel_on_reschedule=False):
+                                cancel_on_reschedule=False,
+                                retry=False):
         """
         Sell loans on secondary market.
 
+        Loans are split into chunks of size 100 to avoid error by selling,
+        the chunks are sent concurrently.
+
         Parameters
         ----------
         loans : list
@@ -384,52 +922,62 @@ class BondoraApi:
         cancel_on_reschedule : bool, optional
             Allow to auto cancel the selling of loans
             if they are rescheduled. The default is False.
+        retry : bool, optional
+            Retry to send the failed chunks. The default is False.
 
         Returns
         -------
-        response : requests.Response object
-            Response of server to the request.
+        result : BulkResult object
+            Result with per-chunk status, timing, and loan part IDs.
 
         """
-        loans_ids_list = []
         try:
             # create list of dicts
-            for loan in loans:
-                loans_ids_list.append({'LoanPartId': loan[0],
-                                       'DesiredDiscountRate': loan[1]})
-
-            # split loans_ids_list chunks of size 100 to avoid error by selling
-            for i in range(0, len(loans_ids_list), 100):
-                loans_dict = {'Items': loans_ids_list[i:i + 100],
-                              'CancelItemOnPaymentReceived': cancel_on_payment,
-                              'CancelItemOnReschedule': cancel_on_reschedule}
-                response = self.post(self.url_sell_sm, loans_dict)
-            return response
+            loans_ids_list = [{'LoanPartId': loan[0],
+                               'DesiredDiscountRate': loan[1]}
+                              for loan in loans]
+
+            def send(chunk):
+                return self.post(self.url_sell_sm,
+                                 {'Items': chunk,
+                                  'CancelItemOnPaymentReceived':
+                                      cancel_on_payment,
+                                  'CancelItemOnReschedule':
+                                      cancel_on_reschedule})
+
+            return self.bulk.run(loans_ids_list,
+                                 [loan[0] for loan in loans],
+                                 send,
+                                 max_attempts=MAX_ATTEMPTS if retry else 1)
 
         except Exception as e:
             logger.error(e)
 
-    def cancel_on_secondarymarket(self, ids):
+    def cancel_on_secondarymarket(self, ids, retry=False):
         """
         Cancel sale of loans offered on secondary market.
 
+        IDs are split into chunks of size 100 to avoid error by cancelling,
+        the chunks are sent concurrently.
+
         Parameters
         ----------
         ids : list
             List of secondary market item IDs to cancel.
+        retry : bool, optional
+            Retry to send the failed chunks. The default is False.
 
         Returns
         -------
-        response : requests.Response object
-            Response of server to the request.
+        result : BulkResult object
+            Result with per-chunk status, timing, and item IDs.
 
         """
         try:
-            # split ids chunks of size 100 to avoid error by cancelling
-            for i in range(0, len(ids), 100):
-                response = self.post(self.url_cancel_sm,
-                                     {'ItemIds': ids[i:i + 100]})
-            return response
+            return self.bulk.run(ids, ids,
+                                 lambda chunk: self.post(self.url_cancel_sm,
+                                                         {'ItemIds': chunk}),
+                                 max_attempts=MAX_ATTEMPTS if retry else 1)
 
         except Exception as e:
             logger.error(e)
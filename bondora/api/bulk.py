@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+"""The file contains the class definitions of bulk operations."""
+
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+# maximal number of items in one request to avoid error by Bondora
+CHUNK_SIZE = 100
+
+# status codes of successful requests
+SUCCESS_CODES = (200, 202)
+
+
+class ChunkResult:
+    """Class representation of result of one chunk of a bulk operation."""
+
+    def __init__(self, index, items, item_ids):
+        """
+        Initialize the class instance.
+
+        Parameters
+        ----------
+        index : int
+            Index of the chunk.
+        items : list
+            Items of the chunk to send.
+        item_ids : list
+            IDs of the items.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.index = index
+        self.items = items
+        self.item_ids = item_ids
+        self.status_code = None
+        self.response = None
+        self.attempts = 0
+        self.elapsed = 0.0
+        self.error = None
+
+    @property
+    def ok(self):
+        """Check if the chunk was processed successfully."""
+        return self.status_code in SUCCESS_CODES
+
+    def __repr__(self):
+        """Get string representation of the chunk result."""
+        return ('ChunkResult(index={}, items={}, status_code={}, '
+                'attempts={}, elapsed={:.3f})'
+                .format(self.index, len(self.item_ids), self.status_code,
+                        self.attempts, self.elapsed))
+
+
+class BulkResult:
+    """Class representation of result of a bulk operation."""
+
+    def __init__(self, chunks, elapsed=0.0):
+        """
+        Initialize the class instance.
+
+        Parameters
+        ----------
+        chunks : list
+            List of ChunkResult objects.
+        elapsed : float, optional
+            Total time of the operation in seconds. The default is 0.0.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.chunks = chunks
+        self.elapsed = elapsed
+
+    @property
+    def ok(self):
+        """Check if all chunks were processed successfully."""
+        return all(chunk.ok for chunk in self.chunks)
+
+    @property
+    def failed(self):
+        """Get list of failed chunks."""
+        return [chunk for chunk in self.chunks if not chunk.ok]
+
+    @property
+    def succeeded_ids(self):
+        """Get list of IDs of successfully processed items."""
+        return [item_id for chunk in self.chunks if chunk.ok
+                for item_id in chunk.item_ids]
+
+    @property
+    def failed_ids(self):
+        """Get list of IDs of not processed items."""
+        return [item_id for chunk in self.chunks if not chunk.ok
+                for item_id in chunk.item_ids]
+
+    @property
+    def status_code(self):
+        """Get status code of the first failed chunk or 202, if all ok."""
+        for chunk in self.chunks:
+            if not chunk.ok:
+                return chunk.status_code
+        return 202
+
+    def __len__(self):
+        """Get number of items."""
+        return sum(len(chunk.item_ids) for chunk in self.chunks)
+
+    def __repr__(self):
+        """Get string representation of the bulk result."""
+        return ('BulkResult(chunks={}, failed={}, items={}, elapsed={:.3f})'
+                .format(len(self.chunks), len(self.failed), len(self),
+                        self.elapsed))
+
+
+def response_status_code(response):
+    """Get status code of requests.Response object or None."""
+    return getattr(response, 'status_code', None)
+
+
+def split_chunks(items, item_ids, chunk_size=CHUNK_SIZE):
+    """
+    Split items into chunks.
+
+    Parameters
+    ----------
+    items : list
+        Items to send.
+    item_ids : list
+        IDs of the items.
+    chunk_size : int, optional
+        Maximal number of items in a chunk. The default is CHUNK_SIZE.
+
+    Returns
+    -------
+    chunks : list
+        List of ChunkResult objects.
+
+    """
+    return [ChunkResult(index, items[i:i + chunk_size],
+                        item_ids[i:i + chunk_size])
+            for index, i in enumerate(range(0, len(items), chunk_size))]
+
+
+class BulkDispatcher:
+    """Class representation of dispatcher of bulk operations."""
+
+    def __init__(self, max_workers=4):
+        """
+        Initialize the class instance.
+
+        Parameters
+        ----------
+        max_workers : int, optional
+            Maximal number of chunks sent concurrently. The requests
+            are still scheduled by the rate limiter. The default is 4.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.max_workers = max_workers
+
+    @staticmethod
+    def _send_chunk(send, status, chunk):
+        """Send chunk and store response, status code, timing, and error."""
+        chunk.attempts += 1
+        start = time.monotonic()
+        try:
+            chunk.response = send(chunk.items)
+            chunk.status_code = status(chunk.response)
+            chunk.error = None
+        except Exception as e:
+            chunk.status_code = None
+            chunk.error = e
+        chunk.elapsed += time.monotonic() - start
+        return chunk
+
+    def run(self, items, item_ids, send, chunk_size=CHUNK_SIZE,
+            max_attempts=1, status=None):
+        """
+        Send items in chunks concurrently.
+
+        Only the failed chunks are sent again, if `max_attempts` > 1.
+
+        Parameters
+        ----------
+        items : list
+            Items to send.
+        item_ids : list
+            IDs of the items.
+        send : callable
+            Function sending a list of items and returning response.
+        chunk_size : int, optional
+            Maximal number of items in a chunk. The default is CHUNK_SIZE.
+        max_attempts : int, optional
+            Maximal number of attempts per chunk. The default is 1.
+        status : callable, optional
+            Function getting status code from response. If None,
+            the attribute `status_code` of response is used.
+            The default is None.
+
+        Returns
+        -------
+        result : BulkResult object
+            Result with per-chunk status, timing, and item IDs.
+
+        """
+        if status is None:
+            status = response_status_code
+        start = time.monotonic()
+        chunks = split_chunks(items, item_ids, chunk_size)
+        pending = chunks
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for _ in range(max_attempts):
+                if not pending:
+                    break
+                list(executor.map(
+                    lambda chunk: self._send_chunk(send, status, chunk),
+                    pending))
+                pending = [chunk for chunk in pending if not chunk.ok]
+        return BulkResult(chunks, time.monotonic() - start)
+
+    async def run_async(self, items, item_ids, send, chunk_size=CHUNK_SIZE,
+                        max_attempts=1):
+        """
+        Send items in chunks concurrently with a coroutine function.
+
+        Parameters
+        ----------
+        items : list
+            Items to send.
+        item_ids : list
+            IDs of the items.
+        send : coroutine function
+            Function sending a list of items and returning response.
+        chunk_size : int, optional
+            Maximal number of items in a chunk. The default is CHUNK_SIZE.
+        max_attempts : int, optional
+            Maximal number of attempts per chunk. The default is 1.
+
+        Returns
+        -------
+        result : BulkResult object
+            Result with per-chunk status, timing, and item IDs.
+
+        """
+        start = time.monotonic()
+        chunks = split_chunks(items, item_ids, chunk_size)
+        semaphore = asyncio.Semaphore(self.max_workers)
+
+        async def send_chunk(chunk):
+            async with semaphore:
+                chunk.attempts += 1
+                chunk_start = time.monotonic()
+                try:
+                    chunk.response = await send(chunk.items)
+                    chunk.status_code = getattr(chunk.response, 'status',
+                                                None)
+                    chunk.error = None
+                except Exception as e:
+                    chunk.status_code = None
+                    chunk.error = e
+                chunk.elapsed += time.monotonic() - chunk_start
+
+        pending = chunks
+        for _ in range(max_attempts):
+            if not pending:
+                break
+            await asyncio.gather(*[send_chunk(chunk) for chunk in pending])
+            pending = [chunk for chunk in pending if not chunk.ok]
+        return BulkResult(chunks, time.monotonic() - start)
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""The file contains the class definition of response cache."""
+
+import json
+import time
+import threading
+from collections import OrderedDict
+import api.urls
+
+# default time to live in seconds of cached responses per endpoint,
+# responses of other endpoints are not cached
+DEFAULT_TTLS = {api.urls.URL_BONDORA_BALANCE: 5,
+                api.urls.URL_BONDORA_INVESTMENTS: 60,
+                api.urls.URL_BONDORA_SM: 5,
+                api.urls.URL_LOAN_PARTS: 60}
+
+# endpoints with cached responses invalidated by POST requests
+INVALIDATIONS = {
+    api.urls.URL_BONDORA_BUY_SM: (api.urls.URL_BONDORA_BALANCE,
+                                  api.urls.URL_BONDORA_INVESTMENTS,
+                                  api.urls.URL_BONDORA_SM,
+                                  api.urls.URL_LOAN_PARTS),
+    api.urls.URL_BONDORA_SELL_SM: (api.urls.URL_BONDORA_INVESTMENTS,
+                                   api.urls.URL_BONDORA_SM,
+                                   api.urls.URL_LOAN_PARTS),
+    api.urls.URL_BONDORA_CANCEL_SM: (api.urls.URL_BONDORA_INVESTMENTS,
+                                     api.urls.URL_BONDORA_SM,
+                                     api.urls.URL_LOAN_PARTS),
+    api.urls.URL_BONDORA_BID_AUCTION: (api.urls.URL_BONDORA_BALANCE,
+                                       api.urls.URL_BONDORA_INVESTMENTS)}
+
+
+def make_key(url, params=None, content=None):
+    """
+    Create cache key from endpoint and request parameters.
+
+    Parameters
+    ----------
+    url : str
+        URL of the request.
+    params : dict, optional
+        Parameters to pass in URL. The default is None.
+    content : dict, optional
+        Content to send in the request. The default is None.
+
+    Returns
+    -------
+    key : tuple
+        Cache key.
+
+    """
+    return (url,
+            json.dumps(params, sort_keys=True, default=str),
+            json.dumps(content, sort_keys=True, default=str))
+
+
+class ResponseCache:
+    """Class representation of size-bounded LRU cache with TTL."""
+
+    def __init__(self, maxsize=256, ttls=None):
+        """
+        Initialize the class instance.
+
+        Parameters
+        ----------
+        maxsize : int, optional
+            Maximal number of cached responses. The default is 256.
+        ttls : dict, optional
+            Time to live in seconds per endpoint. Responses of endpoints
+            not in `ttls` are not cached. The default is DEFAULT_TTLS.
+
+        Returns
+        -------
+        None.
+
+        """
+        if ttls is None:
+            ttls = DEFAULT_TTLS
+        self.maxsize = maxsize
+        self.ttls = dict(ttls)
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def cacheable(self, url):
+        """Check if responses of the endpoint are cached."""
+        return url in self.ttls
+
+    def get(self, key):
+        """
+        Get cached response.
+
+        Parameters
+        ----------
+        key : tuple
+            Cache key created by `make_key`.
+
+        Returns
+        -------
+        value : dict or None
+            Cached response or None, if not found or expired.
+
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        """
+        Store response.
+
+        Parameters
+        ----------
+        key : tuple
+            Cache key created by `make_key`.
+        value : dict
+            Response to store.
+
+        Returns
+        -------
+        None.
+
+        """
+        ttl = self.ttls.get(key[0])
+        if not ttl:
+            return None
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *urls):
+        """
+        Remove cached responses of endpoints.
+
+        Parameters
+        ----------
+        *urls : str
+            Endpoints to invalidate. If not specified, all cached
+            responses are removed.
+
+        Returns
+        -------
+        None.
+
+        """
+        with self._lock:
+            if not urls:
+                self._entries.clear()
+                return None
+            for key in [key for key in self._entries if key[0] in urls]:
+                del self._entries[key]
+
+    def stats(self):
+        """
+        Get cache statistics.
+
+        Returns
+        -------
+        stats : dict
+            Number of hits, misses, and cached responses.
+
+        """
+        with self._lock:
+            return {'hits': self.hits,
+                    'misses': self.misses,
+                    'size': len(self._entries)}
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""The file contains the class definition of HTTP record/replay cassette."""
+
+import gzip
+import json
+import time
+import threading
+from collections import deque
+import requests
+from requests.structures import CaseInsensitiveDict
+
+# modes of the cassette
+RECORD = 'record'
+REPLAY = 'replay'
+
+# response headers stored in the cassette
+RECORDED_HEADERS = ('Content-Type', 'Retry-After',
+                    'X-RateLimit-Remaining', 'X-RateLimit-Reset')
+
+
+class CassetteMiss(LookupError):
+    """Exception raised if a replayed request is not in the cassette."""
+
+
+def _open(path, mode):
+    """Open text file, gzip compressed if the path ends with '.gz'."""
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def _key(method, url, params, data):
+    """Create key of a request."""
+    return (method, url,
+            json.dumps(params, sort_keys=True, default=str),
+            data or '')
+
+
+class Cassette:
+    """Class representation of record/replay log of HTTP requests.
+
+    In record mode, every request and response with its latency is
+    appended to a JSON lines file. In replay mode, the responses are
+    served from the file in the recorded order of identical requests
+    without network access.
+    """
+
+    def __init__(self, path, mode=REPLAY, delay_factor=0.0):
+        """
+        Initialize the class instance.
+
+        Parameters
+        ----------
+        path : str
+            Path to the cassette file. Files ending with '.gz' are gzip
+            compressed.
+        mode : str, optional
+            RECORD to append requests to the file, REPLAY to serve
+            responses from the file. The default is REPLAY.
+        delay_factor : float, optional
+            Factor of the recorded latency to wait in replay mode:
+            1.0 for original delays, 0.1 for ten times compressed delays,
+            0.0 without delays. The default is 0.0.
+
+        Returns
+        -------
+        None.
+
+        """
+        if mode not in (RECORD, REPLAY):
+            raise ValueError('Unknown mode: {}'.format(mode))
+        self.path = path
+        self.mode = mode
+        self.delay_factor = delay_factor
+        self.start = time.monotonic()
+        self.played = 0
+        self._lock = threading.Lock()
+        self._file = None
+        self._responses = {}
+        if mode == RECORD:
+            self._file = _open(path, 'a')
+        else:
+            self._load()
+
+    @property
+    def replaying(self):
+        """Check if the cassette is in replay mode."""
+        return self.mode == REPLAY
+
+    def _load(self):
+        """Load recorded responses grouped by request."""
+        with _open(self.path, 'r') as infile:
+            for line in infile:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                key = _key(entry['method'], entry['url'],
+                           entry['params'], entry['data'])
+                self._responses.setdefault(key, deque()).append(entry)
+
+    def close(self):
+        """
+        Close the cassette file.
+
+        Returns
+        -------
+        None.
+
+        """
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def record(self, method, url, params, data, response, elapsed):
+        """
+        Append request and response to the cassette.
+
+        Parameters
+        ----------
+        method : str
+            HTTP method.
+        url : str
+            URL of the request relative to `url_api`.
+        params : dict or None
+            Parameters passed in URL.
+        data : str or None
+            Request body.
+        response : requests.Response object
+            Response of server to the request.
+        elapsed : float
+            Latency of the request in seconds.
+
+        Returns
+        -------
+        None.
+
+        """
+        entry = {'t': round(time.monotonic() - self.start, 6),
+                 'method': method,
+                 'url': url,
+                 'params': params,
+                 'data': data,
+                 'status': response.status_code,
+                 'headers': {name: response.headers[name]
+                             for name in RECORDED_HEADERS
+                             if name in response.headers},
+                 'body': response.content.decode('utf-8', 'replace'),
+                 'elapsed': round(elapsed, 6)}
+        line = json.dumps(entry, separators=(',', ':'), default=str)
+        with self._lock:
+            self._file.write(line + '\n')
+
+    def play(self, method, url, params, data):
+        """
+        Get recorded response of the request.
+
+        Parameters
+        ----------
+        method : str
+            HTTP method.
+        url : str
+            URL of the request relative to `url_api`.
+        params : dict or None
+            Parameters passed in URL.
+        data : str or None
+            Request body.
+
+        Raises
+        ------
+        CassetteMiss
+            If no recorded response of the request is left.
+
+        Returns
+        -------
+        response : requests.Response object
+            Recorded response.
+
+        """
+        key = _key(method, url, params, data)
+        with self._lock:
+            entries = self._responses.get(key)
+            if not entries:
+                raise CassetteMiss('Request not recorded: {} {}'
+                                   .format(method, url))
+            entry = entries.popleft()
+            self.played += 1
+
+        if self.delay_factor:
+            time.sleep(entry['elapsed'] * self.delay_factor)
+
+        response = requests.Response()
+        response.status_code = entry['status']
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response._content = entry['body'].encode('utf-8')
+        response.encoding = 'utf-8'
+        response.url = url
+        return response
+
+    def remaining(self):
+        """Get number of recorded responses not played yet."""
+        with self._lock:
+            return sum(len(entries) for entries in self._responses.values())
@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+"""The file contains the class definition of API client metrics."""
+
+import bisect
+import threading
+
+# upper bounds of latency histogram buckets in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0)
+
+# prefix of metric names in Prometheus format
+PROMETHEUS_PREFIX = 'bondora_api'
+
+
+class EndpointMetrics:
+    """Class representation of metrics of one endpoint."""
+
+    __slots__ = ('requests', 'status_codes', 'latency_buckets',
+                 'latency_sum', 'bytes_sent', 'bytes_received',
+                 'rate_limited', 'retries', 'errors')
+
+    def __init__(self):
+        """
+        Initialize the class instance.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.requests = 0
+        self.status_codes = {}
+        self.latency_buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latency_sum = 0.0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.rate_limited = 0
+        self.retries = 0
+        self.errors = 0
+
+    def snapshot(self):
+        """Get metrics as dictionary."""
+        return {'requests': self.requests,
+                'status_codes': dict(self.status_codes),
+                'latency_buckets': dict(zip(LATENCY_BUCKETS + ('+Inf',),
+                                            self.latency_buckets)),
+                'latency_sum': self.latency_sum,
+                'latency_avg': (self.latency_sum / self.requests
+                                if self.requests else 0.0),
+                'bytes_sent': self.bytes_sent,
+                'bytes_received': self.bytes_received,
+                'rate_limited': self.rate_limited,
+                'retries': self.retries,
+                'errors': self.errors}
+
+
+class ApiMetrics:
+    """Class representation of per-endpoint metrics of API client."""
+
+    def __init__(self):
+        """
+        Initialize the class instance.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.endpoints = {}
+        self._lock = threading.Lock()
+
+    def _endpoint(self, endpoint):
+        """Get metrics of the endpoint, create them if required."""
+        metrics = self.endpoints.get(endpoint)
+        if metrics is None:
+            metrics = self.endpoints.setdefault(endpoint, EndpointMetrics())
+        return metrics
+
+    def record(self, endpoint, status_code, latency,
+               bytes_sent=0, bytes_received=0):
+        """
+        Record a request.
+
+        Parameters
+        ----------
+        endpoint : str
+            Endpoint of the request.
+        status_code : int
+            Status code of the response.
+        latency : float
+            Time in seconds between sending the request and receiving
+            the response.
+        bytes_sent : int, optional
+            Size of the request body. The default is 0.
+        bytes_received : int, optional
+            Size of the response body. The default is 0.
+
+        Returns
+        -------
+        None.
+
+        """
+        index = bisect.bisect_left(LATENCY_BUCKETS, latency)
+        with self._lock:
+            metrics = self._endpoint(endpoint)
+            metrics.requests += 1
+            metrics.status_codes[status_code] = (
+                metrics.status_codes.get(status_code, 0) + 1)
+            metrics.latency_buckets[index] += 1
+            metrics.latency_sum += latency
+            metrics.bytes_sent += bytes_sent
+            metrics.bytes_received += bytes_received
+            if status_code == 429:
+                metrics.rate_limited += 1
+
+    def record_error(self, endpoint):
+        """
+        Record a request failed without response.
+
+        Parameters
+        ----------
+        endpoint : str
+            Endpoint of the request.
+
+        Returns
+        -------
+        None.
+
+        """
+        with self._lock:
+            self._endpoint(endpoint).errors += 1
+
+    def record_retry(self, endpoint):
+        """
+        Record a retry of request.
+
+        Parameters
+        ----------
+        endpoint : str
+            Endpoint of the request.
+
+        Returns
+        -------
+        None.
+
+        """
+        with self._lock:
+            self._endpoint(endpoint).retries += 1
+
+    def reset(self):
+        """
+        Reset all metrics.
+
+        Returns
+        -------
+        None.
+
+        """
+        with self._lock:
+            self.endpoints = {}
+
+    def snapshot(self):
+        """
+        Get metrics of all endpoints.
+
+        Returns
+        -------
+        snapshot : dict
+            Metrics as dictionary per endpoint.
+
+        """
+        with self._lock:
+            return {endpoint: metrics.snapshot()
+                    for endpoint, metrics in self.endpoints.items()}
+
+    def to_prometheus(self):
+        """
+        Get metrics in Prometheus text exposition format.
+
+        Returns
+        -------
+        text : str
+            Metrics in Prometheus text format.
+
+        """
+        snapshot = self.snapshot()
+        lines = []
+
+        def add(name, metric_type, help_text, samples):
+            lines.append('# HELP {}_{} {}'.format(PROMETHEUS_PREFIX, name,
+                                                  help_text))
+            lines.append('# TYPE {}_{} {}'.format(PROMETHEUS_PREFIX, name,
+                                                  metric_type))
+            for suffix, labels, value in samples:
+                lines.append('{}_{}{}{{{}}} {}'.format(
+                    PROMETHEUS_PREFIX, name, suffix,
+                    ','.join('{}="{}"'.format(key, label)
+                             for key, label in labels),
+                    value))
+
+        add('requests_total', 'counter', 'Number of requests.',
+            [('', [('endpoint', endpoint), ('code', code)], count)
+             for endpoint, metrics in snapshot.items()
+             for code, count in metrics['status_codes'].items()])
+
+        samples = []
+        for endpoint, metrics in snapshot.items():
+            cumulative = 0
+            for bound, count in metrics['latency_buckets'].items():
+                cumulative += count
+                samples.append(('_bucket', [('endpoint', endpoint),
+                                            ('le', bound)], cumulative))
+            samples.append(('_sum', [('endpoint', endpoint)],
+                            metrics['latency_sum']))
+            samples.append(('_count', [('endpoint', endpoint)],
+                            metrics['requests']))
+        add('request_duration_seconds', 'histogram',
+            'Latency of requests in seconds.', samples)
+
+        for name, key, help_text in (
+                ('sent_bytes_total', 'bytes_sent', 'Bytes sent.'),
+                ('received_bytes_total', 'bytes_received',
+                 'Bytes received.'),
+                ('rate_limited_total', 'rate_limited',
+                 'Number of responses with status code 429.'),
+                ('retries_total', 'retries', 'Number of retries.'),
+                ('errors_total', 'errors',
+                 'Number of requests failed without response.')):
+            add(name, 'counter', help_text,
+                [('', [('endpoint', endpoint)], metrics[key])
+                 for endpoint, metrics in snapshot.items()])
+
+        return '\n'.join(lines) + '\n'
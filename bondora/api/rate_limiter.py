@@ -0,0 +1,315 @@
+# -*- coding: utf-8 -*-
+"""The file contains the class definition of rate limiter for Bondora API."""
+
+import re
+import json
+import time
+import threading
+import api.urls
+
+# default quotas (number of requests, period in seconds) per endpoint,
+# quotas of other endpoints are learned from responses
+DEFAULT_QUOTAS = {api.urls.URL_BONDORA_SM: (1, 1)}
+
+# default wait time in seconds, if it cannot be obtained from response
+DEFAULT_WAIT_TIME = 60
+
+# additional wait time in seconds to avoid a too early retry
+WAIT_TIME_MARGIN = 2
+
+# headers with remaining number of requests and time to reset in seconds
+HEADERS_REMAINING = ('X-RateLimit-Remaining', 'X-Rate-Limit-Remaining')
+HEADERS_RESET = ('X-RateLimit-Reset', 'X-Rate-Limit-Reset')
+
+
+def parse_wait_time(headers, content):
+    """
+    Get wait time from response with status code 429.
+
+    The wait time is taken from header `Retry-After` or from the error
+    details of Bondora (e.g. 'Try again in 31 seconds').
+
+    Parameters
+    ----------
+    headers : dict
+        Response headers.
+    content : bytes
+        Response content.
+
+    Returns
+    -------
+    wait_time : int
+        Wait time in seconds including `WAIT_TIME_MARGIN`.
+
+    """
+    wait_time = None
+    retry_after = headers.get('Retry-After')
+    if retry_after and retry_after.isdigit():
+        wait_time = int(retry_after)
+    else:
+        try:
+            details = json.loads(content)['Errors'][0]['Details']
+            try:
+                wait_time = int(details.split()[2])
+            except ValueError:
+                numbers = re.findall(r'\d+', details)
+                if numbers:
+                    wait_time = int(numbers[-1])
+        except Exception:
+            pass
+
+    if wait_time is None:
+        return DEFAULT_WAIT_TIME
+    return wait_time + WAIT_TIME_MARGIN
+
+
+class TokenBucket:
+    """Class representation of token bucket."""
+
+    def __init__(self, capacity=None, period=None):
+        """
+        Initialize the class instance.
+
+        Parameters
+        ----------
+        capacity : int, optional
+            Maximal number of requests within `period`. If None, the number
+            of requests is not limited until the bucket is blocked.
+            The default is None.
+        period : float, optional
+            Period in seconds to refill the bucket. The default is None.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.capacity = capacity
+        self.period = period
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        """Add tokens accumulated since the last update."""
+        if now <= self.updated:
+            return None
+        if self.capacity is not None:
+            self.tokens = min(self.capacity,
+                              self.tokens + (now - self.updated) *
+                              self.capacity / self.period)
+        self.updated = now
+
+    def reserve(self):
+        """
+        Take a token and get the time to wait before the request.
+
+        Tokens can be reserved in advance, so concurrent callers are
+        scheduled one after another instead of waking up together.
+
+        Returns
+        -------
+        wait_time : float
+            Time in seconds to wait before sending the request.
+
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            wait_time = max(0.0, self.blocked_until - now)
+            if self.capacity is not None:
+                self.tokens -= 1
+                if self.tokens < 0:
+                    wait_time = max(wait_time,
+                                    max(0.0, self.updated - now) -
+                                    self.tokens * self.period /
+                                    self.capacity)
+            return wait_time
+
+    def block(self, wait_time):
+        """
+        Block the bucket for `wait_time` seconds.
+
+        Parameters
+        ----------
+        wait_time : float
+            Time in seconds to block the bucket.
+
+        Returns
+        -------
+        None.
+
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.blocked_until = max(self.blocked_until, now + wait_time)
+            if self.capacity is not None:
+                # one request is allowed, when the bucket is unblocked
+                self._refill(now)
+                self.tokens = min(self.tokens, 1)
+                self.updated = max(self.updated, self.blocked_until)
+
+    def set_remaining(self, remaining, reset=None):
+        """
+        Set the remaining number of requests reported by server.
+
+        Parameters
+        ----------
+        remaining : int
+            Remaining number of requests.
+        reset : float, optional
+            Time in seconds until the quota is reset. The default is None.
+
+        Returns
+        -------
+        None.
+
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self.capacity is not None:
+                self._refill(now)
+                self.tokens = min(self.tokens, remaining)
+        if remaining <= 0 and reset:
+            self.block(reset)
+
+
+class RateLimiter:
+    """Class representation of rate limiter with a bucket per endpoint."""
+
+    def __init__(self, quotas=None):
+        """
+        Initialize the class instance.
+
+        Parameters
+        ----------
+        quotas : dict, optional
+            Quotas as tuples (number of requests, period in seconds)
+            per endpoint. The default is DEFAULT_QUOTAS.
+
+        Returns
+        -------
+        None.
+
+        """
+        if quotas is None:
+            quotas = DEFAULT_QUOTAS
+        self.quotas = dict(quotas)
+        self.buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, endpoint):
+        """
+        Get token bucket of the endpoint.
+
+        Parameters
+        ----------
+        endpoint : str
+            Endpoint of the request.
+
+        Returns
+        -------
+        bucket : TokenBucket object
+            Token bucket of the endpoint.
+
+        """
+        bucket = self.buckets.get(endpoint)
+        if bucket is None:
+            with self._lock:
+                bucket = self.buckets.get(endpoint)
+                if bucket is None:
+                    bucket = TokenBucket(*self.quotas.get(endpoint,
+                                                          (None, None)))
+                    self.buckets[endpoint] = bucket
+        return bucket
+
+    def reserve(self, endpoint):
+        """
+        Reserve a request to the endpoint without waiting.
+
+        Parameters
+        ----------
+        endpoint : str
+            Endpoint of the request.
+
+        Returns
+        -------
+        wait_time : float
+            Time in seconds to wait before the request.
+
+        """
+        return self.bucket(endpoint).reserve()
+
+    def acquire(self, endpoint):
+        """
+        Wait until a request to the endpoint is allowed.
+
+        Parameters
+        ----------
+        endpoint : str
+            Endpoint of the request.
+
+        Returns
+        -------
+        wait_time : float
+            Time in seconds waited before the request.
+
+        """
+        wait_time = self.reserve(endpoint)
+        if wait_time > 0:
+            time.sleep(wait_time)
+        return wait_time
+
+    def block(self, endpoint, wait_time):
+        """
+        Block requests to the endpoint after response with status code 429.
+
+        Parameters
+        ----------
+        endpoint : str
+            Endpoint of the request.
+        wait_time : float
+            Time in seconds to block the endpoint.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.bucket(endpoint).block(wait_time)
+
+    def update(self, endpoint, headers):
+        """
+        Update remaining number of requests from response headers.
+
+        Parameters
+        ----------
+        endpoint : str
+            Endpoint of the request.
+        headers : dict
+            Response headers.
+
+        Returns
+        -------
+        None.
+
+        """
+        remaining = None
+        for header in HEADERS_REMAINING:
+            if header in headers:
+                remaining = headers[header]
+                break
+        if remaining is None:
+            return None
+
+        reset = None
+        for header in HEADERS_RESET:
+            if header in headers:
+                reset = headers[header]
+                break
+        try:
+            self.bucket(endpoint).set_remaining(
+                int(remaining), float(reset) if reset else None)
+        except ValueError:
+            pass
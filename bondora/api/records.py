@@ -0,0 +1,257 @@
+# -*- coding: utf-8 -*-
+"""The file contains compact typed records of Bondora API payloads."""
+
+from array import array
+from datetime import date, datetime
+
+NAN = float('nan')
+
+
+def parse_date(value):
+    """
+    Convert ISO date string to datetime.date.
+
+    Parameters
+    ----------
+    value : str, datetime.date, or None
+        Date string in format '%Y-%m-%d' optionally followed by time
+        (e.g. '2021-05-01T00:00:00'), or already converted date.
+
+    Returns
+    -------
+    converted_date : datetime.date or None
+        Converted date or None, if `value` is empty.
+
+    """
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(value[:10])
+
+
+def parse_datetime(value):
+    """
+    Convert ISO date and time string to datetime.datetime.
+
+    Parameters
+    ----------
+    value : str, datetime.date, or None
+        Date and time string in format '%Y-%m-%dT%H:%M:%S' optionally
+        followed by fractions of seconds, or already converted value.
+
+    Returns
+    -------
+    converted_datetime : datetime.datetime or None
+        Converted date and time or None, if `value` is empty.
+
+    """
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    return datetime.fromisoformat(value[:19])
+
+
+def to_float(value):
+    """Convert value to float, keep None."""
+    return None if value is None else float(value)
+
+
+def to_int(value):
+    """Convert value to int, keep None."""
+    return None if value is None else int(value)
+
+
+def to_str(value):
+    """Keep value as it is."""
+    return value
+
+
+class Record:
+    """Class representation of compact record of API payload item.
+
+    Subclasses define `FIELDS` as tuple of (field name, converter) and
+    `__slots__` with the same field names. Fields missing in the payload
+    are set to None, fields not defined in `FIELDS` are dropped.
+    Records support item access (`record['LoanPartId']`), so they can be
+    used in place of the raw dictionaries.
+    """
+
+    __slots__ = ()
+    FIELDS = ()
+
+    def __init__(self, **kwargs):
+        """Initialize the record with fields passed as keyword arguments."""
+        for name, _ in self.FIELDS:
+            setattr(self, name, kwargs.get(name))
+
+    @classmethod
+    def from_dict(cls, item):
+        """
+        Create record from payload item.
+
+        Parameters
+        ----------
+        item : dict
+            Payload item.
+
+        Returns
+        -------
+        record : Record object
+            Record with converted fields.
+
+        """
+        record = cls.__new__(cls)
+        for name, converter in cls.FIELDS:
+            setattr(record, name, converter(item.get(name)))
+        return record
+
+    def __getitem__(self, name):
+        """Get field by name."""
+        try:
+            return getattr(self, name)
+        except AttributeError:
+            raise KeyError(name)
+
+    def __contains__(self, name):
+        """Check if the field is defined."""
+        return name in self.__slots__
+
+    def get(self, name, default=None):
+        """Get field by name or default value."""
+        return getattr(self, name, default)
+
+    def to_dict(self):
+        """Convert record to dictionary."""
+        return {name: getattr(self, name) for name, _ in self.FIELDS}
+
+    def __repr__(self):
+        """Get string representation of the record."""
+        return '{}({})'.format(
+            type(self).__name__,
+            ', '.join('{}={!r}'.format(name, getattr(self, name))
+                      for name, _ in self.FIELDS[:3]))
+
+
+class InvestmentRecord(Record):
+    """Class representation of investment."""
+
+    FIELDS = (('LoanPartId', to_str),
+              ('LoanId', to_str),
+              ('AuctionId', to_str),
+              ('Amount', to_float),
+              ('Country', to_str),
+              ('Rating', to_str),
+              ('Interest', to_float),
+              ('LoanStatusCode', to_int),
+              ('LoanStatusActiveFrom', parse_date),
+              ('ReScheduledOn', parse_date),
+              ('DebtOccuredOn', parse_date),
+              ('DebtOccuredOnForSecondary', parse_date),
+              ('NextPaymentNr', to_int),
+              ('NextPaymentDate', parse_date),
+              ('NextPaymentSum', to_float),
+              ('NrOfScheduledPayments', to_int),
+              ('LastPaymentDate', parse_date),
+              ('PrincipalRepaid', to_float),
+              ('InterestRepaid', to_float),
+              ('PrincipalRemaining', to_float),
+              ('LateAmountTotal', to_float),
+              ('PurchaseDate', parse_date),
+              ('PurchasePrice', to_float),
+              ('SalesStatus', to_int),
+              ('LatestDebtManagementStageType', to_int),
+              ('LatestDebtManagementDate', parse_date))
+    __slots__ = tuple(name for name, _ in FIELDS)
+
+
+class SecondaryMarketRecord(Record):
+    """Class representation of secondary market item."""
+
+    FIELDS = (('Id', to_str),
+              ('LoanPartId', to_str),
+              ('LoanId', to_str),
+              ('AuctionId', to_str),
+              ('Amount', to_float),
+              ('Price', to_float),
+              ('DesiredDiscountRate', to_float),
+              ('PrincipalRemaining', to_float),
+              ('Country', to_str),
+              ('Rating', to_str),
+              ('Interest', to_float),
+              ('LoanStatusCode', to_int),
+              ('ReScheduledOn', parse_date),
+              ('DebtOccuredOn', parse_date),
+              ('DebtOccuredOnForSecondary', parse_date),
+              ('NextPaymentNr', to_int),
+              ('NextPaymentDate', parse_date),
+              ('NrOfScheduledPayments', to_int),
+              ('LastPaymentDate', parse_date),
+              ('LateAmountTotal', to_float),
+              ('ListedInSecondMarketOn', parse_datetime),
+              # used by the function `regular_payments` of buy rules
+              ('LoanTransfers', to_str),
+              ('DebtManagmentEvents', to_str))
+    __slots__ = tuple(name for name, _ in FIELDS)
+
+
+def decode(payload, record_class):
+    """
+    Decode list of payload items to records.
+
+    Parameters
+    ----------
+    payload : list
+        List of payload items.
+    record_class : type
+        Subclass of Record.
+
+    Returns
+    -------
+    records : list
+        List of records.
+
+    """
+    return [record_class.from_dict(item) for item in payload]
+
+
+def decode_columns(payload, record_class):
+    """
+    Decode list of payload items to columns.
+
+    Numeric fields are stored in `array.array` of doubles (missing values
+    are NaN), other fields in lists. Columns are suitable for large lists
+    and vectorized processing.
+
+    Parameters
+    ----------
+    payload : iterable
+        Payload items or records.
+    record_class : type
+        Subclass of Record defining the fields.
+
+    Returns
+    -------
+    columns : dict
+        Column per field.
+
+    """
+    columns = {}
+    for name, converter in record_class.FIELDS:
+        if converter in (to_float, to_int):
+            columns[name] = array('d')
+        else:
+            columns[name] = []
+
+    for item in payload:
+        for name, converter in record_class.FIELDS:
+            value = converter(item.get(name))
+            if value is None and isinstance(columns[name], array):
+                value = NAN
+            columns[name].append(value)
+    return columns
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""The file contains the class definitions of request coalescing."""
+
+import asyncio
+import threading
+
+
+class _Call:
+    """Class representation of an in-flight call."""
+
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        """Initialize the call."""
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Class representation of coalescing of concurrent identical calls.
+
+    Concurrent calls with the same key share one execution of the
+    function: the first caller executes it, the others wait and receive
+    the same result. The result is not kept after the call is finished,
+    use ResponseCache to reuse results.
+    """
+
+    def __init__(self):
+        """
+        Initialize the class instance.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.calls = {}
+        self.coalesced = 0
+        self._lock = threading.Lock()
+
+    def do(self, key, function, *args, **kwargs):
+        """
+        Execute the function once for all concurrent callers with the key.
+
+        Parameters
+        ----------
+        key : hashable
+            Key of the call, e.g. created by `api.cache.make_key`.
+        function : callable
+            Function to execute.
+        *args : list
+            Positional arguments of the function.
+        **kwargs : dict
+            Keyword arguments of the function.
+
+        Returns
+        -------
+        result : object
+            Result of the function.
+
+        """
+        with self._lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = _Call()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = function(*args, **kwargs)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self.calls[key]
+            call.done.set()
+        return call.result
+
+
+class AsyncSingleFlight:
+    """Class representation of coalescing of concurrent identical coroutines.
+
+    Asynchronous counterpart of SingleFlight for one event loop.
+    """
+
+    def __init__(self):
+        """
+        Initialize the class instance.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.calls = {}
+        self.coalesced = 0
+
+    async def do(self, key, function, *args, **kwargs):
+        """
+        Await the coroutine function once for all concurrent callers.
+
+        Parameters
+        ----------
+        key : hashable
+            Key of the call, e.g. created by `api.cache.make_key`.
+        function : coroutine function
+            Function to await.
+        *args : list
+            Positional arguments of the function.
+        **kwargs : dict
+            Keyword arguments of the function.
+
+        Returns
+        -------
+        result : object
+            Result of the function.
+
+        """
+        future = self.calls.get(key)
+        if future is not None:
+            self.coalesced += 1
+            # shield the shared call from cancellation of one caller
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self.calls[key] = future
+        try:
+            result = await function(*args, **kwargs)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # mark the exception as retrieved, if no one else awaits it
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+        finally:
+            del self.calls[key]
+        return result
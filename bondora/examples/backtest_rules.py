@@ -0,0 +1,63 @@
+#!/opt/miniconda3/envs/flask/bin/python
+# -*- coding: utf-8 -*-
+"""Example how to backtest buy rules on captured webhooks."""
+
+import os
+import sys
+import glob
+import copy
+import inspect
+
+currentdir = os.path.dirname(
+    os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, parentdir)
+
+from setup_logger import logger
+from trading.rules import DEFAULT_RULES
+from trading.backtest import Backtester
+
+PATH_DATA = '/var/www/flask/bondora'
+
+# variant of the default rules with higher interest of green loans
+TUNED_RULES = copy.deepcopy(DEFAULT_RULES)
+for condition in TUNED_RULES[0]['conditions']:
+    if condition[0] == 'Interest':
+        condition[2] = 20.0
+
+
+def backtest_rules(paths, variants, workers=None):
+    """
+    Replay captured webhooks through variants of buy rules.
+
+    Parameters
+    ----------
+    paths : list
+        Paths of files of captured webhooks.
+    variants : dict
+        Buy rule definitions by variant name.
+    workers : int, optional
+        Number of worker processes. The default is None (number of
+        processors).
+
+    Returns
+    -------
+    None.
+
+    """
+    report = Backtester(variants, workers=workers).run(paths)
+    if report is None:
+        return None
+    logger.info('Replayed {} events in {:.1f} s ({:.0f} events/s).'.format(
+        report['events'], report['elapsed'], report['throughput']))
+    for name, variant in report['variants'].items():
+        logger.info('{}: bought {} items for {:.2f} EUR.'.format(
+            name, variant['bought'], variant['spent']))
+        for rule, stats in variant['rules'].items():
+            logger.info('{}/{}: {} of {} events bought.'.format(
+                name, rule, stats['bought'], stats['evaluations']))
+
+
+if __name__ == "__main__":
+    backtest_rules(glob.glob(PATH_DATA + '/data_*.json*'),
+                   {'default': DEFAULT_RULES, 'tuned': TUNED_RULES})
@@ -57,15 +57,12 @@ def offer_green_loans(token, max_price, min_price=None, retry=True):
     # initialize trading object
     bt = BondoraTrading(token)
 
-    # calcel loans with current loans status offered on secondary market
-    bt.cancel_sm_offers(retry=retry,
-                        LoanStatusCode=2)
-
-    # place loans with current loans status on  secondary market for selling
-    bt.place_sm_offers(max_price=max_price,
-                       min_price=min_price,
-                       retry=retry,
-                       LoanStatusCode=2)
+    # update offers of loans with current loans status on secondary market:
+    # cancel and place for selling only loans with changed prices
+    bt.reprice_sm_offers(max_price=max_price,
+                         min_price=min_price,
+                         retry=retry,
+                         LoanStatusCode=2)
 
 
 if __name__ == "__main__":
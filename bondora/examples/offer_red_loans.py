@@ -56,22 +56,17 @@ def offer_red_loans(token, price, retry=True):
     # initialize trading object
     bt = BondoraTrading(token)
 
-    # calcel secondary market offering of loans
+    # update secondary market offering of loans
     # with defaulted loans status
     # and latest debt management stage type of write off
-    # and last payment date not within last 12 months
+    # and last payment date not within last 12 months:
+    # cancel and place for selling only loans with changed prices
     last_payment = (datetime.now() - timedelta(days=365)).strftime('%Y-%m-%d')
-    bt.cancel_sm_offers(retry=retry,
-                        last_payment_date=last_payment,
-                        LoanStatusCode=5,
-                        LoanDebtManagementStageType=3)
-
-    # place these loans on secondary market for selling
-    bt.place_sm_offers(max_price=price,
-                       retry=retry,
-                       last_payment_date=last_payment,
-                       LoanStatusCode=5,
-                       LoanDebtManagementStageType=3)
+    bt.reprice_sm_offers(max_price=price,
+                         retry=retry,
+                         last_payment_date=last_payment,
+                         LoanStatusCode=5,
+                         LoanDebtManagementStageType=3)
 
 
 if __name__ == "__main__":
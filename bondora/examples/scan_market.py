@@ -0,0 +1,74 @@
+#!/opt/miniconda3/envs/flask/bin/python
+# -*- coding: utf-8 -*-
+"""Example how to trade by polling bondora's secondary market."""
+
+import os
+import sys
+import inspect
+import configparser
+
+currentdir = os.path.dirname(
+    os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, parentdir)
+
+from setup_logger import logger
+from trading.bondora_trading import BondoraTrading
+from trading.scanner import MarketScanner
+
+PATH_SETTINGS = '/var/www/flask/bondora/settings.cfg'
+
+duration = None  # time in seconds to scan (None - until interrupted)
+
+# read configuration
+try:
+    logger.info('Reading configuration from {}...'.format(PATH_SETTINGS))
+    config = configparser.ConfigParser()
+    config.read_file(open(PATH_SETTINGS))
+
+    TOKEN = config.get('BONDORA', 'TOKEN')
+    # optional JSON file with buy rules
+    RULES = config.get('BONDORA', 'RULES', fallback=None) or None
+
+except Exception as e:
+    logger.critical(e)
+    sys.exit(-1)
+
+
+def scan_market(token, rules=None, duration=None, retry=True):
+    """
+    Buy loans on bondora's secondary market found by polling.
+
+    Use it as a fallback, if the webhooks are failing.
+
+    Parameters
+    ----------
+    token : str
+        Access token.
+    rules : str, optional
+        Path to JSON file with buy rules. The default is None.
+    duration : float, optional
+        Time in seconds to scan. The default is None (until interrupted).
+    retry : bool, optional
+            Retry to execute the underlying methods, if too many requests.
+            The default is True.
+
+    Returns
+    -------
+    None.
+
+    """
+    # initialize trading object
+    bt = BondoraTrading(token, rules=rules)
+    scanner = MarketScanner(bt, retry=retry)
+    try:
+        scanner.run(duration)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        logger.info('Scanner stopped: {}'.format(scanner.stats()))
+        bt.close()
+
+
+if __name__ == "__main__":
+    scan_market(TOKEN, RULES, duration)
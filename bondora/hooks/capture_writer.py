@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""The file contains the class definition of webhook capture writer."""
+
+import os
+import sys
+import queue
+import inspect
+import threading
+from datetime import datetime
+
+currentdir = os.path.dirname(
+    os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, parentdir)
+
+from setup_logger import logger
+from trading.backtest import capture_line
+
+# maximal size of a capture file in bytes before it is rotated
+CAPTURE_MAX_BYTES = 100 * 1024 * 1024
+# number of rotated capture files kept (data_<name>.json.1, ...)
+CAPTURE_BACKUPS = 5
+# maximal number of webhooks waiting to be written
+CAPTURE_QUEUE_SIZE = 10000
+
+# marker stopping the writer
+_STOP = object()
+
+
+class CaptureWriter:
+    """Class representation of writer of captured webhooks.
+
+    Webhooks are appended as JSON lines (see `trading.backtest`) to one
+    file per account by a dedicated thread, so the workers processing
+    webhooks never wait for file I/O. A file reaching `max_bytes` is
+    rotated, and at most `backups` rotated files are kept. If the queue of
+    the writer is full, webhooks are not captured.
+    """
+
+    def __init__(self, path, max_bytes=CAPTURE_MAX_BYTES,
+                 backups=CAPTURE_BACKUPS, maxsize=CAPTURE_QUEUE_SIZE):
+        """
+        Initialize the class instance.
+
+        Parameters
+        ----------
+        path : str
+            Path of capture files with placeholder of the account name,
+            e.g. '/var/www/flask/bondora/data_{}.json'.
+        max_bytes : int, optional
+            Maximal size of a file in bytes. The default is
+            CAPTURE_MAX_BYTES.
+        backups : int, optional
+            Number of rotated files kept. The default is CAPTURE_BACKUPS.
+        maxsize : int, optional
+            Maximal number of webhooks waiting to be written.
+            The default is CAPTURE_QUEUE_SIZE.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.written = 0
+        self.dropped = 0
+        self.rotations = 0
+        self._files = {}
+        self._queue = queue.Queue(maxsize)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def write(self, account, body):
+        """
+        Capture webhook without waiting.
+
+        Parameters
+        ----------
+        account : str
+            Name of the account.
+        body : bytes
+            Raw webhook body.
+
+        Returns
+        -------
+        captured : bool
+            False, if the queue is full and the webhook is dropped.
+
+        """
+        try:
+            self._queue.put_nowait((account, body, datetime.now()))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _open(self, account):
+        """Get open capture file of account."""
+        outfile = self._files.get(account)
+        if outfile is None:
+            outfile = self._files[account] = open(
+                self.path.format(account), 'ab')
+        return outfile
+
+    def _rotate(self, account):
+        """Close capture file of account and shift rotated files."""
+        self._files.pop(account).close()
+        path = self.path.format(account)
+        for index in range(self.backups - 1, 0, -1):
+            if os.path.exists('{}.{}'.format(path, index)):
+                os.replace('{}.{}'.format(path, index),
+                           '{}.{}'.format(path, index + 1))
+        if self.backups > 0:
+            os.replace(path, path + '.1')
+        else:
+            os.remove(path)
+        self.rotations += 1
+
+    def _run(self):
+        """Write captured webhooks until stopped."""
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            account, body, received_on = item
+            try:
+                outfile = self._open(account)
+                outfile.write(capture_line(body, received_on))
+                self.written += 1
+                if outfile.tell() >= self.max_bytes:
+                    self._rotate(account)
+                elif self._queue.empty():
+                    outfile.flush()
+            except Exception as e:
+                logger.error(e)
+        for outfile in self._files.values():
+            outfile.close()
+        self._files.clear()
+
+    def close(self, timeout=None):
+        """
+        Write waiting webhooks and close the files.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            Time in seconds to wait for the writer. The default is None.
+
+        Returns
+        -------
+        None.
+
+        """
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def stats(self):
+        """
+        Get statistics of the writer.
+
+        Returns
+        -------
+        stats : dict
+            Numbers of waiting, written, and dropped webhooks, and of
+            rotations.
+
+        """
+        return {'depth': self._queue.qsize(),
+                'written': self.written,
+                'dropped': self.dropped,
+                'rotations': self.rotations}
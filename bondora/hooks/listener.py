@@ -5,8 +5,9 @@ import os
 import sys
 import inspect
 import json
+import atexit
 import configparser
-from flask import Flask, request, Response
+from flask import Flask, request, Response, jsonify
 
 currentdir = os.path.dirname(
     os.path.abspath(inspect.getfile(inspect.currentframe())))
@@ -14,52 +15,159 @@ parentdir = os.path.dirname(currentdir)
 sys.path.insert(0, parentdir)
 
 from setup_logger import logger
-from trading.bondora_trading import BondoraTrading
+from trading.dispatcher import AccountDispatcher
+from trading.rules import RuleEngine
+from hooks.prefilter import PreFilter
+from hooks.capture_writer import (CaptureWriter, CAPTURE_MAX_BYTES,
+                                  CAPTURE_BACKUPS)
+from hooks.work_queue import WorkQueue, DROP_OLDEST
 
 
 PATH_SETTINGS = '/var/www/flask/bondora/settings.cfg'
 PATH_DATA = '/var/www/flask/bondora'
 
+# number of threads processing webhooks
+WORKERS = 4
+# maximal number of webhooks waiting to be processed
+QUEUE_SIZE = 1000
+# policy, if the queue is full
+QUEUE_POLICY = DROP_OLDEST
+# addresses allowed to read statistics
+STATS_HOSTS = ('127.0.0.1', '::1')
+# keep local ledger of available balance to skip unaffordable purchases
+BALANCE_LEDGER = True
+# prefix of settings sections of accounts, e.g. [ACCOUNT name]
+ACCOUNT_SECTION = 'ACCOUNT '
+
 # read configuration
 try:
     logger.info('Reading configuration from {}...'.format(PATH_SETTINGS))
     config = configparser.ConfigParser()
     config.read_file(open(PATH_SETTINGS))
 
-    TOKEN = config.get('BONDORA', 'TOKEN')
+    # accounts by name with token and optional JSON file with buy rules
+    ACCOUNTS = {}
+    for section in config.sections():
+        if section.startswith(ACCOUNT_SECTION):
+            ACCOUNTS[section[len(ACCOUNT_SECTION):].strip()] = {
+                'token': config.get(section, 'TOKEN'),
+                'rules': config.get(section, 'RULES', fallback=None) or None}
+    # single account
+    if not ACCOUNTS:
+        TOKEN = config.get('BONDORA', 'TOKEN')
+        ACCOUNTS[TOKEN[0:5]] = {
+            'token': TOKEN,
+            'rules': config.get('BONDORA', 'RULES', fallback=None) or None}
+    # account of webhooks without account name
+    DEFAULT_ACCOUNT = next(iter(ACCOUNTS))
+
+    # optional capture of webhooks to data_<name>.json for backtesting
+    CAPTURE = config.getboolean('BONDORA', 'CAPTURE', fallback=False)
+    CAPTURE_MAX_MB = config.getint('BONDORA', 'CAPTURE_MAX_MB',
+                                   fallback=CAPTURE_MAX_BYTES // 2**20)
 
 except Exception as e:
     logger.critical(e)
     sys.exit(-1)
 
-trading = BondoraTrading(TOKEN)
+dispatcher = AccountDispatcher(ACCOUNTS, balance_ledger=BALANCE_LEDGER)
+# reject events, which cannot satisfy any rule of any account
+prefilter = PreFilter(RuleEngine([rule for engine in dispatcher.engines
+                                  for rule in engine.rules]))
+capture = None
+if CAPTURE:
+    capture = CaptureWriter(PATH_DATA + '/data_{}.json',
+                            max_bytes=CAPTURE_MAX_MB * 2**20,
+                            backups=CAPTURE_BACKUPS)
+
+
+def process(item):
+    """
+    Process webhook in a worker thread.
+
+    Parameters
+    ----------
+    item : tuple
+        Account name and raw webhook body.
+
+    Returns
+    -------
+    None.
+
+    """
+    account, body = item
+    # parse and evaluate only events, which can satisfy a buy rule
+    if prefilter.accept(body):
+        loan_data = json.loads(body)
+        dispatcher.dispatch(loan_data, account)
+    if capture is not None:
+        capture.write(account, body)
+
+
+def shutdown():
+    """Process waiting webhooks and send pending purchases."""
+    work_queue.close()
+    dispatcher.close()
+    if capture is not None:
+        capture.close()
+
+
+work_queue = WorkQueue(process, workers=WORKERS, maxsize=QUEUE_SIZE,
+                       policy=QUEUE_POLICY)
+atexit.register(shutdown)
 
 app = Flask(__name__)
 
 
 @app.route('/webhook', methods=['POST'])
-def responder():
+@app.route('/webhook/<account>', methods=['POST'])
+def responder(account=DEFAULT_ACCOUNT):
     """
     Listen to webhooks.
 
+    The webhook is acknowledged immediately and processed by the work
+    queue. If the queue drops the webhook, status 503 is returned.
+
+    Parameters
+    ----------
+    account : str, optional
+        Name of the account. The default is DEFAULT_ACCOUNT.
+
     Returns
     -------
     response : flask.Response object
             Response object that is used by default in Flask.
 
     """
+    if account not in ACCOUNTS:
+        return Response(status=404)
     response = Response(status=200)
     try:
-        loan_data = request.get_json(force=True, silent=True)
-        trading.buy_red_loan(loan_data)
-        trading.buy_green_loan(loan_data)
-        # comment next three lines to avoid the saving of loan info
-        with open(PATH_DATA + '/data_{}.json'.format(USER_NAME[0:5]),
-                  'w', encoding='utf-8') as outfile:
-            json.dump(loan_data, outfile, ensure_ascii=False, indent=2)
+        if not work_queue.put((account, request.get_data())):
+            response = Response(status=503)
 
     except Exception as e:
         logger.critical(e)
         response = Response(status=400)
 
     return response
+
+
+@app.route('/stats', methods=['GET'])
+def stats():
+    """
+    Get statistics of the work queue, pre-filter, accounts, and capture.
+
+    Returns
+    -------
+    response : flask.Response object
+            JSON statistics, available from local addresses only.
+
+    """
+    if request.remote_addr not in STATS_HOSTS:
+        return Response(status=403)
+    return jsonify({'queue': work_queue.stats(),
+                    'prefilter': prefilter.stats(),
+                    'accounts': dispatcher.stats(),
+                    'capture': capture.stats() if capture is not None
+                    else None})
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""The file contains the pre-filter of raw webhook bodies."""
+
+import os
+import re
+import sys
+import inspect
+import threading
+
+currentdir = os.path.dirname(
+    os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, parentdir)
+
+from trading.rules import PREFILTER_FIELDS
+
+# key and value patterns of event type and numeric fields
+EVENT_TYPE = b'"EventType"'
+STRING_VALUE = re.compile(rb'\s*:\s*"([^"\\]*)"')
+NUMBER_VALUE = re.compile(rb'\s*:\s*(null|-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?)')
+
+
+def find_value(body, key, pattern):
+    """
+    Find value of a key occurring exactly once in raw JSON.
+
+    Parameters
+    ----------
+    body : bytes
+        Raw JSON.
+    key : bytes
+        Quoted key, e.g. b'"Price"'.
+    pattern : re.Pattern
+        Pattern of separator and value with one group.
+
+    Returns
+    -------
+    value : bytes or None
+        Raw value or None, if the key is not found, found more than once,
+        or the value does not match the pattern.
+
+    """
+    position = body.find(key)
+    if position < 0 or body.find(key, position + len(key)) >= 0:
+        return None
+    match = pattern.match(body, position + len(key))
+    return match.group(1) if match else None
+
+
+class PreFilter:
+    """Class representation of pre-filter of raw webhook bodies.
+
+    The pre-filter extracts the event type and a few numeric fields of the
+    secondary market item from the raw body with regular expressions and
+    rejects events, which cannot satisfy any buy rule, without parsing the
+    whole body. If a field cannot be extracted unambiguously, the event is
+    passed on to be parsed.
+    """
+
+    def __init__(self, rules, fields=None):
+        """
+        Initialize the class instance.
+
+        Parameters
+        ----------
+        rules : RuleEngine object
+            Buy rules.
+        fields : tuple, optional
+            Numeric fields to extract. The default is PREFILTER_FIELDS
+            of the rule engine.
+
+        Returns
+        -------
+        None.
+
+        """
+        if fields is None:
+            fields = PREFILTER_FIELDS
+        self.rules = rules
+        self.fields = [(field, '"{}"'.format(field).encode())
+                       for field in fields]
+        self.checked = 0
+        self.rejected = 0
+        self.undecided = 0
+        self._lock = threading.Lock()
+
+    def extract(self, body):
+        """
+        Extract event type and fields from raw body.
+
+        Parameters
+        ----------
+        body : bytes
+            Raw webhook body.
+
+        Returns
+        -------
+        event_type : str or None
+            Event type or None, if not found or found more than once.
+        fields : dict or None
+            Values of fields or None, if any field is not found or
+            found more than once.
+
+        """
+        event_type = find_value(body, EVENT_TYPE, STRING_VALUE)
+        if event_type is not None:
+            event_type = event_type.decode()
+        fields = {}
+        for field, key in self.fields:
+            value = find_value(body, key, NUMBER_VALUE)
+            if value is None:
+                return event_type, None
+            fields[field] = None if value == b'null' else float(value)
+        return event_type, fields
+
+    def accept(self, body):
+        """
+        Check if the event has to be parsed and evaluated.
+
+        Parameters
+        ----------
+        body : bytes
+            Raw webhook body.
+
+        Returns
+        -------
+        candidate : bool
+            False, if the event cannot satisfy any buy rule.
+
+        """
+        event_type, fields = self.extract(body)
+        if event_type is None:
+            candidate = None
+        elif not any(event_type in rule.event_types
+                     for rule in self.rules.rules):
+            candidate = False
+        elif fields is None:
+            candidate = None
+        else:
+            candidate = self.rules.prefilter(event_type, fields)
+
+        with self._lock:
+            self.checked += 1
+            if candidate is None:
+                self.undecided += 1
+            elif not candidate:
+                self.rejected += 1
+        return candidate is not False
+
+    def stats(self):
+        """
+        Get statistics of the pre-filter.
+
+        Returns
+        -------
+        stats : dict
+            Number of checked, rejected, and undecided events.
+
+        """
+        with self._lock:
+            return {'checked': self.checked,
+                    'rejected': self.rejected,
+                    'undecided': self.undecided}
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""The file contains the class definition of bounded work queue."""
+
+import os
+import sys
+import time
+import queue
+import inspect
+import threading
+
+currentdir = os.path.dirname(
+    os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, parentdir)
+
+from setup_logger import logger
+
+# overflow policies of a full queue
+DROP_NEWEST = 'drop_newest'
+DROP_OLDEST = 'drop_oldest'
+BLOCK = 'block'
+
+# marker stopping a worker
+_STOP = object()
+
+
+class WorkQueue:
+    """Class representation of bounded queue processed by worker threads."""
+
+    def __init__(self, handler, workers=4, maxsize=1000,
+                 policy=DROP_OLDEST, block_timeout=0.1):
+        """
+        Initialize the class instance.
+
+        Parameters
+        ----------
+        handler : callable
+            Function processing one item.
+        workers : int, optional
+            Number of worker threads. The default is 4.
+        maxsize : int, optional
+            Maximal number of waiting items. The default is 1000.
+        policy : str, optional
+            Policy, if the queue is full:
+                DROP_NEWEST - drop the new item,
+                DROP_OLDEST - drop the oldest waiting item,
+                BLOCK - wait up to `block_timeout` seconds, then drop
+                the new item.
+            The default is DROP_OLDEST.
+        block_timeout : float, optional
+            Maximal waiting time in seconds of policy BLOCK.
+            The default is 0.1.
+
+        Returns
+        -------
+        None.
+
+        """
+        if policy not in (DROP_NEWEST, DROP_OLDEST, BLOCK):
+            raise ValueError('Unknown policy: {}'.format(policy))
+        self.handler = handler
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.maxsize = maxsize
+        self.accepted = 0
+        self.dropped = 0
+        self.processed = 0
+        self.errors = 0
+        self.max_depth = 0
+        self.elapsed = 0.0
+        self.closed = False
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self._workers = [threading.Thread(target=self._run, daemon=True)
+                         for _ in range(workers)]
+        for worker in self._workers:
+            worker.start()
+
+    def put(self, item):
+        """
+        Add item to the queue.
+
+        Parameters
+        ----------
+        item : object
+            Item to process.
+
+        Returns
+        -------
+        accepted : bool
+            True, if the item was added to the queue.
+
+        """
+        if self.closed:
+            return False
+        try:
+            if self.policy == BLOCK:
+                self._queue.put(item, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(item)
+        except queue.Full:
+            if self.policy != DROP_OLDEST:
+                self._count_drop()
+                return False
+            # replace the oldest waiting item
+            try:
+                self._queue.get_nowait()
+                self._queue.task_done()
+                self._count_drop()
+            except queue.Empty:
+                pass
+            try:
+                self._queue.put_nowait(item)
+            except queue.Full:
+                self._count_drop()
+                return False
+
+        depth = self._queue.qsize()
+        with self._lock:
+            self.accepted += 1
+            if depth > self.max_depth:
+                self.max_depth = depth
+        return True
+
+    def _count_drop(self):
+        """Count dropped item."""
+        with self._lock:
+            self.dropped += 1
+        if self.dropped % 100 == 1:
+            logger.warning('Work queue is full, {} items dropped.'
+                           .format(self.dropped))
+
+    def _run(self):
+        """Process items until stopped."""
+        while True:
+            item = self._queue.get()
+            try:
+                if item is _STOP:
+                    return None
+                start = time.perf_counter()
+                try:
+                    self.handler(item)
+                    error = False
+                except Exception as e:
+                    logger.error(e)
+                    error = True
+                elapsed = time.perf_counter() - start
+                with self._lock:
+                    self.processed += 1
+                    self.errors += error
+                    self.elapsed += elapsed
+            finally:
+                self._queue.task_done()
+
+    @property
+    def depth(self):
+        """Get number of waiting items."""
+        return self._queue.qsize()
+
+    def close(self, timeout=None):
+        """
+        Stop accepting items, process waiting items, and stop workers.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            Maximal time in seconds to wait for every worker.
+            The default is None (no limit).
+
+        Returns
+        -------
+        None.
+
+        """
+        if self.closed:
+            return None
+        self.closed = True
+        for _ in self._workers:
+            # wait for free space, stop markers must not be dropped
+            self._queue.put(_STOP)
+        for worker in self._workers:
+            worker.join(timeout)
+        logger.info('Work queue closed, {} items processed.'
+                    .format(self.processed))
+
+    def stats(self):
+        """
+        Get statistics of the queue.
+
+        Returns
+        -------
+        stats : dict
+            Current and maximal queue depth, number of accepted, dropped,
+            processed, and failed items, and average processing time
+            in seconds.
+
+        """
+        with self._lock:
+            return {'depth': self._queue.qsize(),
+                    'max_depth': self.max_depth,
+                    'accepted': self.accepted,
+                    'dropped': self.dropped,
+                    'processed': self.processed,
+                    'errors': self.errors,
+                    'elapsed_avg': (self.elapsed / self.processed
+                                    if self.processed else 0.0)}
@@ -0,0 +1,763 @@
+# -*- coding: utf-8 -*-
+"""The file contains a local stand-in server of the Bondora API."""
+
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import inspect
+import argparse
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from concurrent.futures import ThreadPoolExecutor
+import requests
+
+currentdir = os.path.dirname(
+    os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, parentdir)
+
+from setup_logger import logger
+import api.urls
+from api.rate_limiter import DEFAULT_QUOTAS
+
+HOST = '127.0.0.1'
+PORT = 8008
+
+# default page size of paginated endpoints
+PAGE_SIZE = 1000
+
+# maximal page size of paginated endpoints
+MAX_PAGE_SIZE = 10000
+
+# tolerance in seconds of rate limits for clients scheduling requests
+# exactly at the quota
+QUOTA_TOLERANCE = 0.05
+
+# request parameters filtering fields with other names
+PARAM_FIELDS = {'ListedOnDate': 'ListedInSecondMarketOn'}
+
+# number of generated items
+N_INVESTMENTS = 5000
+N_SM_ITEMS = 5000
+N_AUCTIONS = 100
+
+COUNTRIES = ('EE', 'FI', 'ES', 'NL')
+RATINGS = ('AA', 'A', 'B', 'C', 'D', 'E', 'F', 'HR')
+
+# status codes of loans: current, overdue, late, repaid, default
+LOAN_STATUS_CODES = (2, 2, 2, 2, 3, 5, 100)
+
+
+def _date(value):
+    """Format datetime as Bondora date string."""
+    return value.strftime('%Y-%m-%dT00:00:00') if value else None
+
+
+def generate_loan(rng, today):
+    """
+    Generate fields of a random loan part.
+
+    Parameters
+    ----------
+    rng : random.Random object
+        Random number generator.
+    today : datetime.datetime
+        Current time.
+
+    Returns
+    -------
+    loan : dict
+        Fields common to investments and secondary market items.
+
+    """
+    status = rng.choice(LOAN_STATUS_CODES)
+    n_payments = rng.choice((12, 24, 36, 48, 60))
+    next_payment_nr = rng.randint(1, n_payments)
+    amount = round(rng.uniform(1.0, 50.0), 2)
+    principal_remaining = round(
+        amount * (1.0 - (next_payment_nr - 1) / n_payments), 2)
+    defaulted = status == 100
+    debt_date = (today - timedelta(days=rng.randint(30, 900))
+                 if defaulted or status == 5 else None)
+    transfers = sorted(
+        (today - timedelta(days=rng.randint(1, 400)) for _ in range(4)))
+    return {'LoanPartId': str(uuid.UUID(int=rng.getrandbits(128))),
+            'LoanId': str(uuid.UUID(int=rng.getrandbits(128))),
+            'AuctionId': str(uuid.UUID(int=rng.getrandbits(128))),
+            'Amount': amount,
+            'Country': rng.choice(COUNTRIES),
+            'Rating': rng.choice(RATINGS),
+            'Interest': round(rng.uniform(8.0, 60.0), 2),
+            'LoanStatusCode': status,
+            'ReScheduledOn': (_date(today - timedelta(days=200))
+                              if rng.random() < 0.05 else None),
+            'DebtOccuredOn': _date(debt_date),
+            'DebtOccuredOnForSecondary': _date(debt_date),
+            'NextPaymentNr': next_payment_nr,
+            'NextPaymentDate': _date(today +
+                                     timedelta(days=rng.randint(1, 30))),
+            'NextPaymentSum': round(amount / n_payments * 1.2, 2),
+            'NrOfScheduledPayments': n_payments,
+            'LastPaymentDate': _date(transfers[-1]),
+            'PrincipalRemaining': principal_remaining,
+            'LateAmountTotal': (round(rng.uniform(0.1, 5.0), 2)
+                                if status != 2 else 0.0),
+            'DebtManagmentEvents': [
+                {'CreatedOn': _date(today - timedelta(days=rng.randint(1,
+                                                                       900)))}
+                for _ in range(2)],
+            'LoanTransfers': [
+                {'Date': _date(transfer),
+                 'TotalAmount': round(rng.uniform(0.01, 2.0), 2)}
+                for transfer in transfers]}
+
+
+def generate_investment(rng, today):
+    """
+    Generate a random investment.
+
+    Parameters
+    ----------
+    rng : random.Random object
+        Random number generator.
+    today : datetime.datetime
+        Current time.
+
+    Returns
+    -------
+    investment : dict
+        Investment.
+
+    """
+    investment = generate_loan(rng, today)
+    investment.update({
+        'LoanStatusActiveFrom': _date(today - timedelta(days=400)),
+        'PrincipalRepaid': round(investment['Amount'] -
+                                 investment['PrincipalRemaining'], 2),
+        'InterestRepaid': round(rng.uniform(0.0, 5.0), 2),
+        'PurchaseDate': _date(today - timedelta(days=rng.randint(1, 900))),
+        'PurchasePrice': investment['Amount'],
+        'SalesStatus': None,
+        'SoldDate': None,
+        'LatestDebtManagementStageType': None,
+        'LatestDebtManagementDate': None})
+    return investment
+
+
+def generate_sm_item(rng, today, loan=None):
+    """
+    Generate a random secondary market item.
+
+    Parameters
+    ----------
+    rng : random.Random object
+        Random number generator.
+    today : datetime.datetime
+        Current time.
+    loan : dict, optional
+        Loan part to offer. If None, a random loan part is generated.
+        The default is None.
+
+    Returns
+    -------
+    item : dict
+        Secondary market item.
+
+    """
+    item = generate_loan(rng, today) if loan is None else dict(loan)
+    if item['LoanStatusCode'] == 100:
+        discount = round(rng.uniform(-99.0, -40.0), 1)
+    else:
+        discount = round(rng.uniform(-10.0, 10.0), 1)
+    item.update({
+        'Id': str(uuid.UUID(int=rng.getrandbits(128))),
+        'DesiredDiscountRate': discount,
+        'Price': round(item['PrincipalRemaining'] *
+                       (1.0 + discount / 100.0), 2),
+        'ListedInSecondMarketOn': _date(today),
+        'IsMine': False})
+    return item
+
+
+def make_webhook(item, event_type='secondmarket.published'):
+    """
+    Create webhook event of a secondary market item.
+
+    Parameters
+    ----------
+    item : dict
+        Secondary market item.
+    event_type : str, optional
+        Event type. The default is 'secondmarket.published'.
+
+    Returns
+    -------
+    event : dict
+        Webhook event.
+
+    """
+    return {'EventType': event_type,
+            'EventId': str(uuid.uuid4()),
+            'Payload': item}
+
+
+def ok_response(payload, **kwargs):
+    """Create successful response body."""
+    body = {'Payload': payload, 'Success': True, 'Errors': None}
+    body.update(kwargs)
+    return body
+
+
+def error_response(code, message, details=None):
+    """Create error response body in Bondora format."""
+    return {'Payload': None,
+            'Success': False,
+            'Errors': [{'Code': code,
+                        'Message': message,
+                        'Details': details}]}
+
+
+def _compare(value, bound):
+    """Compare item value with parameter value, return -1, 0, or 1."""
+    if isinstance(value, (int, float)):
+        bound = float(bound)
+    else:
+        value = str(value).lower()[:len(bound)]
+    return (value > bound) - (value < bound)
+
+
+def _matches(item, filters):
+    """Check if item matches filters of request parameters."""
+    for name, values in filters:
+        if name.endswith('From') and name[:-4] in item:
+            value = item[name[:-4]]
+            if value is None or _compare(value, values[0]) < 0:
+                return False
+        elif name.endswith('To') and name[:-2] in item:
+            value = item[name[:-2]]
+            if value is None or _compare(value, values[0]) > 0:
+                return False
+        elif name in item:
+            if str(item[name]).lower() not in values:
+                return False
+    return True
+
+
+class MarketState:
+    """Class representation of state of the simulated account and market."""
+
+    def __init__(self, n_investments=N_INVESTMENTS, n_sm_items=N_SM_ITEMS,
+                 n_auctions=N_AUCTIONS, balance=1000.0, seed=0):
+        """
+        Initialize the class instance.
+
+        Parameters
+        ----------
+        n_investments : int, optional
+            Number of generated investments. The default is N_INVESTMENTS.
+        n_sm_items : int, optional
+            Number of generated secondary market items of other investors.
+            The default is N_SM_ITEMS.
+        n_auctions : int, optional
+            Number of generated auctions. The default is N_AUCTIONS.
+        balance : float, optional
+            Available balance. The default is 1000.0.
+        seed : int, optional
+            Seed of the random number generator. The default is 0.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.rng = random.Random(seed)
+        self.today = datetime.now()
+        self.balance = balance
+        self.investments = {}
+        for _ in range(n_investments):
+            investment = generate_investment(self.rng, self.today)
+            self.investments[investment['LoanPartId']] = investment
+        self.sm = {}
+        for _ in range(n_sm_items):
+            item = generate_sm_item(self.rng, self.today)
+            self.sm[item['Id']] = item
+        self.auctions = [{'AuctionId': str(uuid.uuid4()),
+                          'Country': self.rng.choice(COUNTRIES),
+                          'Rating': self.rng.choice(RATINGS),
+                          'Interest': round(self.rng.uniform(8.0, 60.0), 2),
+                          'AppliedAmount': 1000.0,
+                          'RemainingAmount': 500.0}
+                         for _ in range(n_auctions)]
+        self.eventlog = []
+        self._lock = threading.Lock()
+
+    def _log(self, event_type, count):
+        """Add event to event log."""
+        self.eventlog.append({'EventDate': _date(datetime.now()),
+                              'EventType': event_type,
+                              'Count': count})
+
+    def new_sm_item(self):
+        """
+        Publish a new secondary market item of another investor.
+
+        Returns
+        -------
+        item : dict
+            Published item.
+
+        """
+        with self._lock:
+            item = generate_sm_item(self.rng, self.today)
+            item['ListedInSecondMarketOn'] = datetime.now().strftime(
+                '%Y-%m-%dT%H:%M:%S')
+            self.sm[item['Id']] = item
+            return item
+
+    def get_balance(self):
+        """Get balance payload."""
+        with self._lock:
+            return {'Balance': self.balance,
+                    'Reserved': 0.0,
+                    'BidRequestAmount': 0.0,
+                    'TotalAvailable': self.balance}
+
+    def list_investments(self):
+        """Get list of active investments."""
+        with self._lock:
+            return [investment for investment in self.investments.values()
+                    if investment['SalesStatus'] is None]
+
+    def list_sold(self):
+        """Get list of sold investments."""
+        with self._lock:
+            return [investment for investment in self.investments.values()
+                    if investment['SalesStatus'] is not None]
+
+    def list_sm(self, show_my_items):
+        """Get list of secondary market items."""
+        with self._lock:
+            return [item for item in self.sm.values()
+                    if item['IsMine'] == show_my_items]
+
+    def list_eventlog(self):
+        """Get list of events."""
+        with self._lock:
+            return list(self.eventlog)
+
+    def list_auctions(self):
+        """Get list of auctions."""
+        return self.auctions
+
+    def loan_parts(self, ids):
+        """Get loan parts by loan part IDs."""
+        with self._lock:
+            return [self.investments[loan_part_id] for loan_part_id in ids
+                    if loan_part_id in self.investments]
+
+    def buy(self, ids):
+        """Buy secondary market items, return list of bought IDs."""
+        bought = []
+        with self._lock:
+            for item_id in ids:
+                item = self.sm.get(item_id)
+                if item is None or item['IsMine'] or \
+                        item['Price'] > self.balance:
+                    continue
+                del self.sm[item_id]
+                self.balance -= item['Price']
+                investment = generate_investment(self.rng, self.today)
+                investment.update({key: item[key] for key in item
+                                   if key in investment})
+                investment['PurchaseDate'] = _date(datetime.now())
+                investment['PurchasePrice'] = item['Price']
+                self.investments[investment['LoanPartId']] = investment
+                bought.append(item_id)
+            self._log('secondmarket.buy', len(bought))
+        return bought
+
+    def sell(self, items):
+        """Offer investments on secondary market, return number of items."""
+        offered = 0
+        with self._lock:
+            for sell_item in items:
+                investment = self.investments.get(sell_item['LoanPartId'])
+                if investment is None or investment['SalesStatus'] is not None:
+                    continue
+                item = generate_sm_item(self.rng, self.today, investment)
+                item['DesiredDiscountRate'] = sell_item['DesiredDiscountRate']
+                item['Price'] = round(item['PrincipalRemaining'] *
+                                      (1.0 + item['DesiredDiscountRate'] /
+                                       100.0), 2)
+                item['IsMine'] = True
+                self.sm[item['Id']] = item
+                offered += 1
+            self._log('secondmarket.sell', offered)
+        return offered
+
+    def cancel(self, ids):
+        """Cancel own secondary market items, return number of items."""
+        cancelled = 0
+        with self._lock:
+            for item_id in ids:
+                item = self.sm.get(item_id)
+                if item is not None and item['IsMine']:
+                    del self.sm[item_id]
+                    cancelled += 1
+            self._log('secondmarket.cancel', cancelled)
+        return cancelled
+
+    def bid(self, bids):
+        """Bid into auctions, return number of bids."""
+        with self._lock:
+            total = sum(bid['Amount'] for bid in bids)
+            if total > self.balance:
+                return 0
+            self.balance -= total
+            self._log('bid', len(bids))
+        return len(bids)
+
+
+class SimulatorServer(ThreadingHTTPServer):
+    """Class representation of local stand-in server of the Bondora API."""
+
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, host=HOST, port=PORT, state=None, latency=0.0,
+                 jitter=0.0, quotas=None):
+        """
+        Initialize the class instance.
+
+        Parameters
+        ----------
+        host : str, optional
+            Host to listen. The default is HOST.
+        port : int, optional
+            Port to listen, 0 for a free port. The default is PORT.
+        state : MarketState object, optional
+            State of the account and market. If None, a new state with
+            generated items is created. The default is None.
+        latency : float, optional
+            Delay of every response in seconds. The default is 0.0.
+        jitter : float, optional
+            Maximal random additional delay in seconds. The default is 0.0.
+        quotas : dict, optional
+            Rate limits {endpoint: (number of requests, period in seconds)}.
+            Requests exceeding the limit get the status code 429.
+            The default is DEFAULT_QUOTAS of the rate limiter.
+
+        Returns
+        -------
+        None.
+
+        """
+        super().__init__((host, port), SimulatorHandler)
+        if state is None:
+            state = MarketState()
+        if quotas is None:
+            quotas = DEFAULT_QUOTAS
+        self.state = state
+        self.latency = latency
+        self.jitter = jitter
+        self.quotas = dict(quotas)
+        self.requests = 0
+        self._windows = {endpoint: deque() for endpoint in self.quotas}
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        """Get URL of the server to pass as `url_api` to the clients."""
+        return 'http://{}:{}'.format(*self.server_address[:2])
+
+    def check_quota(self, endpoint):
+        """
+        Count a request and check the rate limit of the endpoint.
+
+        Parameters
+        ----------
+        endpoint : str
+            Endpoint of the request.
+
+        Returns
+        -------
+        wait_time : int
+            Seconds to wait until the next allowed request,
+            0 if the request is allowed.
+
+        """
+        with self._lock:
+            self.requests += 1
+            if endpoint not in self.quotas:
+                return 0
+            limit, period = self.quotas[endpoint]
+            window = self._windows[endpoint]
+            now = time.monotonic()
+            while window and window[0] <= now - period + QUOTA_TOLERANCE:
+                window.popleft()
+            if len(window) >= limit:
+                return max(1, int(window[0] + period - now + 0.999))
+            window.append(now)
+            return 0
+
+    def start(self):
+        """
+        Serve requests in a background thread.
+
+        Returns
+        -------
+        thread : threading.Thread object
+            Thread serving requests.
+
+        """
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        logger.info('Simulator listening on {}.'.format(self.url))
+        return thread
+
+
+class SimulatorHandler(BaseHTTPRequestHandler):
+    """Class representation of request handler of the simulator."""
+
+    protocol_version = 'HTTP/1.1'
+    # send small responses on keep-alive connections without delay
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        """Do not log every request."""
+
+    def _send(self, status_code, body):
+        """Send JSON response."""
+        content = json.dumps(body).encode('utf-8')
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def _read(self):
+        """Read JSON request body."""
+        length = int(self.headers.get('Content-Length') or 0)
+        if not length:
+            return None
+        return json.loads(self.rfile.read(length))
+
+    def _page(self, items, query):
+        """Filter and paginate items by request parameters."""
+        params = {}
+        for key, values in query.items():
+            # parameters are accepted with and without prefix 'request.'
+            name = key.split('.', 1)[-1]
+            name = name[0].upper() + name[1:]
+            for alias, field in PARAM_FIELDS.items():
+                if name.startswith(alias):
+                    name = field + name[len(alias):]
+            params[name] = [value.lower() for value in values]
+        page_size = min(int(params.pop('PageSize', [PAGE_SIZE])[0]),
+                        MAX_PAGE_SIZE)
+        page_nr = max(int(params.pop('PageNr', [1])[0]), 1)
+        params.pop('ShowMyItems', None)
+        filters = [(name, values) for name, values in params.items()]
+        items = [item for item in items if _matches(item, filters)]
+        start = (page_nr - 1) * page_size
+        return ok_response(items[start:start + page_size],
+                           PageSize=page_size,
+                           PageNr=page_nr,
+                           TotalCount=len(items),
+                           Count=len(items[start:start + page_size]))
+
+    def _handle(self, method):
+        """Route request to endpoint."""
+        server = self.server
+        url = urlsplit(self.path)
+        endpoint = url.path.strip('/')
+        query = parse_qs(url.query)
+        try:
+            content = self._read()
+        except ValueError:
+            return self._send(400, error_response(400, 'Bad request'))
+
+        if server.latency or server.jitter:
+            time.sleep(server.latency + random.uniform(0.0, server.jitter))
+
+        wait_time = server.check_quota(endpoint)
+        if wait_time:
+            return self._send(429, error_response(
+                429, 'Too many requests',
+                'Retry after {} seconds.'.format(wait_time)))
+
+        state = server.state
+        if method == 'GET':
+            if endpoint == api.urls.URL_BONDORA_BALANCE:
+                return self._send(200, ok_response(state.get_balance()))
+            if endpoint == api.urls.URL_BONDORA_INVESTMENTS:
+                sold = any(key.split('.')[-1].lower().startswith('solddate')
+                           for key in query)
+                items = state.list_sold() if sold else \
+                    state.list_investments()
+                return self._send(200, self._page(items, query))
+            if endpoint == api.urls.URL_BONDORA_SM:
+                show_my_items = any(
+                    key.split('.')[-1].lower() == 'showmyitems' and
+                    values[0].lower() == 'true'
+                    for key, values in query.items())
+                return self._send(200, self._page(
+                    state.list_sm(show_my_items), query))
+            if endpoint == api.urls.URL_BONDORA_EVENTLOG:
+                return self._send(200, self._page(state.list_eventlog(),
+                                                  query))
+            if endpoint == api.urls.URL_BONDORA_AUCTIONS:
+                return self._send(200, self._page(state.list_auctions(),
+                                                  query))
+            if endpoint == api.urls.URL_LOAN_PARTS:
+                ids = (content or {}).get('ItemIds') or \
+                    query.get('request.itemIds') or []
+                return self._send(200, ok_response(state.loan_parts(ids)))
+
+        if method == 'POST':
+            content = content or {}
+            if endpoint == api.urls.URL_BONDORA_BUY_SM:
+                ids = content.get('ItemIds', [])
+                bought = state.buy(ids)
+                if ids and not bought:
+                    return self._send(400, error_response(
+                        400, 'Items are not available'))
+                return self._send(202, ok_response(None))
+            if endpoint == api.urls.URL_BONDORA_SELL_SM:
+                state.sell(content.get('Items', []))
+                return self._send(202, ok_response(None))
+            if endpoint == api.urls.URL_BONDORA_CANCEL_SM:
+                state.cancel(content.get('ItemIds', []))
+                return self._send(202, ok_response(None))
+            if endpoint == api.urls.URL_BONDORA_BID_AUCTION:
+                if not state.bid(content.get('Bids', [])):
+                    return self._send(400, error_response(
+                        400, 'Insufficient balance'))
+                return self._send(202, ok_response(None))
+
+        return self._send(404, error_response(404, 'Not found'))
+
+    def do_GET(self):
+        """Handle GET request."""
+        self._handle('GET')
+
+    def do_POST(self):
+        """Handle POST request."""
+        self._handle('POST')
+
+
+def send_webhooks(url, events, workers=8, rate=None):
+    """
+    Send webhook events to the listener.
+
+    Parameters
+    ----------
+    url : str
+        URL of the webhook listener, e.g. 'http://127.0.0.1:5000/webhook'.
+    events : iterable
+        Webhook events, e.g. created by `make_webhook`.
+    workers : int, optional
+        Number of concurrent senders. The default is 8.
+    rate : float, optional
+        Maximal number of events per second. If None, the events are sent
+        as fast as possible. The default is None.
+
+    Returns
+    -------
+    stats : dict
+        Number of sent events, errors, elapsed time, events per second,
+        and latency percentiles in seconds.
+
+    """
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1,
+                                            pool_maxsize=workers)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+
+    def send(event):
+        start = time.monotonic()
+        try:
+            response = session.post(url, json=event, timeout=30)
+            ok = response.status_code == 200
+        except Exception as e:
+            logger.error(e)
+            ok = False
+        latency = time.monotonic() - start
+        with lock:
+            latencies.append(latency)
+            if not ok:
+                errors[0] += 1
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for n, event in enumerate(events):
+            if rate:
+                delay = start + n / rate - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            executor.submit(send, event)
+    elapsed = time.monotonic() - start
+    session.close()
+
+    latencies.sort()
+
+    def percentile(q):
+        if not latencies:
+            return 0.0
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+    return {'sent': len(latencies),
+            'errors': errors[0],
+            'elapsed': elapsed,
+            'rate': len(latencies) / elapsed if elapsed else 0.0,
+            'p50': percentile(0.5),
+            'p99': percentile(0.99)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description='Local stand-in server of the Bondora API.')
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='delay of every response in seconds')
+    parser.add_argument('--jitter', type=float, default=0.0,
+                        help='maximal random additional delay in seconds')
+    parser.add_argument('--no-rate-limit', action='store_true',
+                        help='disable responses with status code 429')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--webhook-url',
+                        help='URL of the webhook listener to send events')
+    parser.add_argument('--webhooks', type=int, default=1000,
+                        help='number of webhook events to send')
+    parser.add_argument('--webhook-rate', type=float,
+                        help='maximal number of webhook events per second')
+    args = parser.parse_args()
+
+    server = SimulatorServer(args.host, args.port,
+                             state=MarketState(seed=args.seed),
+                             latency=args.latency,
+                             jitter=args.jitter,
+                             quotas={} if args.no_rate_limit else None)
+    thread = server.start()
+    try:
+        if args.webhook_url:
+            stats = send_webhooks(
+                args.webhook_url,
+                (make_webhook(server.state.new_sm_item())
+                 for _ in range(args.webhooks)),
+                rate=args.webhook_rate)
+            logger.info('Webhooks: {}'.format(stats))
+        thread.join()
+    except KeyboardInterrupt:
+        server.shutdown()
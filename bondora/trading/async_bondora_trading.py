@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""The file contains the class definition of asynchronous Bondora trading."""
+
+import os
+import sys
+import inspect
+from datetime import date, timedelta
+
+currentdir = os.path.dirname(
+    os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, parentdir)
+
+from setup_logger import logger
+from api.async_bondora_api import AsyncBondoraApi
+from api.bulk import SUCCESS_CODES
+from trading.bondora_trading import (BondoraTrading, paid_before,
+                                     offer_prices, log_bulk_result,
+                                     is_incomplete)
+from trading.rules import RuleEngine, GREEN_RULES, RED_RULES
+from trading.pricing import DEFAULT_CURVE
+from trading.seen_set import SeenSet, SEEN_TTL
+
+
+class AsyncBondoraTrading(AsyncBondoraApi):
+    """Class representation of asynchronous trading on Bondora."""
+
+    def __init__(self, user, dedup_ttl=SEEN_TTL, **kwargs):
+        """
+        Initialize the class instance.
+
+        Parameters
+        ----------
+        user : str
+            Access token.
+        dedup_ttl : float, optional
+            Time in seconds to remember secondary market events and
+            bought items. If None, events are not de-duplicated.
+            The default is SEEN_TTL.
+        **kwargs : dict
+            Keyword arguments passed to `AsyncBondoraApi`
+            (e.g. `session`, `pool_maxsize`, `timeout`).
+
+        Returns
+        -------
+        None.
+
+        """
+        self.user = user
+        # compiled per instance, the statistics are kept per account
+        self.green_rules = RuleEngine(GREEN_RULES)
+        self.red_rules = RuleEngine(RED_RULES)
+        AsyncBondoraApi.__init__(self, self.user, **kwargs)
+        self.seen_events = None
+        self.seen_buys = None
+        if dedup_ttl is not None:
+            self.seen_events = SeenSet(ttl=dedup_ttl)
+            self.seen_buys = SeenSet(ttl=dedup_ttl)
+
+    # de-duplication does not depend on the client
+    is_repeat = BondoraTrading.is_repeat
+    claim_item = BondoraTrading.claim_item
+    release_item = BondoraTrading.release_item
+    dedup_stats = BondoraTrading.dedup_stats
+    _warn_incomplete = BondoraTrading._warn_incomplete
+
+    async def _buy_selected(self, engine, loan):
+        """Buy item selected by rule engine, record outcome."""
+        match = engine.match(loan)
+        if match is None:
+            return None
+        rule, item_id = match
+        if not self.claim_item(item_id):
+            return None
+        response = await self.buy_on_secondarymarket([item_id])
+        bought = response is not None and response.status in SUCCESS_CODES
+        rule.record_buy(bought)
+        if not bought:
+            self.release_item(item_id)
+        return item_id if bought else None
+
+    async def buy_green_loan(self, loan):
+        """
+        Buy green loan on secondary market, if buying conditions are satisfied.
+
+        Parameters
+        ----------
+        loan : dict
+            Loan related data with summary, collection process, and schedules.
+
+        Returns
+        -------
+        None.
+
+        """
+        try:
+            if self.is_repeat(loan, 'green'):
+                return None
+            await self._buy_selected(self.green_rules, loan)
+
+        except Exception:
+            pass
+
+    async def buy_red_loan(self, loan):
+        """
+        Buy red loan on secondary market, if buying conditions are satisfied.
+
+        Parameters
+        ----------
+        loan : dict
+            Loan related data with summary, collection process, and schedules.
+
+        Returns
+        -------
+        None.
+
+        """
+        try:
+            if self.is_repeat(loan, 'red'):
+                return None
+            await self._buy_selected(self.red_rules, loan)
+
+        except Exception:
+            pass
+
+    async def cancel_sm_offers(self, retry=False, last_payment_date=None,
+                               **kwargs):
+        """
+        Cancel selling of own loans offered on secondary market.
+
+        See `BondoraTrading.cancel_sm_offers`.
+
+        Parameters
+        ----------
+        retry : bool, optional
+            Retry to execute the method. The default is False.
+        last_payment_date : str (%Y-%m-%d), optional
+            Last payment date. The default is None.
+        **kwargs : dict
+            Keyword arguments:
+                Loans conditions to cancel.
+
+        Returns
+        -------
+        None.
+
+        """
+        # select only own loans offered on secondary market
+        kwargs['ShowMyItems'] = True
+
+        # get list of secondary market item IDs
+        ids = []
+        found = False
+        offers = self.iter_pages(self.url_sm, retry, **kwargs)
+        async for loan_on_sm in offers:
+            found = True
+            try:
+                # select loans according to the last payment date
+                if paid_before(loan_on_sm, last_payment_date):
+                    ids.append(loan_on_sm['Id'])
+            except Exception as e:
+                logger.error(e)
+
+        # the offers found are cancelled, the rest at the next call
+        if is_incomplete(offers):
+            self._warn_incomplete(self.url_sm)
+        if not found:
+            if not is_incomplete(offers):
+                logger.warning('No loans satisfying provided conditions '
+                               'and offered for selling were found.')
+            return None
+
+        # cancel loans offered on secondary market
+        if ids:
+            result = await self.cancel_on_secondarymarket(ids, retry=retry)
+            log_bulk_result(result,
+                            'canceled on secondary market',
+                            'Error by canceling loans on secondary market.')
+
+    async def place_sm_offers(self, max_price, min_price=None,
+                              days_before_payment=2, retry=False,
+                              last_payment_date=None, curve=DEFAULT_CURVE,
+                              curve_params=None, **kwargs):
+        """
+        Place loans for selling on secondary market.
+
+        See `BondoraTrading.place_sm_offers`.
+
+        Parameters
+        ----------
+        max_price : int
+            Maximal price to sell loan.
+        min_price : int, optional
+            Minimal price to sell loan. The default is None.
+        days_before_payment : int, optional
+            Latest selling date of loans before the next payment.
+            The default is 2.
+        retry : bool, optional
+            Retry to execute the method. The default is False.
+        last_payment_date : str (%Y-%m-%d), optional
+            Last payment date. The default is None.
+        curve : str or callable, optional
+            Price curve between `min_price` and `max_price` (see
+            `trading.pricing`). The default is DEFAULT_CURVE (linear).
+        curve_params : dict, optional
+            Parameters of the price curve. The default is None.
+        **kwargs : dict
+            Keyword arguments:
+                Loans conditions to select for selling.
+
+        Returns
+        -------
+        None.
+
+        """
+        # calculate latest selling date of loans before the next payment
+        latest_sell_date = date.today() + timedelta(days=days_before_payment)
+
+        # get list of loan parts IDs and selling prices
+        pages = self.iter_pages(self.url_investments, retry, **kwargs)
+        investments = [investment async for investment in pages]
+
+        # the investments found are offered, the rest at the next call
+        if is_incomplete(pages):
+            self._warn_incomplete(self.url_investments)
+        if not investments:
+            if not is_incomplete(pages):
+                logger.warning('No loans satisfying provided conditions '
+                               'were found.')
+            return None
+
+        prices, _ = offer_prices(investments, max_price, min_price,
+                                 latest_sell_date, last_payment_date,
+                                 curve, curve_params)
+        part_ids_prices = list(prices.items())
+
+        # sell loans on secondary market
+        if part_ids_prices:
+            result = await self.sell_on_secondarymarket(part_ids_prices,
+                                                        retry=retry)
+            log_bulk_result(result,
+                            'put on secondary market for selling',
+                            'Error by putting loans on secondary market.')
@@ -0,0 +1,413 @@
+# -*- coding: utf-8 -*-
+"""The file contains the backtesting of buy strategies on captured webhooks."""
+
+import os
+import sys
+import json
+import time
+import inspect
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+import requests
+
+currentdir = os.path.dirname(
+    os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, parentdir)
+
+from setup_logger import logger
+from trading.bondora_trading import BondoraTrading, get_sm_payload
+from trading.seen_set import SeenSet
+
+# strategies to replay: buy rules (`buy_loan`), `buy_green_loan`, and
+# `buy_red_loan`
+STRATEGIES = ('rules', 'green', 'red')
+
+# number of bytes of captured events replayed by one task
+CHUNK_BYTES = 64 * 1024 * 1024
+
+
+def capture_line(body, received_on=None):
+    """
+    Create line of captured webhook.
+
+    Parameters
+    ----------
+    body : bytes
+        Raw webhook body.
+    received_on : datetime.datetime, optional
+        Time of receipt. The default is None (now).
+
+    Returns
+    -------
+    line : bytes
+        JSON line {"ReceivedOn": ..., "Event": body}.
+
+    """
+    if received_on is None:
+        received_on = datetime.now()
+    # line breaks are whitespace between JSON tokens
+    body = body.strip().replace(b'\r', b' ').replace(b'\n', b' ')
+    return (b'{"ReceivedOn": "' +
+            received_on.strftime('%Y-%m-%dT%H:%M:%S').encode() +
+            b'", "Event": ' + (body or b'null') + b'}\n')
+
+
+def parse_line(line):
+    """
+    Parse line of captured webhook.
+
+    Lines without time of receipt (a single webhook saved by older
+    versions of the listener) are accepted as well.
+
+    Parameters
+    ----------
+    line : bytes
+        Line of captured webhook.
+
+    Returns
+    -------
+    event : dict or None
+        Webhook event or None, if the line is empty or invalid.
+    received_on : datetime.datetime or None
+        Time of receipt or listing time of the item, if known.
+
+    """
+    line = line.strip()
+    if not line:
+        return None, None
+    try:
+        event = json.loads(line)
+    except ValueError:
+        return None, None
+    if not isinstance(event, dict):
+        return None, None
+    received_on = None
+    if 'Event' in event and 'ReceivedOn' in event:
+        received_on = event['ReceivedOn']
+        event = event['Event']
+        if not isinstance(event, dict):
+            return None, None
+    else:
+        payload = get_sm_payload(event)
+        if payload is not None:
+            received_on = payload.get('ListedInSecondMarketOn')
+    try:
+        received_on = datetime.fromisoformat(received_on[:19])
+    except (TypeError, ValueError):
+        received_on = None
+    return event, received_on
+
+
+class BacktestTrading(BondoraTrading):
+    """Class representation of trading without requests.
+
+    Purchases are recorded instead of sent and always succeed. Items sold
+    to other investors before the webhook was received are counted as
+    bought as well. Seen events and items expire by the time of the
+    replayed events (`event_time`) instead of the time of the replay.
+    """
+
+    def __init__(self, rules=None, **kwargs):
+        """
+        Initialize the class instance.
+
+        Parameters
+        ----------
+        rules : list or str, optional
+            Buy rule definitions or path to JSON file with them.
+            The default is None (DEFAULT_RULES).
+        **kwargs : dict
+            Keyword arguments passed to `BondoraTrading`.
+
+        Returns
+        -------
+        None.
+
+        """
+        BondoraTrading.__init__(self, 'backtest', rules=rules, **kwargs)
+        self.bought = []
+        # time of the replayed event in seconds
+        self.event_time = 0.0
+        if self.seen_events is not None:
+            self.seen_events = SeenSet(ttl=self.seen_events.ttl,
+                                       clock=self._event_clock)
+            self.seen_buys = SeenSet(ttl=self.seen_buys.ttl,
+                                     clock=self._event_clock)
+
+    def _event_clock(self):
+        """Get time of the replayed event in seconds."""
+        return self.event_time
+
+    def rule_stats(self, strategy='rules'):
+        """
+        Get statistics of the rules evaluated by strategy.
+
+        Parameters
+        ----------
+        strategy : str, optional
+            Strategy of STRATEGIES. The default is 'rules'.
+
+        Returns
+        -------
+        stats : dict
+            Statistics by rule name.
+
+        """
+        if strategy == 'rules':
+            return self.rules.stats()
+        return getattr(self, '{}_rules'.format(strategy)).stats()
+
+    def buy_on_secondarymarket(self, ids):
+        """
+        Record purchase of secondary market items.
+
+        Parameters
+        ----------
+        ids : list
+            List of secondary market item IDs to buy.
+
+        Returns
+        -------
+        response : requests.Response object
+            Successful response.
+
+        """
+        self.bought.extend(ids)
+        response = requests.Response()
+        response.status_code = 200
+        return response
+
+
+def split_files(paths, chunk_bytes=CHUNK_BYTES):
+    """
+    Split files of captured webhooks into byte ranges.
+
+    Parameters
+    ----------
+    paths : list
+        Paths of files of captured webhooks.
+    chunk_bytes : int, optional
+        Maximal number of bytes of a range. The default is CHUNK_BYTES.
+
+    Returns
+    -------
+    chunks : list
+        List of tuples (path, start, end). A range contains the lines
+        starting within it.
+
+    """
+    chunks = []
+    for path in paths:
+        size = os.path.getsize(path)
+        for start in range(0, size, chunk_bytes):
+            chunks.append((path, start, min(start + chunk_bytes, size)))
+    return chunks
+
+
+def _iter_lines(path, start, end):
+    """Yield lines of file starting within byte range."""
+    with open(path, 'rb') as infile:
+        position = start
+        if start > 0:
+            # skip the line started in the previous range
+            infile.seek(start - 1)
+            position = start - 1 + len(infile.readline())
+        for line in infile:
+            if position >= end:
+                break
+            position += len(line)
+            yield line
+
+
+def replay_chunk(path, start, end, variants, strategy='rules', today=None):
+    """
+    Replay captured webhooks of byte range through strategies.
+
+    Parameters
+    ----------
+    path : str
+        Path of file of captured webhooks.
+    start : int
+        First byte of the range.
+    end : int
+        Byte after the range.
+    variants : dict
+        Buy rule definitions by variant name.
+    strategy : str, optional
+        Strategy of STRATEGIES. The default is 'rules'.
+    today : datetime.datetime, optional
+        Time of webhooks without time of receipt. The default is None (now).
+
+    Returns
+    -------
+    result : dict
+        Numbers of events and invalid lines, and purchases (list of tuples
+        (time of receipt, item ID, price)) and rule statistics by variant.
+
+    """
+    traders = {name: BacktestTrading(rules) for name, rules
+               in variants.items()}
+    if strategy == 'rules':
+        buy = {name: trading.buy_loan for name, trading in traders.items()}
+    else:
+        buy = {name: getattr(trading, 'buy_{}_loan'.format(strategy))
+               for name, trading in traders.items()}
+    hits = {name: [] for name in traders}
+    events = 0
+    invalid = 0
+    for line in _iter_lines(path, start, end):
+        event, received_on = parse_line(line)
+        if event is None:
+            invalid += line.strip() != b''
+            continue
+        events += 1
+        day = received_on or today
+        event_time = (day or datetime.now()).timestamp()
+        for name, trading in traders.items():
+            trading.event_time = event_time
+            n_bought = len(trading.bought)
+            buy[name](event, day)
+            if len(trading.bought) > n_bought:
+                payload = get_sm_payload(event)
+                hits[name].extend(
+                    (received_on and received_on.isoformat(), item_id,
+                     payload.get('Price'))
+                    for item_id in trading.bought[n_bought:])
+    for trading in traders.values():
+        trading.close()
+    return {'events': events,
+            'invalid': invalid,
+            'variants': {name: {'hits': hits[name],
+                                'rules': trading.rule_stats(strategy)}
+                         for name, trading in traders.items()}}
+
+
+def _merge_stats(total, stats):
+    """Add rule statistics to total."""
+    for name, rule_stats in stats.items():
+        if name not in total:
+            total[name] = {'evaluations': 0, 'matches': 0, 'bought': 0,
+                           'buy_failed': 0, 'elapsed': 0.0,
+                           'rejections': {}}
+        merged = total[name]
+        for key in ('evaluations', 'matches', 'bought', 'buy_failed',
+                    'elapsed'):
+            merged[key] += rule_stats[key]
+        for reason, count in rule_stats['rejections'].items():
+            merged['rejections'][reason] = (
+                merged['rejections'].get(reason, 0) + count)
+        merged['elapsed_avg'] = (merged['elapsed'] / merged['evaluations']
+                                 if merged['evaluations'] else 0.0)
+
+
+class Backtester:
+    """Class representation of backtesting of buy strategies.
+
+    Webhooks captured by the listener are replayed through the strategies
+    of `BondoraTrading` with the time of receipt as current time, so the
+    rules relative to the current date are evaluated as at the receipt.
+    Purchases are recorded instead of sent. The files are split into byte
+    ranges replayed by worker processes, and several variants of buy rules
+    are evaluated in one pass over the events.
+    """
+
+    def __init__(self, variants=None, strategy='rules', workers=None,
+                 chunk_bytes=CHUNK_BYTES, today=None):
+        """
+        Initialize the class instance.
+
+        Parameters
+        ----------
+        variants : dict, optional
+            Buy rule definitions (list or path to JSON file) by variant
+            name. Used by the strategy 'rules' only. The default is None
+            ({'default': DEFAULT_RULES}).
+        strategy : str, optional
+            Strategy of STRATEGIES. The default is 'rules'.
+        workers : int, optional
+            Number of worker processes, 0 to replay in this process.
+            The default is None (number of processors).
+        chunk_bytes : int, optional
+            Number of bytes replayed by one task. The default is
+            CHUNK_BYTES.
+        today : datetime.datetime, optional
+            Time of webhooks without time of receipt. The default is None
+            (now).
+
+        Returns
+        -------
+        None.
+
+        """
+        if strategy not in STRATEGIES:
+            raise ValueError('Unknown strategy: {}'.format(strategy))
+        if strategy != 'rules' or variants is None:
+            variants = {'default' if strategy == 'rules' else strategy: None}
+        self.variants = variants
+        self.strategy = strategy
+        self.workers = workers
+        self.chunk_bytes = chunk_bytes
+        self.today = today
+
+    def run(self, paths):
+        """
+        Replay files of captured webhooks.
+
+        Parameters
+        ----------
+        paths : list or str
+            Paths of files of captured webhooks.
+
+        Returns
+        -------
+        report : dict or None
+            Numbers of events and invalid lines, elapsed time in seconds,
+            events per second, and by variant the bought items (list of
+            tuples (time of receipt, item ID, price) in order of receipt),
+            their number and total price, and rule statistics. Items bought
+            in several ranges or files are reported once. None, if an error
+            occurred.
+
+        """
+        if isinstance(paths, str):
+            paths = [paths]
+        start = time.perf_counter()
+        try:
+            chunks = split_files(paths, self.chunk_bytes)
+            args = [(path, first, end, self.variants, self.strategy,
+                     self.today) for path, first, end in chunks]
+            if self.workers == 0:
+                results = [replay_chunk(*arg) for arg in args]
+            else:
+                with ProcessPoolExecutor(self.workers) as executor:
+                    results = list(executor.map(replay_chunk, *zip(*args)))
+        except Exception as e:
+            logger.error(e)
+            return None
+
+        elapsed = time.perf_counter() - start
+        events = sum(result['events'] for result in results)
+        report = {'events': events,
+                  'invalid': sum(result['invalid'] for result in results),
+                  'elapsed': elapsed,
+                  'throughput': events / elapsed if elapsed else 0.0,
+                  'variants': {}}
+        for name in self.variants:
+            hits = {}
+            rules = {}
+            for result in results:
+                variant = result['variants'][name]
+                for hit in variant['hits']:
+                    # the earliest purchase of an item is reported
+                    first = hits.get(hit[1])
+                    if first is None or (hit[0] or '') < (first[0] or ''):
+                        hits[hit[1]] = hit
+                _merge_stats(rules, variant['rules'])
+            hits = sorted(hits.values(), key=lambda hit: hit[0] or '')
+            report['variants'][name] = {
+                'bought': len(hits),
+                'spent': sum(hit[2] or 0.0 for hit in hits),
+                'items': hits,
+                'rules': rules}
+        return report
@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+"""The file contains the class definition of local balance ledger."""
+
+import os
+import sys
+import time
+import inspect
+import threading
+
+currentdir = os.path.dirname(
+    os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, parentdir)
+
+from setup_logger import logger
+
+# default interval in seconds of reconciliations with the account balance
+RECONCILE_INTERVAL = 60.0
+# shortest interval in seconds of reconciliations after failed purchases
+MIN_RECONCILE_INTERVAL = 5.0
+
+
+class BalanceLedger:
+    """Class representation of local ledger of available balance.
+
+    The ledger is seeded from `get_balance` and updated optimistically:
+    the price of an item is reserved before it is bought, subtracted from
+    the balance, if the item is bought, and released otherwise. Purchases
+    exceeding the available balance less the reservations are skipped
+    without a request. Repayments and sales increase the balance without
+    the ledger knowing it, therefore the ledger is reconciled with the
+    account balance periodically and after purchases failed despite
+    sufficient balance. Until the first reconciliation all purchases are
+    allowed.
+    """
+
+    def __init__(self, api, interval=RECONCILE_INTERVAL,
+                 min_interval=MIN_RECONCILE_INTERVAL, retry=False):
+        """
+        Initialize the class instance.
+
+        Parameters
+        ----------
+        api : BondoraApi object
+            API object to get the account balance.
+        interval : float, optional
+            Interval in seconds of reconciliations. The default is
+            RECONCILE_INTERVAL.
+        min_interval : float, optional
+            Shortest interval in seconds of reconciliations after failed
+            purchases. The default is MIN_RECONCILE_INTERVAL.
+        retry : bool, optional
+            Retry to get the balance, if too many requests.
+            The default is False.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.api = api
+        self.interval = interval
+        self.min_interval = min_interval
+        self.retry = retry
+        self.balance = None
+        self.reserved = {}
+        self.spent = 0.0
+        self.reservations = 0
+        self.skipped = 0
+        self.reconciliations = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def available(self):
+        """Get balance less reservations or None, if not seeded."""
+        with self._lock:
+            if self.balance is None:
+                return None
+            return self.balance - sum(self.reserved.values())
+
+    def seed(self, balance):
+        """
+        Set the balance.
+
+        Parameters
+        ----------
+        balance : float
+            Available balance of the account.
+
+        Returns
+        -------
+        None.
+
+        """
+        with self._lock:
+            self.balance = float(balance)
+
+    def affordable(self, price):
+        """
+        Check if item can be bought from the available balance.
+
+        Parameters
+        ----------
+        price : float or None
+            Price of the item. None is always affordable.
+
+        Returns
+        -------
+        affordable : bool
+            True, if the price does not exceed the available balance.
+
+        """
+        available = self.available
+        return price is None or available is None or price <= available
+
+    def reserve(self, item_id, price):
+        """
+        Reserve price of item before buying it.
+
+        Parameters
+        ----------
+        item_id : str
+            Secondary market item ID.
+        price : float or None
+            Price of the item. If None, nothing is reserved.
+
+        Returns
+        -------
+        reserved : bool
+            False, if the price exceeds the available balance.
+
+        """
+        if price is None:
+            return True
+        with self._lock:
+            if self.balance is not None and price > (
+                    self.balance - sum(self.reserved.values())):
+                self.skipped += 1
+                return False
+            self.reserved[item_id] = price
+            self.reservations += 1
+            return True
+
+    def commit(self, item_id):
+        """
+        Subtract reserved price of bought item from the balance.
+
+        Parameters
+        ----------
+        item_id : str
+            Secondary market item ID.
+
+        Returns
+        -------
+        None.
+
+        """
+        with self._lock:
+            price = self.reserved.pop(item_id, None)
+            if price is None:
+                return
+            self.spent += price
+            if self.balance is not None:
+                self.balance -= price
+
+    def release(self, item_id):
+        """
+        Release reserved price of item, which was not bought.
+
+        A failed purchase of an affordable item may be caused by an
+        outdated balance, therefore a reconciliation is requested.
+
+        Parameters
+        ----------
+        item_id : str
+            Secondary market item ID.
+
+        Returns
+        -------
+        None.
+
+        """
+        with self._lock:
+            if self.reserved.pop(item_id, None) is None:
+                return
+        self._wake.set()
+
+    def reconcile(self):
+        """
+        Reset the balance to the account balance.
+
+        Purchases completed during the request are subtracted again,
+        because the account balance may not include them. The resulting
+        underestimation is corrected by the next reconciliation.
+
+        Returns
+        -------
+        balance : float or None
+            New balance or None, if the balance was not received.
+
+        """
+        spent = self.spent
+        self.api.balance = None
+        self.api.get_balance(self.retry)
+        if self.api.balance is None:
+            return None
+        with self._lock:
+            self.balance = self.api.balance - (self.spent - spent)
+            self.reconciliations += 1
+            return self.balance
+
+    def _run(self):
+        """Reconcile periodically and on request until stopped."""
+        while not self._stop.is_set():
+            start = time.monotonic()
+            try:
+                self.reconcile()
+            except Exception as e:
+                logger.error(e)
+            if self._wake.wait(self.interval):
+                self._wake.clear()
+                # failed purchases in a row cause one reconciliation
+                self._stop.wait(self.min_interval -
+                                (time.monotonic() - start))
+
+    def start(self):
+        """
+        Reconcile in a background thread, first immediately.
+
+        Returns
+        -------
+        None.
+
+        """
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop the reconciliations.
+
+        Returns
+        -------
+        None.
+
+        """
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join()
+        self._thread = None
+
+    def stats(self):
+        """
+        Get statistics of the ledger.
+
+        Returns
+        -------
+        stats : dict
+            Balance, reserved amount, amount spent, numbers of reservations,
+            skipped purchases, and reconciliations.
+
+        """
+        with self._lock:
+            return {'balance': self.balance,
+                    'reserved': sum(self.reserved.values()),
+                    'spent': self.spent,
+                    'reservations': self.reservations,
+                    'skipped': self.skipped,
+                    'reconciliations': self.reconciliations}
@@ -0,0 +1,306 @@
+# -*- coding: utf-8 -*-
+"""The file contains the vectorized evaluation of buy rules."""
+
+import os
+import sys
+import time
+import inspect
+import operator
+import numpy as np
+
+currentdir = os.path.dirname(
+    os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, parentdir)
+
+from trading.rules import (COMPARISONS, FUNCTIONS, SM_EVENT_TYPES,
+                           _date_string)
+
+# vectorized comparison operators
+OPERATORS = dict(zip(COMPARISONS, (operator.eq, operator.ne, operator.lt,
+                                   operator.le, operator.gt, operator.ge)))
+
+
+def _is_number(value):
+    """Check if value is compared as number."""
+    return (isinstance(value, (int, float)) and
+            not isinstance(value, bool))
+
+
+def _compare(compare, value, bound):
+    """Compare value with bound, return 1 if satisfied, -1 on error."""
+    if value is None:
+        return 0
+    try:
+        return 1 if compare(value, bound) else 0
+    except TypeError:
+        return -1
+
+
+def _to_number(value):
+    """Convert value to float, NaN if it is not a number."""
+    return float(value) if isinstance(value, (int, float)) else np.nan
+
+
+class Columns:
+    """Class representation of columns of secondary market items.
+
+    Columns are extracted on demand, only for the fields used by the rules.
+    Columns of all items are cached and shared by the rules, columns of
+    the items left by previous conditions are extracted for these items
+    only, so selective conditions checked first reduce the extraction.
+    """
+
+    def __init__(self, items):
+        """
+        Initialize the class instance.
+
+        Parameters
+        ----------
+        items : list
+            Secondary market items (dictionaries or records).
+
+        Returns
+        -------
+        None.
+
+        """
+        self.items = items
+        self.size = len(items)
+        self._columns = {}
+
+    def values(self, field, positions):
+        """Get list of raw values of field of items at positions."""
+        items = self.items
+        if len(positions) < self.size:
+            column = self._columns.get((field, 'values'))
+            if column is not None:
+                return [column[position] for position in positions]
+            return [items[position].get(field) for position in positions]
+        return self._column(field, 'values',
+                            lambda: [item.get(field) for item in items])
+
+    def _column(self, field, kind, build):
+        """Get cached column of all items."""
+        key = (field, kind)
+        column = self._columns.get(key)
+        if column is None:
+            column = self._columns[key] = build()
+        return column
+
+    def _convert(self, field, positions, kind, convert):
+        """Get converted column of items at positions."""
+        if len(positions) < self.size:
+            return convert(self.values(field, positions))
+        return self._column(field, kind,
+                            lambda: convert(self.values(field, positions)))
+
+    def numbers(self, field, positions):
+        """Get float array of field, NaN for missing and other values."""
+        return self._convert(field, positions, 'numbers', _numbers)
+
+    def truth(self, field, positions):
+        """Get boolean array of truth values of field."""
+        return self._convert(field, positions, 'truth', _truth)
+
+    def dates(self, field, positions):
+        """Get array of '%Y-%m-%d' strings of field, '' for empty."""
+        return self._convert(field, positions, 'dates', _dates)
+
+
+def _numbers(values):
+    """Convert values to float array, NaN for missing and other values."""
+    try:
+        return np.array(values, dtype=float)
+    except (TypeError, ValueError):
+        return np.array([_to_number(value) for value in values],
+                        dtype=float)
+
+
+def _truth(values):
+    """Convert values to boolean array of their truth values."""
+    return np.fromiter(map(bool, values), dtype=bool, count=len(values))
+
+
+def _dates(values):
+    """Convert values to array of '%Y-%m-%d' strings, '' for empty."""
+    return np.array([_date_string(value) if value else ''
+                     for value in values], dtype='U10')
+
+
+def condition_mask(condition, columns, positions, bound):
+    """
+    Evaluate scalar or date condition for items.
+
+    Parameters
+    ----------
+    condition : Condition object
+        Condition of a rule.
+    columns : Columns object
+        Columns of the items.
+    positions : numpy.ndarray
+        Positions of the items to check.
+    bound : str or None
+        Date threshold of date conditions.
+
+    Returns
+    -------
+    mask : numpy.ndarray
+        Boolean array of the items at `positions`, True, if the condition
+        is satisfied, or int8 array with 1, if the condition is satisfied,
+        0, if not, and -1 on error.
+
+    """
+    op = condition.op
+    field = condition.field
+    size = len(positions)
+    if op in COMPARISONS:
+        if _is_number(condition.value):
+            values = columns.numbers(field, positions)
+            # NaN (missing value) does not satisfy any comparison
+            with np.errstate(invalid='ignore'):
+                return OPERATORS[op](values, condition.value) & ~np.isnan(
+                    values)
+        compare = OPERATORS[op]
+        return np.fromiter((_compare(compare, value, condition.value)
+                            for value in columns.values(field, positions)),
+                           dtype=np.int8, count=size)
+    if op in ('in', 'not in'):
+        inside = np.fromiter((value in condition.value
+                              for value in columns.values(field, positions)),
+                             dtype=bool, count=size)
+        return inside if op == 'in' else ~inside
+    if op == 'empty':
+        return ~columns.truth(field, positions)
+    if op == 'not empty':
+        return columns.truth(field, positions)
+    # before_days, after_days
+    values = columns.dates(field, positions)
+    compare = np.less if op == 'before_days' else np.greater
+    return (values != '') & compare(values, bound)
+
+
+def _check_function(condition, item, day):
+    """Check function condition for one item, return -1 on error."""
+    try:
+        return 1 if FUNCTIONS[condition.field](item, day,
+                                               **condition.value) else 0
+    except Exception:
+        return -1
+
+
+def rule_mask(rule, columns, day, alive=None):
+    """
+    Evaluate rule for all items and update its statistics.
+
+    The conditions are checked in the order of the rule, each one for the
+    items satisfying all previous conditions. Scalar and date conditions
+    are evaluated vectorized, function conditions item by item.
+
+    Parameters
+    ----------
+    rule : Rule object
+        Compiled buy rule.
+    columns : Columns object
+        Columns of the items.
+    day : datetime.date
+        Current date.
+    alive : numpy.ndarray, optional
+        Boolean array of the items to check. The default is None (all).
+
+    Returns
+    -------
+    mask : numpy.ndarray
+        Boolean array, True, if the rule is satisfied.
+
+    """
+    start = time.perf_counter()
+    if day != rule.day:
+        rule._set_day(day)
+    if alive is None:
+        positions = np.arange(columns.size)
+    else:
+        positions = np.flatnonzero(alive)
+    n_checked = len(positions)
+    rejected = [0] * len(rule.rejected)
+    for index, condition in enumerate(rule.conditions):
+        if not len(positions):
+            break
+        if condition.op == 'function':
+            mask = np.fromiter((_check_function(condition,
+                                                columns.items[position], day)
+                                for position in positions),
+                               dtype=np.int8, count=len(positions))
+        else:
+            try:
+                mask = condition_mask(condition, columns, positions,
+                                      rule.bounds.get(index))
+            except Exception:
+                # the error is counted in the last slot (index -1)
+                rejected[-1] += len(positions)
+                positions = positions[:0]
+                break
+        if mask.dtype != bool:
+            # the errors are counted in the last slot (index -1)
+            errors = int((mask < 0).sum())
+            rejected[-1] += errors
+            mask = mask > 0
+            rejected[index] -= errors
+        rejected[index] += len(positions) - int(mask.sum())
+        positions = positions[mask]
+    alive = np.zeros(columns.size, dtype=bool)
+    alive[positions] = True
+    rule.add_counts(n_checked, len(positions), rejected,
+                    time.perf_counter() - start)
+    return alive
+
+
+def evaluate_batch(engine, items, today=None,
+                   event_type=SM_EVENT_TYPES[0]):
+    """
+    Check buy rules for list of secondary market items.
+
+    The result equals calling `engine.match` for every item wrapped in an
+    event of `event_type`, but the rules are evaluated on columns of all
+    items at once.
+
+    Parameters
+    ----------
+    engine : RuleEngine object
+        Buy rules.
+    items : list
+        Secondary market items (dictionaries or records), e.g. pages of
+        `get_secondarymarket`.
+    today : datetime.datetime or datetime.date, optional
+        Current time. The default is None (now).
+    event_type : str, optional
+        Event type of the items. The default is 'secondmarket.published'.
+
+    Returns
+    -------
+    matches : list
+        List of tuples (rule name, item ID) of items satisfying any rule
+        in order of the items. The first satisfied rule is reported.
+
+    """
+    if not isinstance(items, list):
+        items = list(items)
+    columns = Columns(items)
+    day = engine.clock(today)
+    # items not matched by previous rules
+    remaining = np.ones(columns.size, dtype=bool)
+    names = np.empty(columns.size, dtype=object)
+    for rule in engine.rules:
+        if event_type not in rule.event_types:
+            n_remaining = int(remaining.sum())
+            rejected = [0] * len(rule.rejected)
+            rejected[-2] = n_remaining
+            rule.add_counts(n_remaining, 0, rejected)
+            continue
+        matched = rule_mask(rule, columns, day, remaining)
+        names[matched] = rule.name
+        remaining &= ~matched
+        if not remaining.any():
+            break
+    return [(names[position], items[position].get('Id'))
+            for position in np.flatnonzero(~remaining)]
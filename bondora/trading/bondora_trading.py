@@ -5,7 +5,6 @@ import os
 import sys
 import inspect
 import urllib3
-import time
 from datetime import date, datetime, timedelta
 
 currentdir = os.path.dirname(
@@ -14,19 +13,441 @@ parentdir = os.path.dirname(currentdir)
 sys.path.insert(0, parentdir)
 
 from setup_logger import logger
-from api.bondora_api import BondoraApi
+from api.bondora_api import BondoraApi, DEFAULT_PAGE_SIZE
+from api.records import parse_date
+from api.bulk import SUCCESS_CODES, CHUNK_SIZE
+from trading.rules import (RuleEngine, GREEN_RULES, RED_RULES,
+                           SM_EVENT_TYPES)
+from trading.batch_rules import evaluate_batch
+from trading.buy_aggregator import BuyAggregator
+from trading.pricing import PricingEngine, DEFAULT_CURVE
+from trading.seen_set import SeenSet, SEEN_TTL, event_key
+from trading.balance_ledger import BalanceLedger, RECONCILE_INTERVAL
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 PATH_DATA = '/var/www/flask/bondora'
 
+# maximal difference of equal prices of offers
+PRICE_TOLERANCE = 1e-6
+
+
+def get_sm_payload(loan):
+    """
+    Get payload of secondary market event.
+
+    Parameters
+    ----------
+    loan : dict
+        Webhook event.
+
+    Returns
+    -------
+    payload : dict or None
+        Payload of the event or None, if it is not a secondary market event.
+
+    """
+    if 'EventType' not in loan:
+        return None
+    if loan['EventType'] not in SM_EVENT_TYPES:
+        return None
+    return loan['Payload']
+
+
+def log_bulk_result(result, success, error):
+    """
+    Log result of bulk operation.
+
+    Parameters
+    ----------
+    result : BulkResult object or None
+        Result of bulk operation.
+    success : str
+        Description of successful operation.
+    error : str
+        Error message.
+
+    Returns
+    -------
+    None.
+
+    """
+    if result is None:
+        logger.error(error)
+        return None
+
+    n_succeeded = len(result.succeeded_ids)
+    if n_succeeded == 1:
+        logger.info('1 loan was successfully {}.'.format(success))
+    elif n_succeeded > 1:
+        logger.info(' {} loans were successfully {}.'
+                    .format(n_succeeded, success))
+
+    if not result.ok:
+        logger.error('{} Failed {} of {} chunks ({} loans). Error code: {}'
+                     .format(error, len(result.failed), len(result.chunks),
+                             len(result.failed_ids), result.status_code))
+
+
+def is_incomplete(items):
+    """
+    Check if items of paginated endpoint are truncated by a failed page.
+
+    Parameters
+    ----------
+    items : iterable
+        Consumed items, e.g. PageIterator object.
+
+    Returns
+    -------
+    incomplete : bool
+        True, if a page failed. Other iterables are complete.
+
+    """
+    return getattr(items, 'complete', True) is False
+
+
+def paid_before(loan, last_payment_date):
+    """
+    Check if the last payment of loan was before `last_payment_date`.
+
+    Parameters
+    ----------
+    loan : dict or Record object
+        Investment or secondary market item.
+    last_payment_date : str (%Y-%m-%d), datetime.date, or None
+        Last payment date. If None, all loans are accepted.
+
+    Returns
+    -------
+    bool
+        True, if the loan has no payments since `last_payment_date`.
+
+    """
+    if last_payment_date and loan['LastPaymentDate']:
+        return (parse_date(loan['LastPaymentDate']) <
+                parse_date(last_payment_date))
+    return True
+
+
+def offer_prices(investments, max_price, min_price, latest_sell_date,
+                 last_payment_date=None, curve=DEFAULT_CURVE,
+                 curve_params=None):
+    """
+    Calculate selling prices of investments.
+
+    The prices of all investments are computed at once by PricingEngine.
+
+    Parameters
+    ----------
+    investments : iterable
+        Investments (dictionaries or records).
+    max_price : int
+        Maximal price to sell loan.
+    min_price : int or None
+        Minimal price to sell loan.
+    latest_sell_date : datetime.date
+        Latest selling date of loans before the next payment.
+    last_payment_date : str (%Y-%m-%d), datetime.date, or None, optional
+        Only loans without payments since this date are sold.
+        The default is None.
+    curve : str or callable, optional
+        Price curve between `min_price` and `max_price` (see
+        `trading.pricing`). The default is DEFAULT_CURVE (linear).
+    curve_params : dict, optional
+        Parameters of the price curve. The default is None.
+
+    Returns
+    -------
+    prices : dict
+        Selling price by loan part ID of the loans to sell.
+    scope : set
+        Loan part IDs of all investments.
+
+    """
+    engine = PricingEngine(max_price, min_price, curve,
+                           **(curve_params or {}))
+    return engine.price_investments(investments, latest_sell_date,
+                                    last_payment_date)
+
+
+def diff_sm_offers(prices, scope, offers):
+    """
+    Compare selling prices with current offers on secondary market.
+
+    Parameters
+    ----------
+    prices : dict
+        Selling price by loan part ID of the loans to sell.
+    scope : set
+        Loan part IDs, which offers are managed. Offers of other loans
+        are kept.
+    offers : iterable
+        Own secondary market items.
+
+    Returns
+    -------
+    cancel_ids : list
+        Secondary market item IDs of offers not to sell or to reprice.
+    to_sell : list
+        Tuples (LoanPartId, price) of new and repriced offers.
+    n_unchanged : int
+        Number of offers with the right price.
+
+    """
+    listed = {}
+    cancel_ids = []
+    for offer in offers:
+        part_id = offer['LoanPartId']
+        if part_id not in scope:
+            continue
+        price = prices.get(part_id)
+        if (price is None or part_id in listed or
+                offer['DesiredDiscountRate'] is None or
+                abs(offer['DesiredDiscountRate'] - price) > PRICE_TOLERANCE):
+            # stale, duplicated, or mispriced offer
+            cancel_ids.append(offer['Id'])
+        else:
+            listed[part_id] = price
+    to_sell = [(part_id, price) for part_id, price in prices.items()
+               if part_id not in listed]
+    return cancel_ids, to_sell, len(listed)
+
 
 class BondoraTrading(BondoraApi):
     """Class representation of trading on Bondora."""
 
-    def __init__(self, user):
+    def __init__(self, user, rules=None, buy_window=None,
+                 buy_batch_size=CHUNK_SIZE, dedup_ttl=SEEN_TTL,
+                 balance_ledger=False, reconcile_interval=RECONCILE_INTERVAL,
+                 **kwargs):
+        """
+        Initialize the class instance.
+
+        Parameters
+        ----------
+        user : str
+            Access token.
+        rules : list or str, optional
+            Buy rule definitions or path to JSON file with them
+            (see `trading.rules`). The default is None (DEFAULT_RULES).
+        buy_window : float, optional
+            Time in seconds to collect items to buy with one request.
+            If None, every item is bought immediately with its own
+            request. The default is None.
+        buy_batch_size : int, optional
+            Maximal number of items bought with one request.
+            The default is CHUNK_SIZE.
+        dedup_ttl : float, optional
+            Time in seconds to remember secondary market events and
+            bought items. Repeated events of the same item version are
+            not evaluated, and an item is not bought twice. If None,
+            events are not de-duplicated. The default is SEEN_TTL.
+        balance_ledger : bool, optional
+            Keep local ledger of the available balance and skip purchases
+            exceeding it. The default is False.
+        reconcile_interval : float, optional
+            Interval in seconds of reconciliations of the ledger with the
+            account balance. The default is RECONCILE_INTERVAL.
+        **kwargs : dict
+            Keyword arguments passed to `BondoraApi`
+            (e.g. `session`, `pool_maxsize`, `timeout`).
+
+        Returns
+        -------
+        None.
+
+        """
         self.user = user
-        BondoraApi.__init__(self, self.user)
+        self.rules = RuleEngine(rules)
+        # compiled per instance, the statistics are kept per account
+        self.green_rules = RuleEngine(GREEN_RULES)
+        self.red_rules = RuleEngine(RED_RULES)
+        BondoraApi.__init__(self, self.user, **kwargs)
+        self.buyer = None
+        if buy_window is not None:
+            self.buyer = BuyAggregator(self, window=buy_window,
+                                       max_batch=buy_batch_size)
+        self.seen_events = None
+        self.seen_buys = None
+        if dedup_ttl is not None:
+            self.seen_events = SeenSet(ttl=dedup_ttl)
+            self.seen_buys = SeenSet(ttl=dedup_ttl)
+        self.ledger = None
+        if balance_ledger:
+            self.ledger = BalanceLedger(self, interval=reconcile_interval)
+            self.ledger.start()
+
+    def close(self):
+        """
+        Buy pending items, close the session and release connections.
+
+        Returns
+        -------
+        None.
+
+        """
+        if self.buyer is not None:
+            self.buyer.close()
+            self.buyer = None
+        if self.ledger is not None:
+            self.ledger.stop()
+        BondoraApi.close(self)
+
+    def is_repeat(self, loan, strategy=None):
+        """
+        Check if the same version of secondary market item was seen.
+
+        Every strategy remembers its own events, so the same event can be
+        checked by several strategies (e.g. `buy_red_loan` and
+        `buy_green_loan`).
+
+        Parameters
+        ----------
+        loan : dict
+            Webhook event.
+        strategy : str, optional
+            Name of the strategy checking the event. The default is None
+            (buy rules of `buy_loan`).
+
+        Returns
+        -------
+        repeat : bool
+            True, if the event repeats a seen event.
+
+        """
+        if self.seen_events is None:
+            return False
+        payload = get_sm_payload(loan)
+        if payload is None:
+            return False
+        key = event_key(payload)
+        if strategy is not None:
+            key = (strategy,) + key
+        return not self.seen_events.add(key)
+
+    def claim_item(self, item_id):
+        """
+        Claim secondary market item to buy.
+
+        Parameters
+        ----------
+        item_id : str
+            Secondary market item ID.
+
+        Returns
+        -------
+        claimed : bool
+            False, if the item is already bought or being bought.
+
+        """
+        if self.seen_buys is None:
+            return True
+        return self.seen_buys.add(item_id)
+
+    def release_item(self, item_id):
+        """
+        Release claimed item after failed purchase to allow a new attempt.
+
+        Parameters
+        ----------
+        item_id : str
+            Secondary market item ID.
+
+        Returns
+        -------
+        None.
+
+        """
+        if self.seen_buys is not None:
+            self.seen_buys.discard(item_id)
+
+    def can_afford(self, price):
+        """
+        Check if item can be bought from the available balance.
+
+        The check uses the local ledger without a request.
+
+        Parameters
+        ----------
+        price : float or None
+            Price of the item.
+
+        Returns
+        -------
+        affordable : bool
+            True, if the price does not exceed the available balance or
+            the balance is not tracked.
+
+        """
+        return self.ledger is None or self.ledger.affordable(price)
+
+    def reserve_item(self, item_id, price):
+        """
+        Claim secondary market item and reserve its price to buy it.
+
+        Parameters
+        ----------
+        item_id : str
+            Secondary market item ID.
+        price : float or None
+            Price of the item. If None, the balance is not checked.
+
+        Returns
+        -------
+        reserved : bool
+            False, if the item is already bought or being bought or its
+            price exceeds the available balance.
+
+        """
+        if not self.claim_item(item_id):
+            return False
+        if self.ledger is not None and not self.ledger.reserve(item_id,
+                                                               price):
+            self.release_item(item_id)
+            return False
+        return True
+
+    def settle_item(self, item_id, bought):
+        """
+        Record outcome of purchase of reserved item.
+
+        Parameters
+        ----------
+        item_id : str
+            Secondary market item ID.
+        bought : bool
+            True, if the item was bought. Otherwise the item and its price
+            are released.
+
+        Returns
+        -------
+        None.
+
+        """
+        if self.ledger is not None:
+            if bought:
+                self.ledger.commit(item_id)
+            else:
+                self.ledger.release(item_id)
+        if not bought:
+            self.release_item(item_id)
+
+    def dedup_stats(self):
+        """
+        Get de-duplication statistics.
+
+        Returns
+        -------
+        stats : dict or None
+            Statistics of seen events and bought items or None, if
+            the events are not de-duplicated.
+
+        """
+        if self.seen_events is None:
+            return None
+        return {'events': self.seen_events.stats(),
+                'buys': self.seen_buys.stats()}
 
     def bid_loan(self, auction):
         """
@@ -66,7 +487,99 @@ class BondoraTrading(BondoraApi):
         except Exception as e:
             logger.error(e)
 
-    def buy_green_loan(self, loan):
+    def buy_loan(self, loan, today=None):
+        """
+        Buy loan on secondary market, if any buy rule is satisfied.
+
+        Parameters
+        ----------
+        loan : dict
+            Loan related data with summary, collection process, and schedules.
+        today : datetime.datetime or datetime.date, optional
+            Current time. The default is None (now).
+
+        Returns
+        -------
+        item_id : str or None
+            Secondary market item ID to buy or None. If the items are
+            bought in batches, the item is submitted and bought later.
+
+        """
+        try:
+            if self.is_repeat(loan):
+                return None
+            match = self.rules.match(loan, today)
+            if match is None:
+                return None
+            return self.buy_item(*match, get_sm_payload(loan).get('Price'))
+
+        except Exception as e:
+            logger.error(e)
+
+    def buy_item(self, rule, item_id, price=None):
+        """
+        Buy secondary market item selected by a buy rule.
+
+        Parameters
+        ----------
+        rule : Rule object
+            Buy rule, which selected the item. It records the outcome.
+        item_id : str
+            Secondary market item ID.
+        price : float, optional
+            Price of the item to check the available balance.
+            The default is None.
+
+        Returns
+        -------
+        item_id : str or None
+            Secondary market item ID or None, if the item is already bought
+            or being bought, it cannot be afforded, or the purchase failed.
+            If the items are bought in batches, the item is submitted and
+            bought later.
+
+        """
+        try:
+            if not self.reserve_item(item_id, price):
+                return None
+
+            # buy in batch, record outcome when the batch is sent
+            if self.buyer is not None:
+                self.buyer.submit(item_id).add_done_callback(
+                    lambda future: self._record_buy(
+                        rule, item_id,
+                        not future.exception() and future.result()))
+                return item_id
+
+            response = self.buy_on_secondarymarket([item_id])
+            bought = (response is not None and
+                      response.status_code in SUCCESS_CODES)
+            self._record_buy(rule, item_id, bought)
+            return item_id if bought else None
+
+        except Exception as e:
+            logger.error(e)
+
+    def _record_buy(self, rule, item_id, bought):
+        """Record outcome of purchase, release item, if not bought."""
+        rule.record_buy(bought)
+        self.settle_item(item_id, bought)
+
+    def _buy_selected(self, engine, loan, today):
+        """Buy item selected by rule engine immediately, record outcome."""
+        match = engine.match(loan, today)
+        if match is None:
+            return None
+        rule, item_id = match
+        if not self.reserve_item(item_id, get_sm_payload(loan).get('Price')):
+            return None
+        response = self.buy_on_secondarymarket([item_id])
+        bought = (response is not None and
+                  response.status_code in SUCCESS_CODES)
+        self._record_buy(rule, item_id, bought)
+        return item_id if bought else None
+
+    def buy_green_loan(self, loan, today=None):
         """
         Buy green loan on secondary market, if buying conditions are satisfied.
 
@@ -74,71 +587,24 @@ class BondoraTrading(BondoraApi):
         ----------
         loan : dict
             Loan related data with summary, collection process, and schedules.
+        today : datetime.datetime or datetime.date, optional
+            Current time. The default is None (now).
 
         Returns
         -------
         None.
 
         """
-        loan_selector = False
         try:
-            # get payload
-            if 'EventType' not in loan:
+            if self.is_repeat(loan, 'green'):
                 return None
-            else:
-                if loan['EventType'] not in ['secondmarket.published',
-                                             'secondmarket.updated']:
-                    return None
-                else:
-                    payload = loan['Payload']
-
-            # check buying conditions
-            today = datetime.now()
-            next_pm_date = date.fromisoformat(payload['NextPaymentDate'][:10])
-            pm_date_min = (today + timedelta(days=7)).date()
-            loan_selector = (
-                payload['NextPaymentNr'] == 1
-                and
-                (payload['DesiredDiscountRate'] <= 0.0 or
-                 (payload['DesiredDiscountRate'] <= 0.0 and
-                  payload['Country'] == 'EE'))
-                and
-                payload['LoanStatusCode'] == 2
-                and
-                not payload['ReScheduledOn']
-                and
-                not payload['DebtOccuredOn']
-                and
-                not payload['DebtOccuredOnForSecondary']
-                and
-                payload['LateAmountTotal'] == 0.0
-                and
-                payload['Amount'] <= 5.0
-                and
-                payload['Interest'] > 18.0
-                and
-                payload['NrOfScheduledPayments'] > 36
-                and
-                next_pm_date > pm_date_min
-                )
-
-            if loan_selector:
-                self.buy_on_secondarymarket([payload['Id']])
-                #with open(PATH_DATA + '/buy_green_{}.log'.format(
-                #        self.user[0:5]), 'a') as outfile:
-                #    outfile.write(
-                #        (today + timedelta(seconds=0*60*60)
-                #         ).strftime('%d.%m.%Y %H:%M:%S') + ': Try to invest ' +
-                #        str(payload['Price']) +
-                #        ' EUR in ' + payload['LoanPartId'] +
-                #        ' on the secondary market with discount ' +
-                #        str(payload['DesiredDiscountRate']) + '\n')
+            self._buy_selected(self.green_rules, loan, today)
 
         except Exception as e:
             #logger.error(e)
             pass
 
-    def buy_red_loan(self, loan):
+    def buy_red_loan(self, loan, today=None):
         """
         Buy red loan on secondary market, if buying conditions are satisfied.
 
@@ -146,105 +612,99 @@ class BondoraTrading(BondoraApi):
         ----------
         loan : dict
             Loan related data with summary, collection process, and schedules.
+        today : datetime.datetime or datetime.date, optional
+            Current time. The default is None (now).
 
         Returns
         -------
         None.
 
         """
-        loan_selector_1 = False
-        loan_selector_2 = False
         try:
-            # get payload
-            if 'EventType' not in loan:
-                return None
-            else:
-                if loan['EventType'] not in ['secondmarket.published',
-                                             'secondmarket.updated']:
-                    return None
-                else:
-                    payload = loan['Payload']
-
-            today = datetime.now()
-            # check buying conditions 1
-            loan_selector_1 = (
-                payload['DesiredDiscountRate'] <= -94.0
-                and
-                payload['Price'] <= 5.0
-                )
-
-            if loan_selector_1:
-                self.buy_on_secondarymarket([payload['Id']])
-                #with open(PATH_DATA + '/buy_red_{}.log'.format(
-                #        self.user[0:5]), 'a') as outfile:
-                #    outfile.write(
-                #        (today + timedelta(seconds=0*60*60)
-                #         ).strftime('%d.%m.%Y %H:%M:%S') + ': Try to invest ' +
-                #        'with with discount at least 94% ' +
-                #        str(payload['Price']) +
-                #        ' EUR in ' + payload['LoanPartId'] +
-                #        ' on the secondary market with discount ' +
-                #        str(payload['DesiredDiscountRate']) + '\n')
+            if self.is_repeat(loan, 'red'):
                 return None
-
-            # check buying conditions 2
-            if payload['DesiredDiscountRate'] > -69.0:
-                return None
-            loan_selector_2 = (
-                # default at least 90 days ago
-                date.fromisoformat(payload['DebtOccuredOn'][:10]) <
-                (today - timedelta(days=90)).date()
-                and
-                # last payment after last event
-                date.fromisoformat(
-                    payload['DebtManagmentEvents'][1]['CreatedOn'][:10]) <
-                date.fromisoformat(payload['LoanTransfers'][-1]['Date'][:10])
-                and
-                # at leat 3 payment within last 90 days
-                date.fromisoformat(payload['LoanTransfers'][-1]['Date'][:10]) >
-                (today - timedelta(days=90)).date()
-                and
-                date.fromisoformat(payload['LoanTransfers'][-2]['Date'][:10]) >
-                (today - timedelta(days=90)).date()
-                and
-                date.fromisoformat(payload['LoanTransfers'][-3]['Date'][:10]) >
-                (today - timedelta(days=90)).date()
-                and
-                # payment p.a. is larger than 19% (last payment)
-                (12.0 * payload['LoanTransfers'][-1]['TotalAmount'] /
-                 (payload['PrincipalRemaining'] *
-                  (1.0 + payload['DesiredDiscountRate'] / 100.0))) > 0.19
-                and
-                # payment p.a. is larger than 19% (second last payment)
-                (12.0 * payload['LoanTransfers'][-2]['TotalAmount'] /
-                 (payload['PrincipalRemaining'] *
-                  (1.0 + payload['DesiredDiscountRate'] / 100.0))) > 0.19
-                and
-                # payment p.a. is larger than 19% (third last payment)
-                (12.0 * payload['LoanTransfers'][-3]['TotalAmount'] /
-                 (payload['PrincipalRemaining'] *
-                  (1.0 + payload['DesiredDiscountRate'] / 100.0))) > 0.19
-                and
-                payload['Price'] <= 5.0
-                )
-
-            if loan_selector_2:
-                self.buy_on_secondarymarket([payload['Id']])
-                #with open(PATH_DATA + '/buy_red_{}.log'.format(
-                #        self.user[0:5]), 'a') as outfile:
-                #    outfile.write(
-                #        (today + timedelta(seconds=0*60*60)
-                #         ).strftime('%d.%m.%Y %H:%M:%S') + ': Try to invest ' +
-                #        'with with discount at least 69% ' +
-                #        str(payload['Price']) +
-                #        ' EUR in ' + payload['LoanPartId'] +
-                #        ' on the secondary market with discount ' +
-                #        str(payload['DesiredDiscountRate']) + '\n')
+            self._buy_selected(self.red_rules, loan, today)
 
         except Exception as e:
             #logger.error(e)
             pass
 
+    def scan_secondarymarket(self, retry=False, page_size=DEFAULT_PAGE_SIZE,
+                             today=None, buy=False, **kwargs):
+        """
+        Check buy rules for all active secondary market items.
+
+        The items of all pages are evaluated at once by vectorized
+        evaluation of the rules (see `trading.batch_rules`).
+
+        Parameters
+        ----------
+        retry : bool, optional
+            Retry to execute the method. The default is False.
+        page_size : int, optional
+            Number of items per page. The default is DEFAULT_PAGE_SIZE.
+        today : datetime.datetime or datetime.date, optional
+            Current time. The default is None (now).
+        buy : bool, optional
+            Buy the items satisfying any rule. The default is False.
+        **kwargs : dict
+            Keyword arguments:
+                Request information (see
+                https://api.bondora.com/doc/Api/GET-api-v1-secondarymarket?v=1).
+
+        Returns
+        -------
+        matches : list or None
+            List of tuples (rule name, item ID) of items satisfying any
+            rule or None, if an error occurred.
+
+        """
+        try:
+            pages = self.iter_secondarymarket(retry, page_size, **kwargs)
+            items = list(pages)
+            if is_incomplete(pages):
+                self._warn_incomplete(self.url_sm)
+            matches = evaluate_batch(self.rules, items, today)
+            if buy and matches:
+                prices = {item.get('Id'): item.get('Price') for item in items}
+                self._buy_matches(matches, prices)
+            return matches
+
+        except Exception as e:
+            logger.error(e)
+
+    def _buy_matches(self, matches, prices):
+        """Buy affordable items of tuples (rule name, item ID)."""
+        rules = {rule.name: rule for rule in self.rules.rules}
+        matches = [(rules[name], item_id) for name, item_id in matches
+                   if self.reserve_item(item_id, prices.get(item_id))]
+        if self.buyer is not None:
+            for rule, item_id in matches:
+                self.buyer.submit(item_id).add_done_callback(
+                    lambda future, rule=rule, item_id=item_id:
+                        self._record_buy(rule, item_id,
+                                         not future.exception() and
+                                         future.result()))
+            return None
+
+        for start in range(0, len(matches), CHUNK_SIZE):
+            chunk = matches[start:start + CHUNK_SIZE]
+            response = self.buy_on_secondarymarket(
+                [item_id for _, item_id in chunk])
+            bought = (response is not None and
+                      response.status_code in SUCCESS_CODES)
+            for rule, item_id in chunk:
+                self._record_buy(rule, item_id, bought)
+
+    def _warn_incomplete(self, url):
+        """Log warning about items truncated by a failed page."""
+        if url in self.retry:
+            logger.warning('Too many requests. Retry after {} s.'
+                           .format(self.retry[url]))
+        else:
+            logger.warning('Request of {} failed, the items are incomplete.'
+                           .format(url))
+
     def cancel_sm_offers(self, retry=False, last_payment_date=None, **kwargs):
         """
         Cancel selling of own loans offered on secondary market.
@@ -268,57 +728,45 @@ class BondoraTrading(BondoraApi):
         None.
 
         """
-        # wait 1 second before proceed
-        time.sleep(1)
-
         # select only own loans offered on secondary market
         if isinstance(kwargs, dict):
             kwargs['ShowMyItems'] = True
         else:
             kwargs = {'ShowMyItems': True}
-        self.get_secondarymarket(retry, **kwargs)
 
         # get list of secondary market item IDs
         ids = []
-        if self.sm:
-            for loan_on_sm in self.sm:
-                try:
-                    # select loans according to the last payment date
-                    if last_payment_date:
-                        if loan_on_sm['LastPaymentDate']: 
-                            if loan_on_sm[
-                                    'LastPaymentDate'] >= last_payment_date:
-                                continue
+        found = False
+        offers = self.iter_secondarymarket(retry, **kwargs)
+        for loan_on_sm in offers:
+            found = True
+            try:
+                # select loans according to the last payment date
+                if paid_before(loan_on_sm, last_payment_date):
                     ids.append(loan_on_sm['Id'])
-                except Exception as e:
-                    logger.error(e)
-        else:
-            if self.retry:
-                if 'get_secondarymarket' in self.retry:
-                    logger.warning('Too many requests. Retry after {} s.'
-                                   .format(self.retry['get_secondarymarket']))
-                    return None
-            logger.warning('No loans satisfying provided conditions '
-                           'and offered for selling were found.')
+            except Exception as e:
+                logger.error(e)
+
+        # the offers found are cancelled, the rest at the next call
+        if is_incomplete(offers):
+            self._warn_incomplete(self.url_sm)
+        if not found:
+            if not is_incomplete(offers):
+                logger.warning('No loans satisfying provided conditions '
+                               'and offered for selling were found.')
             return None
 
         # cancel loans offered on secondary market
         if ids:
-            response = self.cancel_on_secondarymarket(ids)
-            if response.status_code == 202:
-                if len(ids) == 1:
-                    logger.info('1 loan was successfully canceled on '
-                                'secondary market.')
-                else:
-                    logger.info(' {} loans were successfully canceled on '
-                                'secondary market.'.format(len(ids)))
-            else:
-                logger.error('Error by canceling loans on secondary market. '
-                             'Error code: {}'.format(response.status_code))
+            result = self.cancel_on_secondarymarket(ids, retry=retry)
+            log_bulk_result(result,
+                            'canceled on secondary market',
+                            'Error by canceling loans on secondary market.')
 
     def place_sm_offers(self, max_price, min_price=None,
                         days_before_payment=2, retry=False,
-                        last_payment_date=None, **kwargs):
+                        last_payment_date=None, investments=None,
+                        curve=DEFAULT_CURVE, curve_params=None, **kwargs):
         """
         Place loans for selling on secondary market.
 
@@ -327,7 +775,8 @@ class BondoraTrading(BondoraApi):
         https://api.bondora.com/doc/Api/GET-api-v1-account-investments?v=1
         If `min_price` is not specified, the selling price will be `max_price`.
         Otherwise, the selling price will be reduced depending on how many
-        days remain between today and the next payment day.
+        days remain between today and the next payment day according to
+        the price curve.
 
         Parameters
         ----------
@@ -342,6 +791,15 @@ class BondoraTrading(BondoraApi):
             Retry to execute the method. The default is False.
         last_payment_date : str (%Y-%m-%d), optional
             Last payment date. The default is None.
+        investments : iterable, optional
+            Investments to sell, e.g. selected from a PortfolioStore.
+            If None, the investments are requested according to `kwargs`.
+            The default is None.
+        curve : str or callable, optional
+            Price curve between `min_price` and `max_price` (see
+            `trading.pricing`). The default is DEFAULT_CURVE (linear).
+        curve_params : dict, optional
+            Parameters of the price curve. The default is None.
         **kwargs : dict
             Keyword arguments:
                 Loans conditions to select for selling.
@@ -351,83 +809,129 @@ class BondoraTrading(BondoraApi):
         None.
 
         """
-        # wait 60 seconds before proceed
-        time.sleep(60)
-
-        price = max_price
-        self.get_investments(retry, **kwargs)
-
         # calculate latest selling date of loans before the next payment
-        if min_price is not None:
-            latest_sell_date = date.today() + timedelta(
-                days=days_before_payment)
+        latest_sell_date = date.today() + timedelta(days=days_before_payment)
 
         # get list of loan parts IDs and selling prices
-        part_ids_prices = []
-        if self.investments:
-            for investment in self.investments:
-                try:
-                    # select loans according to the last payment date
-                    if last_payment_date:
-                        if investment['LastPaymentDate']: 
-                            if investment[
-                                    'LastPaymentDate'] >= last_payment_date:
-                                continue
-
-                    # calculate selling price
-                    if min_price is not None:
-                        next_payment_date = datetime.strptime(
-                            investment['NextPaymentDate'],
-                            '%Y-%m-%dT00:00:00').date()
-                        price = min_price + (next_payment_date -
-                                             latest_sell_date).days
-                        if price > max_price:
-                            price = max_price
-                        elif price < min_price:
-                            price = min_price
-                    part_ids_prices.append((investment['LoanPartId'], price))
-                except Exception as e:
-                    logger.error(e)
-        else:
-            if self.retry:
-                if 'get_investments' in self.retry:
-                    logger.warning('Too many requests. Retry after {} s.'
-                                   .format(self.retry['get_investments']))
-                    return None
-            logger.warning('No loans satisfying provided conditions '
-                           'were found.')
+        if investments is None:
+            investments = self.iter_investments(retry, **kwargs)
+        prices, scope = offer_prices(investments, max_price, min_price,
+                                     latest_sell_date, last_payment_date,
+                                     curve, curve_params)
+        part_ids_prices = list(prices.items())
+
+        # the investments found are offered, the rest at the next call
+        if is_incomplete(investments):
+            self._warn_incomplete(self.url_investments)
+        if not scope:
+            if not is_incomplete(investments):
+                logger.warning('No loans satisfying provided conditions '
+                               'were found.')
             return None
 
         # sell loans on secondary market
         if part_ids_prices:
-            response = self.sell_on_secondarymarket(part_ids_prices)
-            if response.status_code == 202:
-                if len(part_ids_prices) == 1:
-                    logger.info('1 loan was successfully put on '
-                                'secondary market for selling.')
-                else:
-                    logger.info(' {} loans were successfully put on '
-                                'secondary market for selling.'
-                                .format(len(part_ids_prices)))
+            result = self.sell_on_secondarymarket(part_ids_prices,
+                                                  retry=retry)
+            log_bulk_result(result,
+                            'put on secondary market for selling',
+                            'Error by putting loans on secondary market.')
+
+    def reprice_sm_offers(self, max_price, min_price=None,
+                          days_before_payment=2, retry=False,
+                          last_payment_date=None, investments=None,
+                          curve=DEFAULT_CURVE, curve_params=None, **kwargs):
+        """
+        Update offers of loans on secondary market to the selling prices.
 
-            else:
-                if retry:
-                    # set waite time to 60 s.
-                    wait_time = 60
-                    # wait before proceed with the second attempt
-                    time.sleep(wait_time)
-                    logger.info('Retry selling.')
-                    response = self.sell_on_secondarymarket(part_ids_prices)
-                    if response.status_code == 202:
-                        if len(part_ids_prices) == 1:
-                            logger.info('1 loan was successfully put on '
-                                        'secondary market for selling.')
-                        else:
-                            logger.info(' {} loans were successfully put on '
-                                        'secondary market for selling.'
-                                        .format(len(part_ids_prices)))
-                        return None
-
-                logger.error('Error by putting loans on secondary market. '
-                             'Error code: {}'
-                             .format(response.status_code))
+        The selling prices are calculated as by `place_sm_offers` and
+        compared with the current own offers. Only offers of loans not to
+        sell and offers with other prices are cancelled, and only new and
+        repriced loans are offered. Offers of loans not selected by `kwargs`
+        or paid since `last_payment_date` are kept. It replaces
+        `cancel_sm_offers` followed by `place_sm_offers`.
+
+        Parameters
+        ----------
+        max_price : int
+            Maximal price to sell loan.
+        min_price : int, optional
+            Minimal price to sell loan. The default is None.
+        days_before_payment : int, optional
+            Latest selling date of loans before the next payment.
+            The default is 2.
+        retry : bool, optional
+            Retry to execute the method. The default is False.
+        last_payment_date : str (%Y-%m-%d), optional
+            Last payment date. The default is None.
+        investments : iterable, optional
+            Investments to sell, e.g. selected from a PortfolioStore.
+            If None, the investments are requested according to `kwargs`.
+            The default is None.
+        curve : str or callable, optional
+            Price curve between `min_price` and `max_price` (see
+            `trading.pricing`). The default is DEFAULT_CURVE (linear).
+        curve_params : dict, optional
+            Parameters of the price curve. The default is None.
+        **kwargs : dict
+            Keyword arguments:
+                Loans conditions to select for selling.
+
+        Returns
+        -------
+        summary : dict or None
+            Number of unchanged, cancelled, and offered loans or None,
+            if the investments or offers could not be requested.
+
+        """
+        latest_sell_date = date.today() + timedelta(days=days_before_payment)
+        if investments is None:
+            investments = self.iter_investments(retry, **kwargs)
+        prices, scope = offer_prices(investments, max_price, min_price,
+                                     latest_sell_date, last_payment_date,
+                                     curve, curve_params)
+        if is_incomplete(investments):
+            self._warn_incomplete(self.url_investments)
+            return None
+        if not scope:
+            logger.warning('No loans satisfying provided conditions '
+                           'were found.')
+            return None
+
+        # offers of loans paid since `last_payment_date` are kept
+        # as by `cancel_sm_offers`
+        pages = self.iter_secondarymarket(retry, ShowMyItems=True)
+        offers = [offer for offer in pages
+                  if paid_before(offer, last_payment_date)]
+        if is_incomplete(pages):
+            # incomplete offers would be offered twice
+            self._warn_incomplete(self.url_sm)
+            return None
+        cancel_ids, to_sell, n_unchanged = diff_sm_offers(prices, scope,
+                                                          offers)
+
+        if cancel_ids:
+            result = self.cancel_on_secondarymarket(cancel_ids, retry=retry)
+            log_bulk_result(result,
+                            'canceled on secondary market',
+                            'Error by canceling loans on secondary market.')
+            # loans are offered again only, if their offers were cancelled
+            failed_ids = (set(result.failed_ids) if result is not None
+                          else set(cancel_ids))
+            if failed_ids:
+                listed = {offer['LoanPartId'] for offer in offers
+                          if offer['Id'] in failed_ids}
+                to_sell = [(part_id, price) for part_id, price in to_sell
+                           if part_id not in listed]
+                cancel_ids = [item_id for item_id in cancel_ids
+                              if item_id not in failed_ids]
+        if to_sell:
+            result = self.sell_on_secondarymarket(to_sell, retry=retry)
+            log_bulk_result(result,
+                            'put on secondary market for selling',
+                            'Error by putting loans on secondary market.')
+        logger.info('Offers: {} unchanged, {} cancelled, {} offered.'
+                    .format(n_unchanged, len(cancel_ids), len(to_sell)))
+        return {'unchanged': n_unchanged,
+                'cancelled': len(cancel_ids),
+                'offered': len(to_sell)}
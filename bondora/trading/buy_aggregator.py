@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""The file contains the class definition of micro-batched buying."""
+
+import os
+import sys
+import time
+import inspect
+import threading
+from concurrent.futures import Future
+import requests
+
+currentdir = os.path.dirname(
+    os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, parentdir)
+
+from setup_logger import logger
+from api.bulk import SUCCESS_CODES, CHUNK_SIZE
+
+# default time in seconds to collect item IDs after the first one
+BUY_WINDOW = 0.02
+
+
+def is_rejected(status_code):
+    """Check if items were rejected (4xx other than too many requests)."""
+    return (status_code is not None and 400 <= status_code < 500 and
+            status_code != requests.codes.too_many_requests)
+
+
+class BuyAggregator:
+    """Class representation of aggregator of secondary market purchases.
+
+    Item IDs submitted within a short window are bought with one request.
+    If items of a batch are rejected (4xx response), the batch is split in
+    halves, which are bought again, until the rejected items are found.
+    After too many requests (429), a server error (5xx), or a network
+    error, the remaining items are not bought and are left to the next
+    event.
+    """
+
+    def __init__(self, api, window=BUY_WINDOW, max_batch=CHUNK_SIZE):
+        """
+        Initialize the class instance.
+
+        Parameters
+        ----------
+        api : BondoraApi object
+            API client to buy the items.
+        window : float, optional
+            Time in seconds to collect item IDs after the first one.
+            The default is BUY_WINDOW.
+        max_batch : int, optional
+            Maximal number of item IDs in one request. A full batch is
+            sent without waiting for the end of the window.
+            The default is CHUNK_SIZE.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.api = api
+        self.window = window
+        self.max_batch = max_batch
+        self.requests = 0
+        self.items = 0
+        self._pending = {}
+        self._closed = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, item_id):
+        """
+        Submit secondary market item ID to buy.
+
+        Parameters
+        ----------
+        item_id : str
+            Secondary market item ID.
+
+        Returns
+        -------
+        future : concurrent.futures.Future object
+            Future with result True, if the item was bought, else False.
+            Items submitted repeatedly within a window share the future.
+
+        """
+        with self._condition:
+            if self._closed:
+                raise RuntimeError('Buy aggregator is closed.')
+            future = self._pending.get(item_id)
+            if future is None:
+                future = self._pending[item_id] = Future()
+                self._condition.notify()
+            return future
+
+    def _take_batch(self):
+        """Wait for items, collect them during the window, return batch."""
+        with self._condition:
+            while not self._pending and not self._closed:
+                self._condition.wait()
+            deadline = time.monotonic() + self.window
+            while (len(self._pending) < self.max_batch and
+                   not self._closed):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            item_ids = list(self._pending)[:self.max_batch]
+            return [(item_id, self._pending.pop(item_id))
+                    for item_id in item_ids]
+
+    def _buy(self, batch):
+        """Buy items with one request, return status code or None."""
+        self.requests += 1
+        response = self.api.buy_on_secondarymarket(
+            [item_id for item_id, _ in batch])
+        if response is None:
+            return None
+        if response.status_code in SUCCESS_CODES:
+            for _, future in batch:
+                future.set_result(True)
+        return response.status_code
+
+    def _split(self, batch):
+        """Buy halves of rejected batch, return False if buying must stop."""
+        half = len(batch) // 2
+        for part in (batch[:half], batch[half:]):
+            status_code = self._buy(part)
+            if status_code in SUCCESS_CODES:
+                continue
+            if not is_rejected(status_code):
+                return False
+            if len(part) > 1 and not self._split(part):
+                return False
+        return True
+
+    def _send(self, batch):
+        """Buy batch and set results of the futures."""
+        try:
+            self.items += len(batch)
+            status_code = self._buy(batch)
+            if is_rejected(status_code) and len(batch) > 1:
+                # find the rejected items
+                logger.warning('Buying of {} items failed, split the batch.'
+                               .format(len(batch)))
+                if not self._split(batch):
+                    logger.warning('Too many requests or server error, '
+                                   'remaining items are not bought.')
+            for _, future in batch:
+                if not future.done():
+                    future.set_result(False)
+
+        except Exception as e:
+            logger.error(e)
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+    def _run(self):
+        """Send batches until closed and all items are sent."""
+        while True:
+            batch = self._take_batch()
+            if batch:
+                self._send(batch)
+            elif self._closed:
+                return None
+
+    def close(self):
+        """
+        Send pending items and stop the aggregator.
+
+        Returns
+        -------
+        None.
+
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+
+    def stats(self):
+        """
+        Get statistics of the aggregator.
+
+        Returns
+        -------
+        stats : dict
+            Number of buy requests and submitted items.
+
+        """
+        return {'requests': self.requests, 'items': self.items}
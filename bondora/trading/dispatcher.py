@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""The file contains the class definition of multi-account dispatcher."""
+
+import os
+import sys
+import json
+import inspect
+import threading
+
+currentdir = os.path.dirname(
+    os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, parentdir)
+
+from setup_logger import logger
+from api.bondora_api import create_session
+from trading.bondora_trading import BondoraTrading, get_sm_payload
+from trading.rules import RuleEngine
+from trading.seen_set import SeenSet, SEEN_TTL, event_key
+
+# connections kept per pool of the shared session
+POOL_MAXSIZE = 20
+
+
+def _rules_key(rules):
+    """Create key of rule definitions to share compiled rules."""
+    if rules is None or isinstance(rules, str):
+        return rules
+    return json.dumps(rules, sort_keys=True, default=str)
+
+
+class AccountDispatcher:
+    """Class representation of trading of many Bondora accounts.
+
+    All accounts share one HTTP session, while every account has its own
+    rate limiter. Accounts with the same buy rules share the compiled
+    rules, so every secondary market event is evaluated once per rule set.
+    An item can be bought only once, therefore the selected item is given
+    to one account of the rule set in turn, preferring accounts which can
+    afford it, and to the next account only, if the purchase fails. If an
+    account buys in batches, the submission of the item is final.
+    Secondary market events are public, therefore the same event received
+    by the webhooks of several accounts is evaluated only once.
+    """
+
+    def __init__(self, accounts, session=None, dedup_ttl=SEEN_TTL,
+                 **kwargs):
+        """
+        Initialize the class instance.
+
+        Parameters
+        ----------
+        accounts : dict
+            Accounts by name: access token or dictionary with `token` and
+            optional keyword arguments of `BondoraTrading` (e.g. `rules`,
+            `buy_window`). They take precedence over `session`,
+            `dedup_ttl`, and `kwargs`.
+        session : requests.Session object, optional
+            Session shared by the accounts. If None, a new session owned by
+            the dispatcher is created. The default is None.
+        dedup_ttl : float, optional
+            Time in seconds to remember secondary market events and
+            bought items. If None, events are not de-duplicated.
+            The default is SEEN_TTL.
+        **kwargs : dict
+            Keyword arguments passed to `BondoraTrading` of all accounts.
+
+        Returns
+        -------
+        None.
+
+        """
+        self._own_session = session is None
+        if session is None:
+            session = create_session(pool_maxsize=POOL_MAXSIZE)
+        self.session = session
+        self.traders = {}
+        # compiled rules and names of accounts using them
+        self.groups = []
+        # index of the next account by rule set
+        self._turns = {}
+        groups = {}
+        for name, account in accounts.items():
+            if isinstance(account, str):
+                account = {'token': account}
+            account = dict(kwargs, **account)
+            # settings of the account take precedence
+            account.setdefault('session', session)
+            account.setdefault('dedup_ttl', dedup_ttl)
+            token = account.pop('token')
+            rules = account.pop('rules', None)
+            key = _rules_key(rules)
+            if key not in groups:
+                groups[key] = (RuleEngine(rules), [])
+                self.groups.append(groups[key])
+            engine, names = groups[key]
+            names.append(name)
+            self.traders[name] = BondoraTrading(token, rules=engine.rules,
+                                                **account)
+
+        self.seen = SeenSet(ttl=dedup_ttl) if dedup_ttl is not None else None
+        self.events = 0
+        self.repeats = 0
+        self._lock = threading.Lock()
+
+    @property
+    def engines(self):
+        """Get compiled rules of all rule sets."""
+        return [engine for engine, _ in self.groups]
+
+    def dispatch(self, event, account=None):
+        """
+        Evaluate webhook event and buy selected item for the accounts.
+
+        Parameters
+        ----------
+        event : dict
+            Webhook event.
+        account : str, optional
+            Name of the account, which received the event. Other events
+            than secondary market events are passed to this account only.
+            The default is None.
+
+        Returns
+        -------
+        bought : list
+            List of tuples (account name, item ID) of submitted purchases,
+            at most one per rule set.
+
+        """
+        try:
+            with self._lock:
+                self.events += 1
+            payload = get_sm_payload(event)
+            if payload is None:
+                if account is not None:
+                    self.traders[account].buy_loan(event)
+                return []
+            if self.seen is not None and not self.seen.add(
+                    event_key(payload)):
+                with self._lock:
+                    self.repeats += 1
+                return []
+
+            bought = []
+            price = payload.get('Price')
+            for index, (engine, names) in enumerate(self.groups):
+                match = engine.match(event)
+                if match is None:
+                    continue
+                rule, item_id = match
+                for name in self._candidates(index, names, price):
+                    if self.traders[name].buy_item(rule, item_id, price):
+                        bought.append((name, item_id))
+                        break
+            return bought
+
+        except Exception as e:
+            logger.error(e)
+            return []
+
+    def _candidates(self, index, names, price):
+        """Get accounts of rule set in turn, affordable accounts first."""
+        with self._lock:
+            turn = self._turns.get(index, 0)
+            self._turns[index] = (turn + 1) % len(names)
+        names = names[turn:] + names[:turn]
+        return sorted(names, key=lambda name:
+                      not self.traders[name].can_afford(price))
+
+    def close(self):
+        """
+        Buy pending items, close the session and release connections.
+
+        Returns
+        -------
+        None.
+
+        """
+        for trading in self.traders.values():
+            trading.close()
+        if self._own_session:
+            self.session.close()
+
+    def stats(self):
+        """
+        Get statistics of the dispatcher.
+
+        Returns
+        -------
+        stats : dict
+            Number of events and repeated events, statistics of the rule
+            sets by account names, de-duplication statistics of purchases
+            by account, and balance ledgers by account.
+
+        """
+        return {'events': self.events,
+                'repeats': self.repeats,
+                'rules': {', '.join(names): engine.stats()
+                          for engine, names in self.groups},
+                'buys': {name: trading.dedup_stats()
+                         for name, trading in self.traders.items()},
+                'balances': {name: trading.ledger.stats()
+                             for name, trading in self.traders.items()
+                             if trading.ledger is not None}}
+
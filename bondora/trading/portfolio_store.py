@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+"""The file contains the class definition of local portfolio store."""
+
+import os
+import sys
+import json
+import sqlite3
+import inspect
+import threading
+from datetime import datetime, timedelta
+
+currentdir = os.path.dirname(
+    os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, parentdir)
+
+from setup_logger import logger
+from api.records import Record, parse_date
+
+PATH_STORE = '/var/www/flask/bondora/portfolio.sqlite'
+
+# number of days to overlap delta requests with the previous sync
+SYNC_OVERLAP_DAYS = 1
+
+# number of days between full syncs to catch changes not covered by deltas
+FULL_SYNC_DAYS = 7
+
+# conditions of `find` on indexed columns
+CONDITIONS = {'LoanStatusCode': 'LoanStatusCode = ?',
+              'NextPaymentDateFrom': 'NextPaymentDate >= ?',
+              'NextPaymentDateTo': 'NextPaymentDate <= ?',
+              'LastPaymentDateFrom': 'LastPaymentDate >= ?',
+              'LastPaymentDateTo': 'LastPaymentDate <= ?',
+              'LastPaymentDateBefore': ('(LastPaymentDate IS NULL OR '
+                                        'LastPaymentDate < ?)')}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS investments (
+    LoanPartId TEXT PRIMARY KEY,
+    LoanStatusCode INTEGER,
+    NextPaymentDate TEXT,
+    LastPaymentDate TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_status ON investments (LoanStatusCode);
+CREATE INDEX IF NOT EXISTS ix_next_payment ON investments (NextPaymentDate);
+CREATE INDEX IF NOT EXISTS ix_last_payment ON investments (LastPaymentDate);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class IncompleteSync(Exception):
+    """Exception raised, if a page of a sync request failed."""
+
+
+def _checked(pages):
+    """Yield items of page iterator, raise IncompleteSync, if truncated."""
+    yield from pages
+    if getattr(pages, 'complete', True) is False:
+        raise IncompleteSync('Sync request failed, the changes are '
+                             'rolled back.')
+
+
+def _date_string(value):
+    """Convert date or date string to '%Y-%m-%d' or None."""
+    value = parse_date(value)
+    return value.isoformat() if value else None
+
+
+class PortfolioStore:
+    """Class representation of local portfolio store based on SQLite."""
+
+    def __init__(self, api, path=PATH_STORE):
+        """
+        Initialize the class instance.
+
+        Parameters
+        ----------
+        api : BondoraApi object
+            API client to sync the portfolio.
+        path : str, optional
+            Path to SQLite database file, ':memory:' for in-memory
+            database. The default is PATH_STORE.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.api = api
+        self.path = path
+        self._lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        """
+        Close the database connection.
+
+        Returns
+        -------
+        None.
+
+        """
+        with self._lock:
+            self.connection.close()
+
+    def _get_meta(self, key):
+        """Get value from meta table."""
+        row = self.connection.execute(
+            'SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key, value):
+        """Set value in meta table."""
+        self.connection.execute(
+            'INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)',
+            (key, value))
+
+    @property
+    def last_sync(self):
+        """Get time of the last sync as datetime or None."""
+        value = self._get_meta('last_sync')
+        return datetime.fromisoformat(value) if value else None
+
+    @property
+    def last_full_sync(self):
+        """Get time of the last full sync as datetime or None."""
+        value = self._get_meta('last_full_sync')
+        return datetime.fromisoformat(value) if value else None
+
+    def _upsert(self, investments):
+        """Insert or replace investments, return number of rows."""
+        rows = ((investment['LoanPartId'],
+                 investment.get('LoanStatusCode'),
+                 _date_string(investment.get('NextPaymentDate')),
+                 _date_string(investment.get('LastPaymentDate')),
+                 json.dumps(investment.to_dict()
+                            if isinstance(investment, Record) else investment,
+                            default=str))
+                for investment in investments)
+        cursor = self.connection.executemany(
+            'INSERT OR REPLACE INTO investments '
+            '(LoanPartId, LoanStatusCode, NextPaymentDate, LastPaymentDate, '
+            'data) VALUES (?, ?, ?, ?, ?)', rows)
+        return cursor.rowcount
+
+    def full_sync(self, retry=False):
+        """
+        Replace the stored portfolio with all investments.
+
+        Parameters
+        ----------
+        retry : bool, optional
+            Retry to execute the requests. The default is False.
+
+        Returns
+        -------
+        n_investments : int or None
+            Number of stored investments or None, if a request failed.
+            The stored portfolio is kept in this case.
+
+        """
+        now = datetime.now()
+        try:
+            with self._lock, self.connection:
+                self.connection.execute('DELETE FROM investments')
+                n_investments = self._upsert(
+                    _checked(self.api.iter_investments(retry)))
+                self._set_meta('last_sync', now.isoformat())
+                self._set_meta('last_full_sync', now.isoformat())
+        except IncompleteSync as e:
+            logger.error(e)
+            return None
+        logger.info('Full sync of {} investments.'.format(n_investments))
+        return n_investments
+
+    def sync(self, retry=False):
+        """
+        Apply changes since the last sync.
+
+        Investments purchased, paid, or sold since the last sync are
+        requested with changed-since filters. The event log of the
+        application is checked first: purchase and sale deltas are only
+        requested, if it contains new events. A full sync is made, if the
+        store is empty or the last full sync is older than FULL_SYNC_DAYS.
+
+        Parameters
+        ----------
+        retry : bool, optional
+            Retry to execute the requests. The default is False.
+
+        Returns
+        -------
+        n_changes : int or None
+            Number of inserted, updated, or removed investments or None,
+            if a request failed. The changes are rolled back and the time
+            of the last sync is kept in this case.
+
+        """
+        last_sync = self.last_sync
+        last_full_sync = self.last_full_sync
+        if (last_sync is None or last_full_sync is None or
+                datetime.now() - last_full_sync >
+                timedelta(days=FULL_SYNC_DAYS)):
+            return self.full_sync(retry)
+
+        now = datetime.now()
+        since = (last_sync - timedelta(days=SYNC_OVERLAP_DAYS)
+                 ).strftime('%Y-%m-%d')
+        try:
+            # check if buys or sales were made since the last sync
+            has_events = next(_checked(self.api.iter_eventlog(
+                retry, page_size=1, EventDateFrom=since)), None) is not None
+
+            with self._lock, self.connection:
+                n_changes = self._upsert(_checked(self.api.iter_investments(
+                    retry, LastPaymentDateFrom=since)))
+                if has_events:
+                    n_changes += self._upsert(_checked(
+                        self.api.iter_investments(retry,
+                                                  PurchaseDateFrom=since)))
+                    sold = [(investment['LoanPartId'],) for investment
+                            in _checked(self.api.iter_investments(
+                                retry, SoldDateFrom=since))]
+                    self.connection.executemany(
+                        'DELETE FROM investments WHERE LoanPartId = ?', sold)
+                    n_changes += len(sold)
+                self._set_meta('last_sync', now.isoformat())
+        except IncompleteSync as e:
+            logger.error(e)
+            return None
+        logger.info('Sync of {} changed investments.'.format(n_changes))
+        return n_changes
+
+    def find(self, **conditions):
+        """
+        Find stored investments by indexed conditions.
+
+        Parameters
+        ----------
+        **conditions : dict
+            Keyword arguments:
+                LoanStatusCode, NextPaymentDateFrom, NextPaymentDateTo,
+                LastPaymentDateFrom, LastPaymentDateTo, LastPaymentDateBefore.
+                Dates as datetime.date or '%Y-%m-%d'.
+
+        Returns
+        -------
+        investments : list
+            List of investments as dictionaries.
+
+        """
+        clauses = []
+        values = []
+        for key, value in conditions.items():
+            if key not in CONDITIONS:
+                raise ValueError('Unknown condition: {}'.format(key))
+            if value is None:
+                continue
+            clauses.append(CONDITIONS[key])
+            values.append(value if key == 'LoanStatusCode'
+                          else _date_string(value))
+        query = 'SELECT data FROM investments'
+        if clauses:
+            query += ' WHERE ' + ' AND '.join(clauses)
+        with self._lock:
+            rows = self.connection.execute(query, values).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def __len__(self):
+        """Get number of stored investments."""
+        with self._lock:
+            return self.connection.execute(
+                'SELECT COUNT(*) FROM investments').fetchone()[0]
@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+"""The file contains the vectorized pricing of secondary market offers."""
+
+import os
+import sys
+import inspect
+from datetime import date, datetime
+import numpy as np
+
+currentdir = os.path.dirname(
+    os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, parentdir)
+
+from setup_logger import logger
+from api.records import parse_date
+
+# price curves {name: curve(days, max_price, min_price, **params)}
+PRICE_CURVES = {}
+
+# default price curve, reduction of the price by 1% per day
+DEFAULT_CURVE = 'linear'
+
+# ordinal of the first day of numpy.datetime64 and integer value of NaT
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+NAT = np.iinfo(np.int64).min
+
+
+def register_curve(name):
+    """
+    Register price curve.
+
+    The curve gets the array of days between the next payment date and the
+    latest selling date, the maximal and minimal price, and the parameters
+    of the curve, and returns the array of prices. The prices are clamped
+    to [min_price, max_price] and rounded afterwards.
+
+    Parameters
+    ----------
+    name : str
+        Name of the curve.
+
+    Returns
+    -------
+    decorator : callable
+        Decorator registering the curve.
+
+    """
+    def decorator(function):
+        PRICE_CURVES[name] = function
+        return function
+    return decorator
+
+
+@register_curve('linear')
+def linear_curve(days, max_price, min_price, slope=1.0):
+    """Increase price from `min_price` by `slope` per day."""
+    return min_price + slope * days
+
+
+@register_curve('exponential')
+def exponential_curve(days, max_price, min_price, half_life=7.0):
+    """Approach `max_price` from `min_price` with half-life in days."""
+    return max_price - (max_price - min_price) * np.power(
+        0.5, np.maximum(days, 0) / half_life)
+
+
+@register_curve('step')
+def step_curve(days, max_price, min_price, step_days=7):
+    """Use `max_price` until `step_days` before, then `min_price`."""
+    return np.where(days > step_days, max_price, min_price)
+
+
+def date_column(values):
+    """
+    Convert dates to array of days.
+
+    Parameters
+    ----------
+    values : list
+        ISO date strings (optionally with time), dates, or None.
+
+    Returns
+    -------
+    dates : numpy.ndarray
+        Array of numpy.datetime64[D], NaT for empty values.
+
+    """
+    sample = next((value for value in values if value), None)
+    if isinstance(sample, date):
+        # dates of records, converting ordinals is faster than dates
+        try:
+            return np.array([value.toordinal() - EPOCH_ORDINAL
+                             if value else NAT for value in values],
+                            dtype=np.int64).astype('datetime64[D]')
+        except AttributeError:
+            pass
+    return np.array([value[:10] if isinstance(value, str) and value
+                     else (value.date() if isinstance(value, datetime)
+                           else (value or 'NaT'))
+                     for value in values], dtype='datetime64[D]')
+
+
+class PricingEngine:
+    """Class representation of pricing of secondary market offers.
+
+    Investments are converted to columns, and the prices of all of them
+    are computed at once with the price curve.
+    """
+
+    def __init__(self, max_price, min_price=None, curve=DEFAULT_CURVE,
+                 **params):
+        """
+        Initialize the class instance.
+
+        Parameters
+        ----------
+        max_price : int
+            Maximal price to sell loan.
+        min_price : int, optional
+            Minimal price to sell loan. If None, all loans are offered at
+            `max_price`. The default is None.
+        curve : str or callable, optional
+            Name of registered price curve or price curve function.
+            The default is DEFAULT_CURVE.
+        **params : dict
+            Parameters of the price curve.
+
+        Returns
+        -------
+        None.
+
+        """
+        if isinstance(curve, str):
+            if curve not in PRICE_CURVES:
+                raise ValueError('Unknown price curve: {}'.format(curve))
+            curve = PRICE_CURVES[curve]
+        self.max_price = max_price
+        self.min_price = min_price
+        self.curve = curve
+        self.params = params
+
+    def prices(self, next_payment_dates, latest_sell_date):
+        """
+        Calculate selling prices.
+
+        Parameters
+        ----------
+        next_payment_dates : numpy.ndarray
+            Next payment dates as numpy.datetime64[D].
+        latest_sell_date : datetime.date
+            Latest selling date of loans before the next payment.
+
+        Returns
+        -------
+        prices : numpy.ndarray
+            Integer selling prices.
+
+        """
+        if self.min_price is None:
+            # rounded like the curve prices, not truncated by the cast
+            return np.full(len(next_payment_dates), np.rint(self.max_price),
+                           dtype=np.int64)
+        days = (next_payment_dates -
+                np.datetime64(latest_sell_date, 'D')).astype(np.int64)
+        prices = self.curve(days, self.max_price, self.min_price,
+                            **self.params)
+        prices = np.clip(prices, self.min_price, self.max_price)
+        return np.rint(prices).astype(np.int64)
+
+    def price_investments(self, investments, latest_sell_date,
+                          last_payment_date=None):
+        """
+        Calculate selling prices of investments.
+
+        Parameters
+        ----------
+        investments : iterable
+            Investments (dictionaries or records).
+        latest_sell_date : datetime.date
+            Latest selling date of loans before the next payment.
+        last_payment_date : str (%Y-%m-%d), datetime.date, or None, optional
+            Only loans without payments since this date are sold.
+            The default is None.
+
+        Returns
+        -------
+        prices : dict
+            Selling price by loan part ID of the loans to sell.
+        scope : set
+            Loan part IDs of all investments.
+
+        """
+        investments = list(investments)
+        part_ids = np.array([investment['LoanPartId']
+                             for investment in investments], dtype=object)
+        scope = set(part_ids.tolist())
+        selected = np.ones(len(investments), dtype=bool)
+
+        # select loans according to the last payment date
+        if last_payment_date:
+            last_payments = date_column(
+                [investment['LastPaymentDate'] for investment in investments])
+            selected &= ~(last_payments >= np.datetime64(
+                parse_date(last_payment_date), 'D'))
+
+        if self.min_price is None:
+            next_payments = np.empty(len(investments), dtype='datetime64[D]')
+        else:
+            next_payments = date_column(
+                [investment['NextPaymentDate'] for investment in investments])
+            missing = selected & np.isnat(next_payments)
+            if missing.any():
+                logger.error('Next payment date of {} loans is missing.'
+                             .format(int(missing.sum())))
+                selected &= ~missing
+
+        prices = self.prices(next_payments[selected], latest_sell_date)
+        return dict(zip(part_ids[selected].tolist(), prices.tolist())), scope
@@ -0,0 +1,685 @@
+# -*- coding: utf-8 -*-
+"""The file contains the rule engine of secondary market buy selectors."""
+
+import os
+import sys
+import json
+import time
+import inspect
+import threading
+from datetime import date, datetime, time as day_time, timedelta
+
+currentdir = os.path.dirname(
+    os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, parentdir)
+
+from api.records import parse_date
+
+# event types of secondary market webhooks
+SM_EVENT_TYPES = ('secondmarket.published', 'secondmarket.updated')
+
+# comparison operators of conditions
+COMPARISONS = ('==', '!=', '<', '<=', '>', '>=')
+
+# fields checked first within the same cost, as they reject most items
+PRIORITY_FIELDS = ('Price', 'DesiredDiscountRate', 'LoanStatusCode')
+
+# fields of secondary market items usable to reject events before parsing
+PREFILTER_FIELDS = ('Price', 'DesiredDiscountRate', 'LoanStatusCode',
+                    'NextPaymentNr')
+
+# costs of condition types, cheaper conditions are checked first
+COST_SCALAR = 1
+COST_DATE = 2
+COST_FUNCTION = 3
+
+# functions usable in conditions {name: function(payload, day, **params)}
+FUNCTIONS = {}
+
+# default buy rules, equivalent to the former hard-coded selectors
+GREEN_RULES = [
+    {'name': 'green',
+     'conditions': [
+         ['NextPaymentNr', '==', 1],
+         ['DesiredDiscountRate', '<=', 0.0],
+         ['LoanStatusCode', '==', 2],
+         ['ReScheduledOn', 'empty'],
+         ['DebtOccuredOn', 'empty'],
+         ['DebtOccuredOnForSecondary', 'empty'],
+         ['LateAmountTotal', '==', 0.0],
+         ['Amount', '<=', 5.0],
+         ['Interest', '>', 18.0],
+         ['NrOfScheduledPayments', '>', 36],
+         ['NextPaymentDate', 'after_days', 7]]}]
+
+RED_RULES = [
+    {'name': 'red_cheap',
+     'conditions': [
+         ['DesiredDiscountRate', '<=', -94.0],
+         ['Price', '<=', 5.0]]},
+    {'name': 'red_paying',
+     'conditions': [
+         ['DesiredDiscountRate', '<=', -69.0],
+         ['Price', '<=', 5.0],
+         ['DebtOccuredOn', 'before_days', 90],
+         ['regular_payments', 'function',
+          {'days': 90, 'n_payments': 3, 'min_yield': 0.19}]]}]
+
+DEFAULT_RULES = GREEN_RULES + RED_RULES
+
+
+def register_function(name):
+    """
+    Register function usable in conditions.
+
+    The function gets the payload, the current date, and the parameters
+    of the condition, and returns True, if the condition is satisfied.
+
+    Parameters
+    ----------
+    name : str
+        Name of the function in rule definitions.
+
+    Returns
+    -------
+    decorator : callable
+        Decorator registering the function.
+
+    """
+    def decorator(function):
+        FUNCTIONS[name] = function
+        return function
+    return decorator
+
+
+@register_function('regular_payments')
+def regular_payments(payload, day, days=90, n_payments=3, min_yield=0.19):
+    """
+    Check regular payments of defaulted loan.
+
+    Parameters
+    ----------
+    payload : dict
+        Secondary market item with `LoanTransfers` and `DebtManagmentEvents`.
+    day : datetime.date
+        Current date.
+    days : int, optional
+        Period in days of the last payments. The default is 90.
+    n_payments : int, optional
+        Minimal number of payments within the period. The default is 3.
+    min_yield : float, optional
+        Minimal payment per year relative to the price of the last
+        payments. The default is 0.19.
+
+    Returns
+    -------
+    satisfied : bool
+        True, if the last payment was made after the last debt management
+        event and the last payments were made within the period with the
+        minimal yield.
+
+    """
+    transfers = payload['LoanTransfers']
+    if len(transfers) < n_payments:
+        return False
+    # last payment after last event
+    if not (parse_date(payload['DebtManagmentEvents'][1]['CreatedOn']) <
+            parse_date(transfers[-1]['Date'])):
+        return False
+    since = day - timedelta(days=days)
+    price = (payload['PrincipalRemaining'] *
+             (1.0 + payload['DesiredDiscountRate'] / 100.0))
+    for transfer in transfers[-n_payments:]:
+        if not parse_date(transfer['Date']) > since:
+            return False
+        if not 12.0 * transfer['TotalAmount'] / price > min_yield:
+            return False
+    return True
+
+
+def _date_string(value):
+    """Get '%Y-%m-%d' of date string or date."""
+    if isinstance(value, str):
+        return value[:10]
+    return parse_date(value).isoformat()
+
+
+class Clock:
+    """Class representation of current date updated once per day."""
+
+    __slots__ = ('day', 'day_end')
+
+    def __init__(self):
+        """Initialize the clock."""
+        self.day = None
+        self.day_end = 0.0
+
+    def __call__(self, today=None):
+        """
+        Get date of `today` or current date.
+
+        Parameters
+        ----------
+        today : datetime.datetime or datetime.date, optional
+            Current time. The default is None (now).
+
+        Returns
+        -------
+        day : datetime.date
+            Date.
+
+        """
+        if today is None:
+            # check the timestamp of the next midnight instead of the date
+            if time.time() < self.day_end:
+                return self.day
+            self.day = date.today()
+            self.day_end = datetime.combine(self.day + timedelta(days=1),
+                                            day_time()).timestamp()
+            return self.day
+        if isinstance(today, datetime):
+            return today.date()
+        return today
+
+
+class Condition:
+    """Class representation of condition of a rule."""
+
+    __slots__ = ('name', 'field', 'op', 'value', 'cost', 'days')
+
+    def __init__(self, definition):
+        """
+        Initialize the class instance.
+
+        Parameters
+        ----------
+        definition : list
+            [field, operator, value]. Operators:
+                '==', '!=', '<', '<=', '>', '>=' - comparison with value,
+                'in', 'not in' - membership in list of values,
+                'empty', 'not empty' - field is (not) empty, no value,
+                'before_days' - date of field is before today - value days,
+                'after_days' - date of field is after today + value days,
+                'function' - registered function named by the field with
+                dictionary of parameters as value.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.field = definition[0]
+        self.op = definition[1]
+        self.value = definition[2] if len(definition) > 2 else None
+        self.days = None
+        self.cost = COST_SCALAR
+
+        if self.op in COMPARISONS or self.op in ('in', 'not in'):
+            if self.op in ('in', 'not in'):
+                self.value = frozenset(self.value)
+                self.name = '{} {} {}'.format(self.field, self.op,
+                                              sorted(self.value))
+            else:
+                self.name = '{} {} {}'.format(self.field, self.op,
+                                              self.value)
+        elif self.op in ('empty', 'not empty'):
+            self.name = '{} {}'.format(self.field, self.op)
+        elif self.op in ('before_days', 'after_days'):
+            self.cost = COST_DATE
+            self.days = (-self.value if self.op == 'before_days'
+                         else self.value)
+            self.name = '{} {} {}'.format(self.field, self.op, self.value)
+        elif self.op == 'function':
+            if self.field not in FUNCTIONS:
+                raise ValueError('Unknown function: {}'.format(self.field))
+            self.cost = COST_FUNCTION
+            self.value = self.value or {}
+            self.name = '{}({})'.format(
+                self.field, ', '.join('{}={}'.format(key, param)
+                                      for key, param in self.value.items()))
+        else:
+            raise ValueError('Unknown operator: {}'.format(self.op))
+
+    @property
+    def order(self):
+        """Get sort key: cost, then priority of the field."""
+        priority = (PRIORITY_FIELDS.index(self.field)
+                    if self.field in PRIORITY_FIELDS
+                    else len(PRIORITY_FIELDS))
+        return (self.cost, priority)
+
+    def source(self, index, namespace):
+        """
+        Get source code lines of the check in the compiled predicate.
+
+        The lines return `index`, if the condition is not satisfied.
+        Constants are stored in `namespace`.
+
+        Parameters
+        ----------
+        index : int
+            Index of the condition in the rule.
+        namespace : dict
+            Namespace of the compiled predicate.
+
+        Returns
+        -------
+        lines : list
+            Source code lines.
+
+        """
+        value = 'c{}'.format(index)
+        namespace[value] = self.value
+        get = 'payload.get({!r})'.format(self.field)
+        if self.op in COMPARISONS:
+            return ['v = {}'.format(get),
+                    'if v is None or not v {} {}: return {}'.format(
+                        self.op, value, index)]
+        if self.op in ('in', 'not in'):
+            return ['if {} {} {}: return {}'.format(
+                get, 'not in' if self.op == 'in' else 'in', value, index)]
+        if self.op == 'empty':
+            return ['if {}: return {}'.format(get, index)]
+        if self.op == 'not empty':
+            return ['if not {}: return {}'.format(get, index)]
+        if self.op in ('before_days', 'after_days'):
+            # compare ISO date strings with threshold of the day
+            return ['v = {}'.format(get),
+                    'if not v or not date_string(v) {} bounds[{}]: '
+                    'return {}'.format('<' if self.op == 'before_days'
+                                       else '>', index, index)]
+        function = 'f{}'.format(index)
+        namespace[function] = FUNCTIONS[self.field]
+        return ['if not {}(payload, day, **{}): return {}'.format(
+            function, value, index)]
+
+
+class Rule:
+    """Class representation of compiled buy rule.
+
+    Conditions are sorted by cost (scalar comparisons, dates, functions)
+    and cheap, selective fields (e.g. `Price`) are checked first. They are
+    compiled into a single predicate function returning the index of the
+    first unsatisfied condition. Date thresholds are computed once per day.
+    """
+
+    def __init__(self, name, conditions, event_types=SM_EVENT_TYPES):
+        """
+        Initialize the class instance.
+
+        Parameters
+        ----------
+        name : str
+            Name of the rule.
+        conditions : list
+            List of condition definitions (see `Condition`).
+        event_types : tuple, optional
+            Event types checked by the rule. The default is SM_EVENT_TYPES.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.name = name
+        self.event_types = frozenset(event_types)
+        self.conditions = sorted((Condition(definition)
+                                  for definition in conditions),
+                                 key=lambda condition: condition.order)
+        self.predicate = self._compile(self.conditions)
+        # conditions checkable with the pre-filter fields only
+        self.prefilter = self._compile(
+            [condition for condition in self.conditions
+             if condition.field in PREFILTER_FIELDS and
+             condition.cost == COST_SCALAR])
+        self.clock = Clock()
+        self.day = None
+        self.bounds = {}
+        self._lock = threading.Lock()
+        # counters are updated by several threads (e.g. listener workers)
+        self._stats_lock = threading.Lock()
+        self.reset_stats()
+
+    @classmethod
+    def from_dict(cls, definition):
+        """Compile rule from dictionary with name, conditions, event_types."""
+        return cls(definition['name'], definition['conditions'],
+                   definition.get('event_types', SM_EVENT_TYPES))
+
+    @staticmethod
+    def _compile(conditions):
+        """Compile conditions into predicate(payload, day, bounds)."""
+        namespace = {'date_string': _date_string}
+        lines = ['def predicate(payload, day, bounds):', '    try:',
+                 '        pass']
+        for index, condition in enumerate(conditions):
+            lines.extend('        ' + line
+                         for line in condition.source(index, namespace))
+        lines.extend(['    except Exception:',
+                      '        return -1',
+                      '    return None'])
+        exec('\n'.join(lines), namespace)
+        return namespace['predicate']
+
+    def _set_day(self, day):
+        """Precompute date thresholds of the day."""
+        with self._lock:
+            if day != self.day:
+                self.bounds = {
+                    index: (day + timedelta(days=condition.days)).isoformat()
+                    for index, condition in enumerate(self.conditions)
+                    if condition.days is not None}
+                self.day = day
+
+    def check(self, payload, day):
+        """
+        Check the conditions for secondary market item.
+
+        Parameters
+        ----------
+        payload : dict
+            Secondary market item.
+        day : datetime.date
+            Current date.
+
+        Returns
+        -------
+        item_id : str or None
+            Secondary market item ID to buy or None.
+
+        """
+        start = time.perf_counter()
+        if day != self.day:
+            self._set_day(day)
+        index = self.predicate(payload, day, self.bounds)
+        item_id = payload.get('Id') if index is None else None
+        elapsed = time.perf_counter() - start
+        with self._stats_lock:
+            self.evaluations += 1
+            if index is None:
+                self.matches += 1
+            else:
+                # the error is counted in the last slot (index -1)
+                self.rejected[index] += 1
+            self.elapsed += elapsed
+        return item_id
+
+    def reject_event(self):
+        """Count evaluation of event with other event type."""
+        with self._stats_lock:
+            self.evaluations += 1
+            self.rejected[-2] += 1
+
+    def add_counts(self, evaluations, matches, rejected, elapsed=0.0):
+        """
+        Add counts of evaluations made outside of `check` (e.g. batches).
+
+        Parameters
+        ----------
+        evaluations : int
+            Number of evaluated items.
+        matches : int
+            Number of items satisfying the rule.
+        rejected : list
+            Numbers of rejections by condition index, event type, and error.
+        elapsed : float, optional
+            Evaluation time in seconds. The default is 0.0.
+
+        Returns
+        -------
+        None.
+
+        """
+        with self._stats_lock:
+            self.evaluations += evaluations
+            self.matches += matches
+            self.elapsed += elapsed
+            for index, count in enumerate(rejected):
+                self.rejected[index] += count
+
+    def record_buy(self, bought):
+        """
+        Record outcome of buying an item selected by the rule.
+
+        Parameters
+        ----------
+        bought : bool
+            True, if the item was bought.
+
+        Returns
+        -------
+        None.
+
+        """
+        with self._stats_lock:
+            if bought:
+                self.bought += 1
+            else:
+                self.buy_failed += 1
+
+    def evaluate(self, event, today=None):
+        """
+        Check the rule for webhook event.
+
+        Parameters
+        ----------
+        event : dict
+            Webhook event with `EventType` and `Payload`.
+        today : datetime.datetime or datetime.date, optional
+            Current time. The default is None (now).
+
+        Returns
+        -------
+        item_id : str or None
+            Secondary market item ID to buy or None.
+
+        """
+        if event.get('EventType') not in self.event_types:
+            self.reject_event()
+            return None
+        return self.check(event['Payload'], self.clock(today))
+
+    def stats(self):
+        """
+        Get evaluation statistics.
+
+        Returns
+        -------
+        stats : dict
+            Number of evaluations, matches, bought and not bought items,
+            total and average evaluation time in seconds, and rejections
+            by condition.
+
+        """
+        reasons = ([condition.name for condition in self.conditions] +
+                   ['EventType', 'Error'])
+        with self._stats_lock:
+            return {'evaluations': self.evaluations,
+                    'matches': self.matches,
+                    'bought': self.bought,
+                    'buy_failed': self.buy_failed,
+                    'elapsed': self.elapsed,
+                    'elapsed_avg': (self.elapsed / self.evaluations
+                                    if self.evaluations else 0.0),
+                    'rejections': {reason: count for reason, count
+                                   in zip(reasons, self.rejected) if count}}
+
+    def reset_stats(self):
+        """Reset evaluation statistics."""
+        with self._stats_lock:
+            self.evaluations = 0
+            self.matches = 0
+            self.bought = 0
+            self.buy_failed = 0
+            self.elapsed = 0.0
+            # rejections by condition index, event type, and error
+            self.rejected = [0] * (len(self.conditions) + 2)
+
+
+def load_rules(path):
+    """
+    Load rule definitions from JSON file.
+
+    Parameters
+    ----------
+    path : str
+        Path to JSON file with list of rules
+        {"name": ..., "conditions": [[field, operator, value], ...]}.
+
+    Returns
+    -------
+    rules : list
+        List of rule definitions.
+
+    """
+    with open(path, 'r', encoding='utf-8') as infile:
+        return json.load(infile)
+
+
+class RuleEngine:
+    """Class representation of set of compiled buy rules."""
+
+    def __init__(self, rules=None):
+        """
+        Initialize the class instance.
+
+        Parameters
+        ----------
+        rules : list or str, optional
+            List of rule definitions, Rule objects, or path to JSON file
+            with rule definitions. The default is DEFAULT_RULES.
+
+        Returns
+        -------
+        None.
+
+        """
+        if rules is None:
+            rules = DEFAULT_RULES
+        if isinstance(rules, str):
+            rules = load_rules(rules)
+        self.rules = [rule if isinstance(rule, Rule) else Rule.from_dict(rule)
+                      for rule in rules]
+        self.clock = Clock()
+
+    def _iter_matches(self, event, today):
+        """Check rules, yield tuples (rule name, item ID) of matches."""
+        event_type = event.get('EventType')
+        payload = event.get('Payload')
+        day = self.clock(today)
+        for rule in self.rules:
+            if event_type not in rule.event_types:
+                rule.reject_event()
+                continue
+            item_id = rule.check(payload, day)
+            if item_id is not None:
+                yield rule.name, item_id
+
+    def evaluate(self, event, today=None):
+        """
+        Check all rules for webhook event.
+
+        Parameters
+        ----------
+        event : dict
+            Webhook event with `EventType` and `Payload`.
+        today : datetime.datetime or datetime.date, optional
+            Current time. The default is None (now).
+
+        Returns
+        -------
+        matches : list
+            List of tuples (rule name, item ID) of satisfied rules.
+
+        """
+        return list(self._iter_matches(event, today))
+
+    def match(self, event, today=None):
+        """
+        Get the first satisfied rule and item ID to buy.
+
+        Parameters
+        ----------
+        event : dict
+            Webhook event with `EventType` and `Payload`.
+        today : datetime.datetime or datetime.date, optional
+            Current time. The default is None (now).
+
+        Returns
+        -------
+        match : tuple or None
+            Tuple (Rule object, item ID) or None, if no rule is satisfied.
+
+        """
+        event_type = event.get('EventType')
+        payload = event.get('Payload')
+        day = self.clock(today)
+        for rule in self.rules:
+            if event_type not in rule.event_types:
+                rule.reject_event()
+                continue
+            item_id = rule.check(payload, day)
+            if item_id is not None:
+                return rule, item_id
+        return None
+
+    def select(self, event, today=None):
+        """
+        Get item ID to buy, if any rule is satisfied.
+
+        Parameters
+        ----------
+        event : dict
+            Webhook event with `EventType` and `Payload`.
+        today : datetime.datetime or datetime.date, optional
+            Current time. The default is None (now).
+
+        Returns
+        -------
+        item_id : str or None
+            Secondary market item ID to buy or None.
+
+        """
+        match = self.match(event, today)
+        return match[1] if match is not None else None
+
+    def prefilter(self, event_type, fields):
+        """
+        Check if any rule can be satisfied by event with the fields.
+
+        Parameters
+        ----------
+        event_type : str
+            Event type.
+        fields : dict
+            Values of all PREFILTER_FIELDS of the secondary market item.
+
+        Returns
+        -------
+        candidate : bool
+            False, if no rule can be satisfied.
+
+        """
+        for rule in self.rules:
+            if (event_type in rule.event_types and
+                    rule.prefilter(fields, None, None) is None):
+                return True
+        return False
+
+    def stats(self):
+        """
+        Get evaluation statistics of all rules.
+
+        Returns
+        -------
+        stats : dict
+            Statistics by rule name.
+
+        """
+        return {rule.name: rule.stats() for rule in self.rules}
+
+    def reset_stats(self):
+        """Reset evaluation statistics of all rules."""
+        for rule in self.rules:
+            rule.reset_stats()
@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+"""The file contains the class definition of secondary market scanner."""
+
+import os
+import sys
+import time
+import inspect
+import threading
+from datetime import date, datetime
+
+currentdir = os.path.dirname(
+    os.path.abspath(inspect.getfile(inspect.currentframe())))
+parentdir = os.path.dirname(currentdir)
+sys.path.insert(0, parentdir)
+
+from setup_logger import logger
+from api.bondora_api import DEFAULT_PAGE_SIZE
+from trading.seen_set import event_key
+
+# event types of new and changed items, the same as of webhooks
+PUBLISHED = 'secondmarket.published'
+UPDATED = 'secondmarket.updated'
+
+# shortest poll interval in seconds, the quota of the secondary market
+# endpoint is one request per second
+MIN_INTERVAL = 1.0
+# longest poll interval in seconds
+MAX_INTERVAL = 30.0
+# interval in seconds of full scans detecting changes of older items
+FULL_INTERVAL = 600.0
+# expected number of new items per poll to set the interval
+ITEMS_PER_POLL = 1.0
+# weight of the last poll in the smoothed listing rate
+RATE_SMOOTHING = 0.3
+
+
+def listed_on(item):
+    """Get listing time of secondary market item as ISO string or None."""
+    value = item.get('ListedInSecondMarketOn')
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value or None
+
+
+class MarketScanner:
+    """Class representation of polling scanner of secondary market.
+
+    The scanner is a fallback of the webhooks. It polls the items listed
+    since the newest known listing, compares them with the snapshot of the
+    previous polls, and passes new and changed items as webhook events
+    to `BondoraTrading.buy_loan`. Changes of older items are detected by
+    periodic full scans. The poll interval follows the smoothed listing
+    rate between `min_interval` and `max_interval`, and the requests are
+    scheduled by the rate limiter of the trading object.
+    """
+
+    def __init__(self, trading, min_interval=MIN_INTERVAL,
+                 max_interval=MAX_INTERVAL, full_interval=FULL_INTERVAL,
+                 page_size=DEFAULT_PAGE_SIZE, retry=False, **kwargs):
+        """
+        Initialize the class instance.
+
+        Parameters
+        ----------
+        trading : BondoraTrading object
+            Trading object to get the items and to buy.
+        min_interval : float, optional
+            Shortest poll interval in seconds. The default is MIN_INTERVAL.
+        max_interval : float, optional
+            Longest poll interval in seconds. The default is MAX_INTERVAL.
+        full_interval : float, optional
+            Interval in seconds of full scans. The default is FULL_INTERVAL.
+        page_size : int, optional
+            Number of items per page. The default is DEFAULT_PAGE_SIZE.
+        retry : bool, optional
+            Retry to execute the requests. The default is False.
+        **kwargs : dict
+            Keyword arguments:
+                Request information (see
+                https://api.bondora.com/doc/Api/GET-api-v1-secondarymarket?v=1).
+
+        Returns
+        -------
+        None.
+
+        """
+        self.trading = trading
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.full_interval = full_interval
+        self.page_size = page_size
+        self.retry = retry
+        self.params = kwargs
+        self.snapshot = {}
+        self.newest = None
+        self.interval = max_interval
+        self.rate = 0.0
+        self.next_full = 0.0
+        self.last_poll = None
+        self.polls = 0
+        self.full_scans = 0
+        self.published = 0
+        self.updated = 0
+        self._stop = threading.Event()
+
+    def diff(self, items, complete=False):
+        """
+        Compare items with the snapshot and update it.
+
+        Parameters
+        ----------
+        items : iterable
+            Secondary market items.
+        complete : bool, optional
+            True, if `items` are all active items. Items missing in
+            `items` are removed from the snapshot. The default is False.
+
+        Returns
+        -------
+        events : list
+            Webhook events of new (PUBLISHED) and changed (UPDATED) items.
+
+        """
+        events = []
+        snapshot = self.snapshot
+        newest = self.newest
+        ids = set()
+        for item in items:
+            item_id = item.get('Id')
+            version = event_key(item)
+            previous = snapshot.get(item_id)
+            if previous is None:
+                events.append({'EventType': PUBLISHED, 'Payload': item})
+            elif previous != version:
+                events.append({'EventType': UPDATED, 'Payload': item})
+            snapshot[item_id] = version
+            ids.add(item_id)
+            listed = listed_on(item)
+            if listed and (newest is None or listed > newest):
+                newest = listed
+        self.newest = newest
+
+        # remove sold and cancelled items
+        if complete:
+            for item_id in [item_id for item_id in snapshot
+                            if item_id not in ids]:
+                del snapshot[item_id]
+        return events
+
+    def _adapt(self, n_new, now):
+        """Update smoothed listing rate and poll interval."""
+        if self.last_poll is not None and now > self.last_poll:
+            rate = n_new / (now - self.last_poll)
+            self.rate = (RATE_SMOOTHING * rate +
+                         (1.0 - RATE_SMOOTHING) * self.rate)
+        self.last_poll = now
+        if self.rate > 0:
+            interval = ITEMS_PER_POLL / self.rate
+        else:
+            interval = self.max_interval
+        self.interval = min(max(interval, self.min_interval),
+                            self.max_interval)
+
+    def poll(self, full=None):
+        """
+        Get new and changed items and pass them to the trading object.
+
+        Parameters
+        ----------
+        full : bool, optional
+            Scan all active items. If None, a full scan is made at the
+            first poll and every `full_interval` seconds. The default is
+            None.
+
+        Returns
+        -------
+        events : list
+            Webhook events of new and changed items.
+
+        """
+        trading = self.trading
+        now = time.monotonic()
+        if full is None:
+            full = self.newest is None or now >= self.next_full
+        params = dict(self.params)
+        if not full:
+            params['ListedOnDateFrom'] = self.newest
+        # cached pages would hide new items
+        if trading.cache is not None:
+            trading.cache.invalidate(trading.url_sm)
+
+        events = []
+        try:
+            pages = trading.iter_secondarymarket(self.retry, self.page_size,
+                                                 **params)
+            items = list(pages)
+            truncated = pages.complete is False
+            newest = self.newest
+            # a failed page truncates the items of a full scan
+            complete = full and not truncated
+            events = self.diff(items, complete)
+            if truncated:
+                # items of the failed pages are requested again
+                self.newest = newest
+            if complete:
+                self.next_full = now + self.full_interval
+                self.full_scans += 1
+        except Exception as e:
+            logger.error(e)
+
+        self.polls += 1
+        n_new = sum(event['EventType'] == PUBLISHED for event in events)
+        self.published += n_new
+        self.updated += len(events) - n_new
+        # the first scan lists the whole market, not the listing rate
+        self._adapt(n_new if self.polls > 1 else 0, time.monotonic())
+
+        for event in events:
+            trading.buy_loan(event)
+        return events
+
+    def run(self, duration=None):
+        """
+        Poll until stopped.
+
+        Parameters
+        ----------
+        duration : float, optional
+            Time in seconds to run. The default is None (until `stop`).
+
+        Returns
+        -------
+        None.
+
+        """
+        self._stop.clear()
+        end = None if duration is None else time.monotonic() + duration
+        while not self._stop.is_set():
+            self.poll()
+            wait_time = self.interval
+            # wait for the quota after too many requests
+            if self.trading.url_sm in self.trading.retry:
+                wait_time = max(wait_time,
+                                self.trading.retry[self.trading.url_sm])
+            if end is not None:
+                wait_time = min(wait_time, end - time.monotonic())
+                if wait_time <= 0:
+                    break
+            self._stop.wait(wait_time)
+
+    def stop(self):
+        """Stop polling."""
+        self._stop.set()
+
+    def stats(self):
+        """
+        Get statistics of the scanner.
+
+        Returns
+        -------
+        stats : dict
+            Number of polls and full scans, new and changed items, size
+            of the snapshot, smoothed listing rate per second, and
+            current poll interval in seconds.
+
+        """
+        return {'polls': self.polls,
+                'full_scans': self.full_scans,
+                'published': self.published,
+                'updated': self.updated,
+                'snapshot': len(self.snapshot),
+                'rate': self.rate,
+                'interval': self.interval}
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""The file contains the class definition of time-bounded seen-set."""
+
+import time
+import threading
+from collections import OrderedDict
+
+# default time in seconds to remember keys
+SEEN_TTL = 600
+# default maximal number of remembered keys
+SEEN_SIZE = 100000
+
+# fields of secondary market item changing with its version
+VERSION_FIELDS = ('Price', 'DesiredDiscountRate', 'PrincipalRemaining',
+                  'LoanStatusCode', 'NextPaymentNr', 'LastPaymentDate')
+
+
+def event_key(payload):
+    """
+    Create key of secondary market item and its version.
+
+    Parameters
+    ----------
+    payload : dict
+        Secondary market item.
+
+    Returns
+    -------
+    key : tuple
+        Item ID followed by the values of VERSION_FIELDS.
+
+    """
+    get = payload.get
+    return (get('Id'),) + tuple(get(field) for field in VERSION_FIELDS)
+
+
+class SeenSet:
+    """Class representation of size-bounded set of keys with TTL.
+
+    All keys have the same time to live, so the keys are ordered by their
+    expiration and expired keys are evicted from the front.
+    """
+
+    def __init__(self, ttl=SEEN_TTL, maxsize=SEEN_SIZE, clock=time.monotonic):
+        """
+        Initialize the class instance.
+
+        Parameters
+        ----------
+        ttl : float, optional
+            Time in seconds to remember keys. The default is SEEN_TTL.
+        maxsize : int, optional
+            Maximal number of remembered keys. The oldest keys are
+            evicted first. The default is SEEN_SIZE.
+        clock : callable, optional
+            Function returning the current time in seconds, e.g. the time
+            of the replayed event in backtests. The default is
+            time.monotonic.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.clock = clock
+        self.added = 0
+        self.repeats = 0
+        self._keys = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict(self, now):
+        """Remove expired keys and keys above size limit."""
+        keys = self._keys
+        while keys:
+            key, expires = next(iter(keys.items()))
+            if expires > now and len(keys) <= self.maxsize:
+                break
+            del keys[key]
+
+    def add(self, key):
+        """
+        Add key, if it is not remembered.
+
+        Parameters
+        ----------
+        key : hashable
+            Key to add.
+
+        Returns
+        -------
+        added : bool
+            True, if the key was added, False, if it is a repeat.
+
+        """
+        now = self.clock()
+        with self._lock:
+            expires = self._keys.get(key)
+            if expires is not None and expires > now:
+                self.repeats += 1
+                return False
+            self._keys.pop(key, None)
+            self._keys[key] = now + self.ttl
+            self.added += 1
+            self._evict(now)
+            return True
+
+    def discard(self, key):
+        """
+        Forget key.
+
+        Parameters
+        ----------
+        key : hashable
+            Key to remove.
+
+        Returns
+        -------
+        None.
+
+        """
+        with self._lock:
+            self._keys.pop(key, None)
+
+    def __contains__(self, key):
+        """Check if the key is remembered and not expired."""
+        with self._lock:
+            expires = self._keys.get(key)
+            return expires is not None and expires > self.clock()
+
+    def __len__(self):
+        """Get number of remembered keys including expired ones."""
+        return len(self._keys)
+
+    def stats(self):
+        """
+        Get statistics of the seen-set.
+
+        Returns
+        -------
+        stats : dict
+            Number of added keys, repeats, and remembered keys.
+
+        """
+        with self._lock:
+            return {'added': self.added,
+                    'repeats': self.repeats,
+                    'size': len(self._keys)}